@@ -7,6 +7,7 @@ from datetime import datetime
 
 # Import the tool calling agent
 from tool_calling_agent import run_tool_calling_agent
+from serp_tools import mcp_pool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -18,6 +19,16 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("startup")
+async def startup_event():
+    # Open the SerpApi MCP sessions before the first flight or hotel search needs them
+    if os.getenv("SERP_MCP_WARM_ON_START", "false").lower() == "true":
+        mcp_pool.warm(wait=False)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    mcp_pool.close()
+
 class AgentRequest(BaseModel):
     user_id: str
     conversation_id: str
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Per-call latency of SerpApi MCP tool calls: one session per call vs the session pool
+
+- per_call: what serp_tools did before the pool. Each call starts the transport,
+            runs the MCP initialize handshake, calls the tool and tears it all down.
+- pooled:   calls go through MCPSessionPool; the first call pays for the connect.
+
+Examples:
+    python benchmark_serp_mcp.py --transport stdio --calls 5
+    python benchmark_serp_mcp.py --transport http --calls 20 --concurrency 4
+    python benchmark_serp_mcp.py --url http://localhost:8000/mcp/ --tool search \\
+        --params '{"q": "coffee", "engine": "google_light"}'
+"""
+
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List
+
+from mcp import ClientSession
+
+from mcp_pool import MCPSessionPool, DEFAULT_SERVER_URL, TRANSPORTS
+
+
+async def call_once(pool: MCPSessionPool, tool: str, params: Dict[str, Any]):
+    """One tool call on a session opened just for it (the previous serp_tools behaviour)"""
+    async with AsyncExitStack() as stack:
+        streams = await stack.enter_async_context(pool._transport())
+        session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+        await session.initialize()
+        return await session.call_tool(tool, params)
+
+
+async def run(mode: str, pool: MCPSessionPool, tool: str, params: Dict[str, Any],
+              calls: int, concurrency: int) -> List[float]:
+    """Latency of each call in milliseconds"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed_call():
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "pooled":
+                await pool.call_tool(tool, params)
+            else:
+                await call_once(pool, tool, params)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(timed_call() for _ in range(calls)))
+    return latencies
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "first_ms": round(latencies[0], 1),
+        "p50_ms": round(statistics.median(ordered), 1),
+        "p95_ms": round(ordered[max(int(len(ordered) * 0.95) - 1, 0)], 1),
+        "max_ms": round(ordered[-1], 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SerpApi MCP call latency benchmark")
+    parser.add_argument("--url", default=DEFAULT_SERVER_URL, help="MCP server endpoint")
+    parser.add_argument("--transport", choices=TRANSPORTS, default="stdio")
+    parser.add_argument("--tool", default="search", help="Tool to call")
+    parser.add_argument("--params", default='{"q": "coffee"}', help="Tool arguments as JSON")
+    parser.add_argument("--calls", type=int, default=5, help="Calls per mode")
+    parser.add_argument("--concurrency", type=int, default=1, help="Calls in flight at once")
+    args = parser.parse_args()
+    params = json.loads(args.params)
+
+    print("🚀 SerpApi MCP Latency Benchmark")
+    print("=" * 50)
+    print(f"🔗 {args.url} over {args.transport}, tool '{args.tool}', "
+          f"{args.calls} calls, concurrency {args.concurrency}")
+
+    pool = MCPSessionPool(server_url=args.url, transport=args.transport,
+                          max_concurrency=args.concurrency, health_interval_seconds=0)
+    try:
+        print(f"\n{'mode':>10} {'first ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+        for mode in ("per_call", "pooled"):
+            stats = summarize(asyncio.run(run(mode, pool, args.tool, params, args.calls, args.concurrency)))
+            print(f"{mode:>10} {stats['first_ms']:>10} {stats['p50_ms']:>10} {stats['p95_ms']:>10} {stats['max_ms']:>10}")
+        print(f"\n📊 Pool: {pool.get_stats()}")
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import time
 import requests
 import json
 from typing import Dict, Any, Optional, List
@@ -126,7 +127,8 @@ def add_memory(user_id: str, memory: str, contact_id: Optional[str] = None, emai
         return {"error": str(e)}
 
 @tool_wrapper
-def search_memory(user_id: str, query: str, n_results: int = 10, search_all_collections: bool = False) -> Dict[str, Any]:
+def search_memory(user_id: str, query: str, n_results: int = 10, search_all_collections: bool = False,
+                  contact_id: Optional[str] = None, email: Optional[str] = None) -> Dict[str, Any]:
     """
     Search memories for the current user. The user_id is handled automatically by the agent.
     
@@ -134,6 +136,8 @@ def search_memory(user_id: str, query: str, n_results: int = 10, search_all_coll
         query: The search query.
         n_results: The number of results to return.
         search_all_collections: Whether to search across all of the user's collections.
+        contact_id: Optional ID of the contact the conversation is about; their memories rank higher.
+        email: Optional email of that contact, instead of contact_id.
         
     Returns:
         A dictionary containing the search results.
@@ -144,6 +148,10 @@ def search_memory(user_id: str, query: str, n_results: int = 10, search_all_coll
         "n_results": n_results,
         "search_all_collections": search_all_collections,
     }
+    if contact_id:
+        payload["contact_id"] = contact_id
+    if email:
+        payload["email"] = email
     try:
         response = requests.post(f"{BASE_URL}/api/memory/search", json=payload)
         response.raise_for_status()
@@ -178,18 +186,77 @@ def write_status(agent_id: str, agent_type: str, conversation_id: str, update: s
         return {"error": str(e)}
 
 @tool_wrapper
-def read_status(conversation_id: str) -> Dict[str, Any]:
+def wait_for_status(conversation_id: str, timeout_seconds: int = 300, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Wait until a new status update is written for the current conversation and return it.
+    Use this instead of sleeping and polling read_status. The conversation_id is handled automatically by the agent.
+    
+    Args:
+        conversation_id: The ID of the conversation.
+        timeout_seconds: Maximum number of seconds to wait (default: 300).
+        cursor: Optional `next_cursor` from a previous read; updates after it are returned immediately.
+        
+    Returns:
+        A dictionary with the new status updates and a `next_cursor`, or `timed_out` if nothing arrived.
+    """
+    params = {"conversation_id": conversation_id}
+    if cursor:
+        params["cursor"] = cursor
+    else:
+        params["from_now"] = "true"
+    
+    updates = []
+    next_cursor = cursor
+    deadline = time.monotonic() + timeout_seconds
+    try:
+        # Server-Sent Events; the read timeout also bounds how long we wait for the first event
+        read_timeout = max(1, min(timeout_seconds, 60))
+        with requests.get(f"{BASE_URL}/api/status/stream", params=params, stream=True,
+                          timeout=(10, read_timeout)) as response:
+            response.raise_for_status()
+            event_id, data = None, None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("id: "):
+                    event_id = line[4:]
+                elif line.startswith("data: "):
+                    data = line[6:]
+                elif line == "" and data is not None:
+                    updates.append(json.loads(data))
+                    next_cursor = event_id
+                    event_id, data = None, None
+                    # Hand the first new update back to the agent right away
+                    break
+                if time.monotonic() >= deadline:
+                    break
+    except requests.RequestException as e:
+        # A read timeout once the deadline has passed just means nothing new arrived
+        if not updates and time.monotonic() < deadline:
+            return {"success": False, "error": str(e)}
+    
+    return {
+        "success": True,
+        "status_updates": updates,
+        "next_cursor": next_cursor,
+        "timed_out": not updates
+    }
+
+@tool_wrapper
+def read_status(conversation_id: str, cursor: Optional[str] = None) -> Dict[str, Any]:
     """
     Read status updates for the current conversation. The conversation_id is handled automatically by the agent.
     
     Args:
         conversation_id: The ID of the conversation.
+        cursor: Optional `next_cursor` from a previous read; only updates written since then are returned.
         
     Returns:
-        A dictionary containing the status updates.
+        A dictionary containing the status updates and a `next_cursor` for the next read.
     """
+    payload = {"conversation_id": conversation_id}
+    if cursor:
+        payload["cursor"] = cursor
     try:
-        response = requests.post(f"{BASE_URL}/api/status/read", json={"conversation_id": conversation_id})
+        response = requests.post(f"{BASE_URL}/api/status/read", json=payload)
         response.raise_for_status()
         return response.json()
     except Exception as e:
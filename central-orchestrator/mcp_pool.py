@@ -0,0 +1,314 @@
+"""
+Pool of long-lived MCP client sessions shared by the SerpApi tools.
+
+Opening an MCP session means starting a transport (an `npx mcp-remote` Node
+process, or an HTTP session) and running the `initialize` handshake, which
+takes seconds. The pool keeps sessions open between tool calls:
+
+- Sessions live on a private event loop thread, so tools can call the pool from
+  any event loop (or from synchronous code) without tying the sessions to it.
+- Up to `size` sessions are opened on demand; each call goes to an idle
+  session, or to the least busy one once all are open.
+- A semaphore bounds the number of tool calls in flight.
+- Idle sessions are pinged periodically; sessions that fail a ping or a call
+  are closed and replaced. A call that failed because its session broke is
+  retried once on a fresh session.
+
+Transports:
+- "stdio": the `npx -y mcp-remote <url>` bridge (requires Node.js)
+- "http":  streamable HTTP straight to the FastMCP server, no bridge
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVER_URL = "https://serp-mcp-534113739138.europe-west1.run.app/mcp/"
+TRANSPORTS = ("stdio", "http")
+PING_TIMEOUT_SECONDS = 10
+
+
+def _root_cause(error: BaseException) -> BaseException:
+    """The first underlying error of the exception groups raised by the MCP transports"""
+    while getattr(error, "exceptions", None):
+        error = error.exceptions[0]
+    return error
+
+
+class _PooledSession:
+    """One MCP session, held open by a task on the pool's loop until it is closed"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.session: Optional[ClientSession] = None
+        self.ready: asyncio.Future = loop.create_future()
+        self.closing = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.in_flight = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.session is not None and not self.closing.is_set()
+
+
+class MCPSessionPool:
+    """Warm MCP sessions to one server, shared by all callers"""
+
+    def __init__(self, server_url: Optional[str] = None, transport: Optional[str] = None,
+                 size: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 call_timeout_seconds: Optional[float] = None,
+                 connect_timeout_seconds: Optional[float] = None,
+                 health_interval_seconds: Optional[float] = None):
+        """
+        Args:
+            server_url: MCP endpoint (env SERP_MCP_URL)
+            transport: "stdio" (npx mcp-remote bridge) or "http" (env SERP_MCP_TRANSPORT)
+            size: Maximum number of open sessions (env SERP_MCP_POOL_SIZE)
+            max_concurrency: Maximum tool calls in flight (env SERP_MCP_MAX_CONCURRENCY)
+            call_timeout_seconds: Deadline of a single tool call (env SERP_MCP_CALL_TIMEOUT_SECONDS)
+            connect_timeout_seconds: Deadline for opening a session (env SERP_MCP_CONNECT_TIMEOUT_SECONDS)
+            health_interval_seconds: Pause between pings of idle sessions; 0 disables them
+                (env SERP_MCP_HEALTH_INTERVAL_SECONDS)
+        """
+        self.server_url = server_url or os.getenv("SERP_MCP_URL", DEFAULT_SERVER_URL)
+        self.transport = (transport or os.getenv("SERP_MCP_TRANSPORT", "stdio")).strip().lower()
+        if self.transport not in TRANSPORTS:
+            raise ValueError(f"Unknown SERP_MCP_TRANSPORT '{self.transport}', expected 'stdio' or 'http'")
+        self.size = size or int(os.getenv("SERP_MCP_POOL_SIZE", "2"))
+        self.max_concurrency = max_concurrency or int(os.getenv("SERP_MCP_MAX_CONCURRENCY", "8"))
+        self.call_timeout = call_timeout_seconds or float(os.getenv("SERP_MCP_CALL_TIMEOUT_SECONDS", "120"))
+        self.connect_timeout = connect_timeout_seconds or float(os.getenv("SERP_MCP_CONNECT_TIMEOUT_SECONDS", "60"))
+        self.health_interval = (health_interval_seconds if health_interval_seconds is not None
+                                else float(os.getenv("SERP_MCP_HEALTH_INTERVAL_SECONDS", "60")))
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock = threading.Lock()
+        self._sessions: List[_PooledSession] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._health_task: Optional[asyncio.Task] = None
+        self._keep_warm = False
+        self._stats = {
+            "calls": 0, "errors": 0, "retries": 0, "sessions_opened": 0,
+            "connect_failures": 0, "health_check_failures": 0,
+            "call_ms_total": 0.0, "connect_ms_total": 0.0
+        }
+
+    # Public API, callable from any thread or event loop
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        """Call an MCP tool on a pooled session and return its CallToolResult"""
+        future = asyncio.run_coroutine_threadsafe(self._call_tool(name, arguments), self._ensure_loop())
+        return await asyncio.wrap_future(future)
+
+    def call_tool_sync(self, name: str, arguments: Optional[Dict[str, Any]] = None):
+        """Blocking variant of call_tool for synchronous callers"""
+        return asyncio.run_coroutine_threadsafe(self._call_tool(name, arguments), self._ensure_loop()).result()
+
+    def warm(self, wait: bool = True, timeout: Optional[float] = None):
+        """Open all sessions now and keep the pool topped up after failures"""
+        future = asyncio.run_coroutine_threadsafe(self._warm(), self._ensure_loop())
+        if wait:
+            future.result(timeout)
+
+    def close(self):
+        """Close every session and stop the pool's loop"""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"MCP session pool did not shut down cleanly: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        completed = stats["calls"] - stats["errors"]
+        return {
+            "transport": self.transport,
+            "server_url": self.server_url,
+            "size": self.size,
+            "max_concurrency": self.max_concurrency,
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "retries": stats["retries"],
+            "sessions_opened": stats["sessions_opened"],
+            "sessions_open": sum(1 for pooled in self._sessions if pooled.is_open),
+            "in_flight": sum(pooled.in_flight for pooled in self._sessions),
+            "connect_failures": stats["connect_failures"],
+            "health_check_failures": stats["health_check_failures"],
+            "avg_call_ms": round(stats["call_ms_total"] / completed, 1) if completed else None,
+            "avg_connect_ms": (round(stats["connect_ms_total"] / stats["sessions_opened"], 1)
+                               if stats["sessions_opened"] else None)
+        }
+
+    # Everything below runs on the pool's loop
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="mcp-session-pool", daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def _call_tool(self, name: str, arguments: Optional[Dict[str, Any]]):
+        async with self._semaphore:
+            self._stats["calls"] += 1
+            started = time.perf_counter()
+            for attempt in (1, 2):
+                try:
+                    pooled = await self._acquire()
+                except Exception:
+                    self._stats["errors"] += 1
+                    raise
+                try:
+                    result = await asyncio.wait_for(pooled.session.call_tool(name, arguments), self.call_timeout)
+                    self._stats["call_ms_total"] += (time.perf_counter() - started) * 1000
+                    return result
+                except McpError:
+                    # The server answered with an error; the session itself is fine
+                    self._stats["errors"] += 1
+                    raise
+                except asyncio.TimeoutError:
+                    # The server may just be slow; retrying would double the wait
+                    self._stats["errors"] += 1
+                    self._close(pooled)
+                    raise
+                except Exception as e:
+                    self._close(pooled)
+                    if attempt == 2:
+                        self._stats["errors"] += 1
+                        raise
+                    self._stats["retries"] += 1
+                    logger.warning(f"MCP call '{name}' failed on a broken session, retrying on a new one: "
+                                   f"{_root_cause(e)!r}")
+                finally:
+                    pooled.in_flight -= 1
+
+    async def _acquire(self) -> _PooledSession:
+        """An idle open session, a new one while the pool has room, else the least busy"""
+        idle = [pooled for pooled in self._sessions if pooled.is_open and pooled.in_flight == 0]
+        if idle:
+            pooled = idle[0]
+        elif len(self._sessions) < self.size:
+            pooled = self._open()
+        else:
+            pooled = min(self._sessions, key=lambda candidate: candidate.in_flight)
+
+        pooled.in_flight += 1
+        try:
+            # Sessions still connecting are shared by everyone who picked them
+            await asyncio.shield(pooled.ready)
+        except Exception:
+            pooled.in_flight -= 1
+            raise
+        return pooled
+
+    def _open(self) -> _PooledSession:
+        pooled = _PooledSession(asyncio.get_running_loop())
+        pooled.task = asyncio.create_task(self._hold_session(pooled))
+        self._sessions.append(pooled)
+
+        def connect_deadline():
+            if not pooled.ready.done():
+                pooled.task.cancel()
+        asyncio.get_running_loop().call_later(self.connect_timeout, connect_deadline)
+        return pooled
+
+    async def _hold_session(self, pooled: _PooledSession):
+        """Open the transport and session, then keep them open until the session is closed"""
+        started = time.perf_counter()
+        try:
+            async with AsyncExitStack() as stack:
+                streams = await stack.enter_async_context(self._transport())
+                session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+                await session.initialize()
+
+                pooled.session = session
+                self._stats["sessions_opened"] += 1
+                self._stats["connect_ms_total"] += (time.perf_counter() - started) * 1000
+                pooled.ready.set_result(session)
+                logger.info(f"Opened MCP session to {self.server_url} over {self.transport} "
+                            f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+                await pooled.closing.wait()
+        except BaseException as e:
+            if not pooled.ready.done():
+                self._stats["connect_failures"] += 1
+                error = (_root_cause(e) if isinstance(e, Exception)
+                         else ConnectionError(f"MCP connect to {self.server_url} timed out"))
+                pooled.ready.set_exception(error)
+                # Mark the exception retrieved; callers waiting on the session re-raise it
+                pooled.ready.exception()
+                logger.warning(f"Failed to open MCP session to {self.server_url}: {error}")
+            elif not pooled.closing.is_set():
+                logger.warning(f"MCP session to {self.server_url} dropped: {_root_cause(e)!r}")
+            if not isinstance(e, Exception) and not isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            self._close(pooled)
+            pooled.session = None
+
+    def _transport(self):
+        if self.transport == "http":
+            return streamablehttp_client(self.server_url)
+        return stdio_client(StdioServerParameters(
+            command="npx",
+            args=["-y", "mcp-remote", self.server_url],
+            env=None
+        ))
+
+    def _close(self, pooled: _PooledSession):
+        """Stop handing out the session and let its task close the transport"""
+        pooled.closing.set()
+        if pooled in self._sessions:
+            self._sessions.remove(pooled)
+
+    async def _warm(self):
+        self._keep_warm = True
+        await self._top_up()
+
+    async def _top_up(self):
+        opened = [self._open() for _ in range(self.size - len(self._sessions))]
+        await asyncio.gather(*(pooled.ready for pooled in opened), return_exceptions=True)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for pooled in list(self._sessions):
+                if not pooled.is_open or pooled.in_flight:
+                    continue
+                try:
+                    await asyncio.wait_for(pooled.session.send_ping(), PING_TIMEOUT_SECONDS)
+                except Exception as e:
+                    self._stats["health_check_failures"] += 1
+                    logger.warning(f"MCP session to {self.server_url} failed its health check: {e}")
+                    self._close(pooled)
+            if self._keep_warm:
+                await self._top_up()
+
+    async def _shutdown(self):
+        if self._health_task:
+            self._health_task.cancel()
+        sessions = list(self._sessions)
+        for pooled in sessions:
+            self._close(pooled)
+        await asyncio.gather(*(pooled.task for pooled in sessions), return_exceptions=True)
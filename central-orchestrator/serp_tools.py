@@ -1,11 +1,20 @@
 from typing import Dict, Any
-import asyncio
-from contextlib import AsyncExitStack
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp_pool import MCPSessionPool
 from utils import tool_wrapper
 
+# Warm MCP sessions shared by every SerpApi tool (see mcp_pool.py for the settings)
+mcp_pool = MCPSessionPool()
+
+
+async def _call_serp_tool(tool_name: str, params: dict) -> Dict[str, Any]:
+    """Call a tool of the SerpApi MCP server on a pooled session"""
+    try:
+        result = await mcp_pool.call_tool(tool_name, params)
+        return {"success": True, "result": result.content}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
 
 @tool_wrapper
 async def serp_search(params: dict) -> Dict[str, Any]:
@@ -18,33 +27,13 @@ async def serp_search(params: dict) -> Dict[str, Any]:
     Returns:
         A dictionary containing the search results or an error message.
     """
-    server_url = "https://serp-mcp-534113739138.europe-west1.run.app/mcp/"
-    
-    server_params = StdioServerParameters(
-        command="npx",
-        args=["-y", "mcp-remote", server_url],
-        env=None
-    )
-
-    async with AsyncExitStack() as exit_stack:
-        try:
-            print("Connecting to MCP server for search...")
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
-
-            await session.initialize()
-
-            print(f"Calling 'search' tool with params: {params}")
-            result = await session.call_tool("search", params)
-            
-            print("Search successful.")
-            return {"success": True, "result": result.content}
-
-        except Exception as e:
-            print(f"❌ An error occurred during serp_search: {e}")
-            return {"success": False, "error": str(e)}
+    print(f"Calling 'search' tool with params: {params}")
+    result = await _call_serp_tool("search", params)
+    if result["success"]:
+        print("Search successful.")
+    else:
+        print(f"❌ An error occurred during serp_search: {result['error']}")
+    return result
 
 @tool_wrapper
 async def flights(params: dict) -> Dict[str, Any]:
@@ -58,23 +47,26 @@ async def flights(params: dict) -> Dict[str, Any]:
             - outbound_date (str): Outbound date in YYYY-MM-DD format
             - return_date (str): Return date in YYYY-MM-DD format (for round trip)
             - type (int): 1=Round trip, 2=One way, 3=Multi-city
+        Results are compact flight records. Next to the search parameters the tool accepts
+        fields (e.g. ["price", "stops", "booking_token"]) and limit (default 10).
+    """
+    return await _call_serp_tool("flights", params)
+
+@tool_wrapper
+async def flight_grid(params: dict) -> Dict[str, Any]:
+    """
+    Compare flight prices across routes and flexible dates in a single call.
+
+    Parameters:
+        params (dict): Grid parameters:
+            - origins (list): Departure airport IATA codes (e.g. ['LHR', 'LGW'])
+            - destinations (list): Arrival airport IATA codes (e.g. ['FCO'])
+            - outbound_date (str): Preferred outbound date in YYYY-MM-DD format
+            - return_date (str): Preferred return date in YYYY-MM-DD format; omit for one way
+            - flex_days (int): Days searched either side of each date (default: 3)
+            - params (dict): Other Google Flights parameters, e.g. {"adults": 2, "currency": "EUR"}
     """
-    server_url = "https://serp-mcp-534113739138.europe-west1.run.app/mcp/"
-    server_params = StdioServerParameters(
-        command="npx",
-        args=["-y", "mcp-remote", server_url],
-        env=None
-    )
-    async with AsyncExitStack() as exit_stack:
-        try:
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
-            await session.initialize()
-            result = await session.call_tool("flights", params)
-            return {"success": True, "result": result.content}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    return await _call_serp_tool("flight_grid", params)
 
 @tool_wrapper
 async def hotels(params: dict) -> Dict[str, Any]:
@@ -87,23 +79,10 @@ async def hotels(params: dict) -> Dict[str, Any]:
             - check_in_date (str): Check-in date in YYYY-MM-DD format (required)
             - check_out_date (str): Check-out date in YYYY-MM-DD format (required)
             - adults (int): Number of adults (default: 2)
+        Results are compact property records. Next to the search parameters the tool accepts
+        fields (e.g. ["name", "price_per_night", "overall_rating"]) and limit (default 10).
     """
-    server_url = "https://serp-mcp-534113739138.europe-west1.run.app/mcp/"
-    server_params = StdioServerParameters(
-        command="npx",
-        args=["-y", "mcp-remote", server_url],
-        env=None
-    )
-    async with AsyncExitStack() as exit_stack:
-        try:
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
-            await session.initialize()
-            result = await session.call_tool("hotels", params)
-            return {"success": True, "result": result.content}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    return await _call_serp_tool("hotels", params)
 
 @tool_wrapper
 async def maps(params: dict) -> Dict[str, Any]:
@@ -116,22 +95,7 @@ async def maps(params: dict) -> Dict[str, Any]:
             - ll (str): Latitude and longitude coordinates (e.g. '@40.7455096,-74.0083012,14z')
             - type (str): Search type (default: 'search')
     """
-    server_url = "https://serp-mcp-534113739138.europe-west1.run.app/mcp/"
-    server_params = StdioServerParameters(
-        command="npx",
-        args=["-y", "mcp-remote", server_url],
-        env=None
-    )
-    async with AsyncExitStack() as exit_stack:
-        try:
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
-            await session.initialize()
-            result = await session.call_tool("maps", params)
-            return {"success": True, "result": result.content}
-        except Exception as e:
-            return {"success": False, "error": str(e)}
+    return await _call_serp_tool("maps", params)
 
 @tool_wrapper
 async def amazon(params: dict) -> Dict[str, Any]:
@@ -143,19 +107,4 @@ async def amazon(params: dict) -> Dict[str, Any]:
             - k (str): Search query/keywords (e.g. 'coffee', 'wireless headphones')
             - amazon_domain (str): Amazon domain (default: 'amazon.com')
     """
-    server_url = "https://serp-mcp-534113739138.europe-west1.run.app/mcp/"
-    server_params = StdioServerParameters(
-        command="npx",
-        args=["-y", "mcp-remote", server_url],
-        env=None
-    )
-    async with AsyncExitStack() as exit_stack:
-        try:
-            stdio_transport = await exit_stack.enter_async_context(stdio_client(server_params))
-            stdio, write = stdio_transport
-            session = await exit_stack.enter_async_context(ClientSession(stdio, write))
-            await session.initialize()
-            result = await session.call_tool("amazon", params)
-            return {"success": True, "result": result.content}
-        except Exception as e:
-            return {"success": False, "error": str(e)} 
\ No newline at end of file
+    return await _call_serp_tool("amazon", params)
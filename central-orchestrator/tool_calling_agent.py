@@ -32,9 +32,10 @@ from global_tools import (
     add_memory,
     search_memory,
     write_status,
-    read_status
+    read_status,
+    wait_for_status
 )
-from serp_tools import serp_search, flights, hotels, maps, amazon
+from serp_tools import serp_search, flights, flight_grid, hotels, maps, amazon
 from whatsapp_agent import execute_whatsapp_task
 from checkout_agent import book_flight
 
@@ -361,8 +362,10 @@ AVAILABLE_TOOLS = [
     search_memory,
     write_status,
     read_status,
+    wait_for_status,
     serp_search,
     flights,
+    flight_grid,
     hotels,
     maps,
     amazon,
@@ -419,7 +422,7 @@ TASK COMPLETION STRATEGY:
 - For contact management: Use add_contact, update_contact, and get_contacts
 - For memory: Use add_memory and search_memory to store and retrieve information
 - Any phone_agent or whatsapp_agent will add additional information to memory and will provide status updates which you can read with the relevant tools
-- If you are missing the required info to complete the task and have created phone or whatsapp agents, then use your sleep tool to wait for the agents to complete their tasks and then check memory and status updates   
+- If you are missing the required info to complete the task and have created phone or whatsapp agents, then use wait_for_status to wait for the agents' next status update (pass the previous next_cursor) and then check memory and status updates   
 
 Remember to be helpful, efficient, and complete all requested tasks successfully."""
 
@@ -444,8 +447,10 @@ Available tools:
 - add_contact, update_contact, get_contacts: Manage contacts
 - add_memory, search_memory: Store and retrieve memories
 - write_status, read_status: Read and write status updates
+- wait_for_status: Wait until a new status update arrives
 - serp_search: Get search results from the SerpAPI Google Search API.
 - flights: Get flight information from the SerpAPI Google Flights API.
+- flight_grid: Compare flight prices across several airports and flexible dates (e.g. +/-3 days) in one call.
 - hotels: Get hotel information from the SerpAPI Google Hotels API.
 - maps: Get map information from the SerpAPI Google Maps API.
 - amazon: Get product information from the SerpAPI Amazon API.
@@ -579,7 +584,7 @@ INITIAL CONTEXT:
                         # Special handling for tools that need user_id or conversation_id
                         if tool_name in ["add_contact", "update_contact", "get_contacts", "add_memory", "search_memory", "execute_whatsapp_task"]:
                             tool_args["user_id"] = self.user_id
-                        if tool_name in ["write_status", "read_status", "execute_whatsapp_task", "make_outbound_call", "book_flight", "mark_task_as_complete"]:
+                        if tool_name in ["write_status", "read_status", "wait_for_status", "execute_whatsapp_task", "make_outbound_call", "book_flight", "mark_task_as_complete"]:
                             tool_args["conversation_id"] = conversation_id
 
                         if tool_name in self.tools:
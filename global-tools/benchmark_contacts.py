@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark of single-contact operations against users with many contacts
+
+Compares, for 1k / 10k / 100k contacts per user:
+- full:       the previous queries, which returned the whole user document
+- projected:  embedded contacts read with `$elemMatch` / `_id` projections
+- collection: contacts stored one per document in the `Contacts` collection
+
+Against MongoDB (uses a scratch database that is dropped afterwards):
+    MONGODB_URL=mongodb://localhost:27017 python benchmark_contacts.py
+
+Without a server, report only the bytes each read returns:
+    python benchmark_contacts.py --payload-only
+"""
+
+import os
+import time
+import uuid
+import argparse
+import statistics
+from datetime import datetime
+from typing import Dict, Any, List, Callable, Optional
+
+import bson
+
+CONTACT_COUNTS = [1_000, 10_000, 100_000]
+STRATEGIES = ["full", "projected", "collection"]
+
+
+def make_contact(i: int) -> Dict[str, Any]:
+    """A contact shaped like the ones ContactService writes"""
+    return {
+        "uid": str(uuid.uuid4()),
+        "FirstName": f"First{i}",
+        "LastName": f"Last{i}",
+        "nickname": None,
+        "email": f"contact{i}@example.com",
+        "phoneNumber": f"+1555{i:07d}",
+        "created_at": datetime.utcnow()
+    }
+
+
+def encoded_size(document: Optional[Dict[str, Any]]) -> int:
+    return len(bson.encode(document)) if document else 0
+
+
+def payload_sizes(count: int) -> Dict[str, Dict[str, int]]:
+    """Bytes returned by a single-contact read under each strategy"""
+    contacts = [make_contact(i) for i in range(count)]
+    user = {"_id": bson.ObjectId(), "uid": "bench-user", "Contacts": contacts}
+    target = contacts[count // 2]
+
+    return {
+        "full": {
+            "lookup": encoded_size(user),
+            "duplicate_check": encoded_size(user)
+        },
+        "projected": {
+            "lookup": encoded_size({"Contacts": [target]}),
+            "duplicate_check": encoded_size({"_id": user["_id"]})
+        },
+        "collection": {
+            "lookup": encoded_size(target),
+            "duplicate_check": encoded_size({"_id": bson.ObjectId()})
+        }
+    }
+
+
+def time_operation(operation: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """Run an operation and return latency stats in milliseconds"""
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = operation()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "max_ms": round(max(latencies), 2),
+        "bytes": encoded_size(result) if isinstance(result, dict) else 0
+    }
+
+
+def run_live(mongodb_url: str, counts: List[int], repeat: int):
+    """Time each strategy against a scratch database"""
+    from pymongo import MongoClient
+    from pymongo.errors import DocumentTooLarge, WriteError
+
+    from contact_store import ContactStore, COLLECTION_STORAGE
+
+    client = MongoClient(mongodb_url, serverSelectionTimeoutMS=5000)
+    database = client[f"contacts_benchmark_{uuid.uuid4().hex[:8]}"]
+
+    class BenchmarkDatabase:
+        users = database.Users
+        contacts = database.Contacts
+
+    store = ContactStore(BenchmarkDatabase())
+    database.Users.create_index("uid")
+    database.Users.create_index([("uid", 1), ("Contacts.uid", 1)])
+    database.Users.create_index([("uid", 1), ("Contacts.email", 1)])
+    database.Contacts.create_index([("user_id", 1), ("uid", 1)], unique=True)
+    database.Contacts.create_index([("user_id", 1), ("email", 1)])
+
+    try:
+        for count in counts:
+            print(f"\n👥 {count:,} contacts per user")
+            print(f"{'strategy':>12} {'operation':>16} {'p50 ms':>10} {'max ms':>10} {'bytes':>12}")
+
+            contacts = [make_contact(i) for i in range(count)]
+            target = contacts[count // 2]
+            embedded_uid = f"embedded-{count}"
+            external_uid = f"external-{count}"
+
+            try:
+                database.Users.insert_one({"uid": embedded_uid, "Contacts": contacts})
+                embedded = True
+            except (DocumentTooLarge, WriteError) as e:
+                print(f"{'embedded':>12} {'-':>16} skipped: {type(e).__name__} (16 MB document limit)")
+                embedded = False
+
+            database.Users.insert_one({"uid": external_uid, "contacts_storage": COLLECTION_STORAGE})
+            database.Contacts.insert_many(
+                [{**contact, "user_id": external_uid} for contact in contacts], ordered=False
+            )
+
+            operations = {}
+            if embedded:
+                operations["full"] = {
+                    "lookup": lambda: database.Users.find_one({"uid": embedded_uid, "Contacts.uid": target["uid"]}),
+                    "duplicate_check": lambda: database.Users.find_one({"uid": embedded_uid, "Contacts.email": target["email"]}),
+                    "add": lambda: database.Users.update_one(
+                        {"uid": embedded_uid}, {"$push": {"Contacts": make_contact(count)}}
+                    )
+                }
+                operations["projected"] = {
+                    "lookup": lambda: store.get_contact(embedded_uid, target["uid"]),
+                    "duplicate_check": lambda: {"in_use": store.email_in_use(embedded_uid, target["email"])},
+                    "add": lambda: store.add_contact(embedded_uid, make_contact(count)),
+                    "update": lambda: store.update_contact(
+                        embedded_uid, target["uid"], {"$set": {"Contacts.$.nickname": "bench"}}
+                    )
+                }
+            operations["collection"] = {
+                "lookup": lambda: store.get_contact(external_uid, target["uid"]),
+                "duplicate_check": lambda: {"in_use": store.email_in_use(external_uid, target["email"])},
+                "add": lambda: store.add_contact(external_uid, make_contact(count)),
+                "update": lambda: store.update_contact(
+                    external_uid, target["uid"], {"$set": {"Contacts.$.nickname": "bench"}}
+                )
+            }
+
+            for strategy, strategy_operations in operations.items():
+                for name, operation in strategy_operations.items():
+                    stats = time_operation(operation, repeat)
+                    print(f"{strategy:>12} {name:>16} {stats['p50_ms']:>10} {stats['max_ms']:>10} {stats['bytes']:>12,}")
+    finally:
+        client.drop_database(database.name)
+        client.close()
+
+
+def run_payload_only(counts: List[int]):
+    """Report bytes returned by single-contact reads without a server"""
+    print(f"\n{'contacts':>10} {'strategy':>12} {'lookup bytes':>14} {'dup check bytes':>16}")
+    for count in counts:
+        sizes = payload_sizes(count)
+        for strategy in STRATEGIES:
+            print(f"{count:>10,} {strategy:>12} {sizes[strategy]['lookup']:>14,} "
+                  f"{sizes[strategy]['duplicate_check']:>16,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contact query benchmark")
+    parser.add_argument("--mongodb-url", default=os.getenv("MONGODB_URL"), help="MongoDB to benchmark against")
+    parser.add_argument("--counts", type=int, nargs="+", default=CONTACT_COUNTS,
+                        help="Contacts per user to test")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per operation")
+    parser.add_argument("--payload-only", action="store_true",
+                        help="Only report response sizes; no server needed")
+    args = parser.parse_args()
+
+    print("🚀 Contact Query Benchmark")
+    print("=" * 50)
+
+    if args.payload_only or not args.mongodb_url:
+        run_payload_only(args.counts)
+    else:
+        run_live(args.mongodb_url, args.counts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Load-test benchmark for the Global Tools API
+
+Sweeps concurrency levels and reports the highest throughput (requests/sec)
+that keeps p99 latency under a target.
+
+Against a running server:
+    python benchmark_load.py --url http://localhost:8000 --path /health --p99-target-ms 250
+
+Self-contained comparison of a blocking backend call made directly in an
+`async def` route (before) and the same call handed to the threadpool (after):
+    python benchmark_load.py --simulate --backend-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32, 64]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_level(client: httpx.AsyncClient, path: str, concurrency: int,
+                    duration: float) -> Dict[str, Any]:
+    """Keep `concurrency` requests in flight for `duration` seconds"""
+    latencies: List[float] = []
+    errors = 0
+    stop_at = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1)
+    }
+
+
+async def sweep(client: httpx.AsyncClient, path: str, duration: float,
+                p99_target_ms: float, label: str) -> Optional[Dict[str, Any]]:
+    """Run every concurrency level and return the best one within the p99 target"""
+    print(f"\n📈 {label} ({path})")
+    print(f"{'concurrency':>12} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+
+    best = None
+    for concurrency in CONCURRENCY_LEVELS:
+        result = await run_level(client, path, concurrency, duration)
+        print(f"{result['concurrency']:>12} {result['rps']:>10} {result['p50_ms']:>10} "
+              f"{result['p99_ms']:>10} {result['errors']:>8}")
+        if result["p99_ms"] <= p99_target_ms and (best is None or result["rps"] > best["rps"]):
+            best = result
+
+    if best:
+        print(f"✅ Best within p99 ≤ {p99_target_ms} ms: {best['rps']} req/s at concurrency {best['concurrency']}")
+    else:
+        print(f"❌ No concurrency level kept p99 ≤ {p99_target_ms} ms")
+    return best
+
+
+def build_simulation_app(backend_latency_ms: float):
+    """App with the same blocking backend call served both ways"""
+    from fastapi import FastAPI
+    from fastapi.concurrency import run_in_threadpool
+
+    app = FastAPI()
+    latency = backend_latency_ms / 1000
+
+    def backend_call():
+        # Stands in for a blocking pymongo / chromadb / requests call
+        time.sleep(latency)
+        return {"status": "ok"}
+
+    @app.get("/blocking")
+    async def blocking():
+        return backend_call()
+
+    @app.get("/offloaded")
+    async def offloaded():
+        return await run_in_threadpool(backend_call)
+
+    return app
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Global Tools API load benchmark")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of a running API")
+    parser.add_argument("--path", default="/health", help="Endpoint to load")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per concurrency level")
+    parser.add_argument("--p99-target-ms", type=float, default=250.0, help="p99 latency budget")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Compare blocking vs threadpool routes in-process")
+    parser.add_argument("--backend-latency-ms", type=float, default=20.0,
+                        help="Simulated backend latency for --simulate")
+    args = parser.parse_args()
+
+    print("🚀 Global Tools API Load Benchmark")
+    print("=" * 50)
+
+    if args.simulate:
+        app = build_simulation_app(args.backend_latency_ms)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            before = await sweep(client, "/blocking", args.duration, args.p99_target_ms,
+                                 "Before: blocking call on the event loop")
+            after = await sweep(client, "/offloaded", args.duration, args.p99_target_ms,
+                                "After: blocking call in the threadpool")
+
+        print("\n📊 Summary")
+        print(f"  before: {before['rps'] if before else 0} req/s within p99 ≤ {args.p99_target_ms} ms")
+        print(f"  after:  {after['rps'] if after else 0} req/s within p99 ≤ {args.p99_target_ms} ms")
+        return
+
+    limits = httpx.Limits(max_connections=max(CONCURRENCY_LEVELS))
+    async with httpx.AsyncClient(base_url=args.url, timeout=30, limits=limits) as client:
+        await sweep(client, args.path, args.duration, args.p99_target_ms, f"Load against {args.url}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Offline relevance and latency benchmark of memory search: vector vs hybrid
+
+Generates synthetic travel memories for one user (preferences, bookings with
+flight numbers, confirmation codes, hotel names, contact emails) and a set of
+labelled queries, stores them in the embedded local vector backend and reports
+recall@k, MRR and per-query latency for MEMORY_SEARCH_MODE=vector and =hybrid.
+
+Queries come in two kinds:
+- semantic: paraphrases of a preference ("does the user like aisle seats")
+- exact:    identifiers quoted back ("what was booking QX7R2M about")
+
+No servers needed; embeddings come from EMBEDDING_SERVICE_URL if set,
+otherwise from the local hashing embedding:
+    python benchmark_memory_search.py
+    python benchmark_memory_search.py --memories 5000 --queries 200 --k 5
+"""
+
+import os
+import sys
+import time
+import random
+import string
+import logging
+import argparse
+import statistics
+from typing import Dict, Any, List, Tuple
+
+os.environ["CHROMA_BACKEND"] = "local"
+# The vector store logs every query at INFO
+logging.disable(logging.INFO)
+
+from chromaManager import ChromaManager
+from memory_layout import MemoryLayout, PER_CONTACT_LAYOUT
+from memory_service import MemoryService
+from models import AddMemoriesBatchRequest, BatchMemoryItem, SearchMemoryRequest
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+MODES = ["vector", "hybrid"]
+
+CITIES = ["Lisbon", "Tokyo", "Nairobi", "Lima", "Oslo", "Hanoi", "Denver", "Porto", "Seoul", "Cairo",
+          "Quito", "Perth", "Dublin", "Bogota", "Athens", "Munich", "Havana", "Osaka", "Zurich", "Accra"]
+AIRLINES = ["LH", "BA", "AF", "UA", "QR", "EK", "TK", "NH", "KL", "LX"]
+HOTELS = ["Marriott", "Hilton", "Ibis", "Hyatt", "Novotel", "Radisson", "Sheraton", "Kempinski"]
+PREFERENCES = [
+    ("prefers aisle seats on long flights", "does the user like aisle seats"),
+    ("is vegetarian and orders the vegetarian meal", "what food does the user eat on planes"),
+    ("always wants a hotel room on a high floor", "which floor does the user want at hotels"),
+    ("avoids red-eye flights", "does the user fly overnight"),
+    ("is a gold member of the airline lounge programme", "airline status of the user"),
+    ("needs wheelchair assistance at airports", "does the user need mobility help at the airport"),
+    ("likes boutique hotels close to the old town", "what kind of hotels does the user like"),
+    ("travels with a large camera bag as cabin luggage", "what hand luggage does the user carry"),
+]
+
+
+class FakeUserCache:
+    """Stands in for MongoDB: the benchmark user exists and has no contacts"""
+
+    def get_user(self, user_id, by="uid"):
+        return {"_id": user_id, "Contacts": []}
+
+
+def confirmation_code(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+
+
+def make_dataset(count: int, query_count: int, seed: int) -> Tuple[List[str], List[Tuple[str, int, str]]]:
+    """
+    Returns:
+        memories, and queries as (query text, index of the relevant memory, kind)
+    """
+    rng = random.Random(seed)
+    memories, queries = [], []
+    for i in range(count):
+        city, other = rng.sample(CITIES, 2)
+        kind = i % 4
+        if kind == 0:
+            flight = f"{rng.choice(AIRLINES)}{rng.randint(100, 9999)}"
+            text = (f"User is booked on flight {flight} from {city} to {other} on "
+                    f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+            queries.append((f"flight {flight[:2]} {flight[2:]}", i, "exact"))
+        elif kind == 1:
+            code = confirmation_code(rng)
+            text = f"Hotel {rng.choice(HOTELS)} {city} reservation confirmation {code} for {rng.randint(2, 9)} nights"
+            queries.append((f"what was booking {code} about", i, "exact"))
+        elif kind == 2:
+            email = f"{rng.choice(['anna', 'li', 'omar', 'sara', 'ken'])}.{i}@travel-example.com"
+            text = f"Send the {city} itinerary to the travel agent at {email}"
+            queries.append((f"who is {email}", i, "exact"))
+        else:
+            preference, question = rng.choice(PREFERENCES)
+            text = f"When travelling to {city} the user {preference}"
+            queries.append((f"{question} in {city}", i, "semantic"))
+        memories.append(text)
+
+    rng.shuffle(queries)
+    return memories, queries[:query_count]
+
+
+def load(service: MemoryService, memories: List[str]):
+    for start in range(0, len(memories), 500):
+        chunk = memories[start:start + 500]
+        response = service.add_memories_batch(AddMemoriesBatchRequest(
+            user_id=USER_ID, memories=[BatchMemoryItem(memory=text) for text in chunk]
+        ))
+        if response.failed_count:
+            raise RuntimeError(f"{response.failed_count} memories failed to load")
+
+
+def evaluate(service: MemoryService, memories: List[str], queries: List[Tuple[str, int, str]],
+             k: int) -> Dict[str, Dict[str, Any]]:
+    """recall@k, MRR and latency per query kind"""
+    outcomes: Dict[str, Dict[str, list]] = {}
+    for text, relevant, kind in queries:
+        started = time.perf_counter()
+        response = service.search_memories(SearchMemoryRequest(user_id=USER_ID, query=text, n_results=k))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        found = [memory.memory for memory in response.memories]
+        rank = found.index(memories[relevant]) + 1 if memories[relevant] in found else None
+        for bucket in (kind, "all"):
+            outcome = outcomes.setdefault(bucket, {"hits": [], "reciprocal_ranks": [], "latencies": []})
+            outcome["hits"].append(rank is not None)
+            outcome["reciprocal_ranks"].append(1 / rank if rank else 0.0)
+            outcome["latencies"].append(elapsed_ms)
+
+    return {
+        bucket: {
+            "queries": len(outcome["hits"]),
+            "recall": round(sum(outcome["hits"]) / len(outcome["hits"]), 3),
+            "mrr": round(statistics.mean(outcome["reciprocal_ranks"]), 3),
+            "p50_ms": round(statistics.median(outcome["latencies"]), 2),
+            "p95_ms": round(sorted(outcome["latencies"])[int(len(outcome["latencies"]) * 0.95) - 1], 2)
+        }
+        for bucket, outcome in outcomes.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory search relevance and latency benchmark")
+    parser.add_argument("--memories", type=int, default=2000, help="Synthetic memories to store")
+    parser.add_argument("--queries", type=int, default=200, help="Labelled queries to run")
+    parser.add_argument("--k", type=int, default=5, help="Results per search (recall@k)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("🚀 Memory Search Benchmark")
+    print("=" * 50)
+    memories, queries = make_dataset(args.memories, args.queries, args.seed)
+    manager = ChromaManager(backend="local", local_path="")
+    print(f"📦 {len(memories):,} memories, {len(queries)} queries, embeddings: "
+          f"{'service' if os.getenv('EMBEDDING_SERVICE_URL') else 'local hashing'}")
+
+    loader = MemoryService(None, manager, layout=MemoryLayout(PER_CONTACT_LAYOUT),
+                           user_cache=FakeUserCache(), dedup_mode="off", search_mode="vector")
+    started = time.perf_counter()
+    load(loader, memories)
+    print(f"⏱️  Loaded in {time.perf_counter() - started:.1f}s")
+
+    print(f"\n{'mode':>8} {'queries':>10} {'n':>5} {f'recall@{args.k}':>10} {'MRR':>7} {'p50 ms':>9} {'p95 ms':>9}")
+    for mode in MODES:
+        service = MemoryService(None, manager, layout=MemoryLayout(PER_CONTACT_LAYOUT),
+                                user_cache=FakeUserCache(), dedup_mode="off", search_mode=mode)
+        if mode == "hybrid":
+            # Build the keyword index up front so the first query's latency is comparable
+            started = time.perf_counter()
+            service.lexical_index.get(USER_ID)
+            print(f"{'':>8} (keyword index built in {(time.perf_counter() - started) * 1000:.0f} ms)")
+        results = evaluate(service, memories, queries, args.k)
+        for bucket in ("exact", "semantic", "all"):
+            stats = results.get(bucket)
+            if stats:
+                print(f"{mode:>8} {bucket:>10} {stats['queries']:>5} {stats['recall']:>10} "
+                      f"{stats['mrr']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Insert throughput benchmark for status updates
+
+Compares three write paths of StatusService:
+- single:   one insert_one per update (one /api/status/write call each)
+- batch:    /api/status/write_batch, one insert_many(ordered=False) per batch
+- buffered: one /api/status/write call per update, grouped by the write-behind buffer
+
+Against MongoDB (uses a scratch database that is dropped afterwards):
+    MONGODB_URL=mongodb://localhost:27017 python benchmark_status_writes.py
+
+Without a server, with a simulated per-round-trip latency:
+    python benchmark_status_writes.py --simulate --rtt-ms 2
+"""
+
+import os
+import time
+import uuid
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Callable
+
+from models import WriteStatusUpdateRequest, WriteStatusUpdatesBatchRequest
+
+
+class SimulatedCollection:
+    """Stands in for a collection with a fixed network round trip per call"""
+
+    def __init__(self, rtt_ms: float, per_document_us: float):
+        self.rtt = rtt_ms / 1000
+        self.per_document = per_document_us / 1_000_000
+        self.count = 0
+
+    def insert_one(self, document: Dict[str, Any]):
+        time.sleep(self.rtt + self.per_document)
+        self.count += 1
+        return type("InsertOneResult", (), {"inserted_id": document["_id"]})()
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        time.sleep(self.rtt + self.per_document * len(documents))
+        self.count += len(documents)
+
+
+class BenchmarkDatabase:
+    def __init__(self, collection):
+        self.status_updates = collection
+
+    def is_connected(self, force: bool = False) -> bool:
+        return True
+
+
+def make_updates(count: int, conversation_id: str) -> List[WriteStatusUpdateRequest]:
+    return [
+        WriteStatusUpdateRequest(
+            agent_id="benchmark-agent",
+            agent_type="benchmark",
+            conversation_id=conversation_id,
+            update=f"Benchmark status update {i}: step completed"
+        )
+        for i in range(count)
+    ]
+
+
+def measure(label: str, total: int, run: Callable[[], None]) -> float:
+    started = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed
+    print(f"{label:>10} {total:>8} {elapsed:>10.2f} {rate:>12,.0f}")
+    return rate
+
+
+def run_benchmark(collection, total: int, writers: int, batch_size: int) -> Dict[str, float]:
+    """Insert `total` updates through each write path"""
+    # Imported late so the buffer settings below apply to the buffered service only
+    from status_service import StatusService
+    from status_events import StatusEventBus
+
+    database = BenchmarkDatabase(collection)
+    print(f"\n{'path':>10} {'updates':>8} {'seconds':>10} {'inserts/s':>12}")
+
+    os.environ["STATUS_WRITE_BUFFER"] = "false"
+    service = StatusService(database, StatusEventBus())
+    updates = make_updates(total, f"bench-{uuid.uuid4().hex[:8]}")
+
+    def single():
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            list(pool.map(service.write_status_update, updates))
+
+    def batch():
+        batches = [updates[i:i + batch_size] for i in range(0, total, batch_size)]
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            list(pool.map(lambda chunk: service.write_status_updates_batch(
+                WriteStatusUpdatesBatchRequest(updates=chunk)), batches))
+
+    os.environ["STATUS_WRITE_BUFFER"] = "true"
+    os.environ.setdefault("STATUS_WRITE_BUFFER_MAX_SIZE", str(batch_size))
+    buffered_service = StatusService(database, StatusEventBus())
+
+    def buffered():
+        with ThreadPoolExecutor(max_workers=writers) as pool:
+            list(pool.map(buffered_service.write_status_update, updates))
+        # Count the time until everything is actually stored
+        buffered_service.close()
+
+    return {
+        "single": measure("single", total, single),
+        "batch": measure("batch", total, batch),
+        "buffered": measure("buffered", total, buffered)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Status update insert throughput benchmark")
+    parser.add_argument("--mongodb-url", default=os.getenv("MONGODB_URL"), help="MongoDB to benchmark against")
+    parser.add_argument("--updates", type=int, default=5000, help="Updates per write path")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent writers")
+    parser.add_argument("--batch-size", type=int, default=100, help="Updates per insert_many")
+    parser.add_argument("--simulate", action="store_true", help="Use a simulated collection instead of MongoDB")
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="Simulated round trip per call")
+    parser.add_argument("--per-document-us", type=float, default=20.0, help="Simulated server cost per document")
+    args = parser.parse_args()
+
+    print("🚀 Status Update Write Benchmark")
+    print("=" * 50)
+
+    if args.simulate or not args.mongodb_url:
+        print(f"Simulated collection: {args.rtt_ms} ms per round trip, {args.per_document_us} µs per document")
+        results = run_benchmark(
+            SimulatedCollection(args.rtt_ms, args.per_document_us),
+            args.updates, args.writers, args.batch_size
+        )
+    else:
+        from pymongo import MongoClient
+
+        client = MongoClient(args.mongodb_url, serverSelectionTimeoutMS=5000)
+        database = client[f"status_benchmark_{uuid.uuid4().hex[:8]}"]
+        try:
+            results = run_benchmark(database.Status_updates, args.updates, args.writers, args.batch_size)
+        finally:
+            client.drop_database(database.name)
+            client.close()
+
+    print("\n📊 Speedup over single inserts")
+    for path in ("batch", "buffered"):
+        print(f"  {path}: {results[path] / results['single']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,15 +6,25 @@ import requests
 import numpy as np
 import base64
 import sys
-from typing import List, Union, Dict, Any, Optional
+from typing import List, Union, Dict, Any, Optional, Tuple, Iterator
 import os
 from dotenv import load_dotenv
 import chromadb
 from chromadb.config import Settings
 from fastapi import HTTPException
 import logging
-import traceback
 import json
+import time
+import threading
+
+try:
+    from chromadb.errors import NotFoundError as CollectionNotFoundError
+except ImportError:
+    CollectionNotFoundError = ValueError
+
+from embedding_client import EmbeddingClient
+from local_vector_store import LocalVectorClient, HashingEmbeddingFunction
+import request_metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -73,16 +83,18 @@ def test_chroma_connection():
 class RemoteEmbeddingFunction:
     """A class that mimics ChromaDB's EmbeddingFunction interface"""
     
-    def __init__(self, api_url: str = None):
+    def __init__(self, api_url: str = None, client: Optional[EmbeddingClient] = None):
         """Initialize with the API URL"""
         if api_url is None:
             api_url = os.getenv("EMBEDDING_SERVICE_URL", "http://localhost:5000")
         self.api_url = api_url.rstrip('/')
         
+        # Batched, cached client with a pooled keep-alive session
+        self.client = client or EmbeddingClient.from_env(self.api_url)
+        
         # Test connection
         try:
-            response = requests.get(f"{self.api_url}/", timeout=5)
-            if response.status_code != 200:
+            if not self.client.ping(timeout=5):
                 raise ConnectionError(f"Failed to connect to embedding service at {self.api_url}")
         except Exception as e:
             raise ConnectionError(f"Failed to connect to embedding service at {self.api_url}: {str(e)}")
@@ -103,26 +115,23 @@ class RemoteEmbeddingFunction:
         if isinstance(input, str):
             input = [input]
             
-        # Call the API
-        response = requests.post(
-            f"{self.api_url}/embed",
-            json={"texts": input},
-            timeout=30
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"API call failed: {response.json().get('error', 'Unknown error')}")
-            
-        # Convert to numpy array
-        embeddings = np.array(response.json()['embeddings'], dtype=np.float32)
-        return embeddings
+        return self.client.embed(list(input))
+
+    def embed_query(self, input: Union[str, List[str]]) -> np.ndarray:
+        """Embed query texts (ChromaDB calls this for query_texts)"""
+        return self(input)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return cache and batching metrics of the underlying client"""
+        return self.client.get_metrics()
 
 
 class ChromaManager:
     """Manager for ChromaDB operations with remote embedding support"""
     
     def __init__(self, host: str = None, port: int = None, 
-                 auth_token: Optional[str] = None, embedding_api_url: Optional[str] = None):
+                 auth_token: Optional[str] = None, embedding_api_url: Optional[str] = None,
+                 backend: Optional[str] = None, local_path: Optional[str] = None):
         """
         Initialize ChromaDB client
         
@@ -131,23 +140,39 @@ class ChromaManager:
             port: ChromaDB server port (defaults to env CHROMA_PORT)
             auth_token: Optional authentication token (defaults to env CHROMA_SERVER_AUTHN_CREDENTIALS)
             embedding_api_url: URL for our local embedding API (defaults to env EMBEDDING_SERVICE_URL)
+            backend: "http" for a Chroma server or "local" for the embedded store (defaults to env CHROMA_BACKEND)
+            local_path: Directory of the embedded store; in-memory when empty (defaults to env CHROMA_LOCAL_PATH)
         """
         # Use environment variables as defaults
         self.host = host or os.getenv("CHROMA_HOST", "35.195.71.55")
         self.port = port or int(os.getenv("CHROMA_PORT", "8000"))
         self.auth_token = auth_token or os.getenv("CHROMA_SERVER_AUTHN_CREDENTIALS")
+        self.backend = (backend or os.getenv("CHROMA_BACKEND", "http")).strip().lower()
+        self.local_path = local_path if local_path is not None else os.getenv("CHROMA_LOCAL_PATH", "")
+        
+        # Collection handle cache (avoids a get_or_create round trip per operation)
+        self.collection_cache_ttl = float(os.getenv("CHROMA_COLLECTION_CACHE_TTL_SECONDS", "300"))
+        self._collection_cache: Dict[str, Tuple[Any, float]] = {}
+        self._collection_lock = threading.Lock()
         
         # Initialize embedding function
         self.embedding_api_url = embedding_api_url or os.getenv("EMBEDDING_SERVICE_URL")
         if self.embedding_api_url:
             self.embedding_function = RemoteEmbeddingFunction(api_url=self.embedding_api_url)
             logger.info(f"Using remote embedding function at {self.embedding_api_url}")
+        elif self.is_local:
+            # The embedded store cannot fall back to an on-server embedding function
+            self.embedding_function = HashingEmbeddingFunction()
+            logger.warning("No embedding API URL provided. Local collections will use hashing embeddings.")
         else:
             self.embedding_function = None
             logger.warning("No embedding API URL provided. Collections will use default on-server embedding function.")
         
         # Configure ChromaDB client
-        if self.auth_token:
+        if self.is_local:
+            self.client = LocalVectorClient(self.local_path)
+            logger.info(f"Using local vector store at {self.local_path or '(in memory)'}")
+        elif self.auth_token:
             # Encode credentials for Basic Auth
             encoded_credentials = base64.b64encode(self.auth_token.encode()).decode()
             
@@ -187,6 +212,18 @@ class ChromaManager:
         except Exception as e:
             logger.error(f"ChromaDB connection test failed: {e}")
 
+    @property
+    def is_local(self) -> bool:
+        """True when vectors are stored in-process rather than on a Chroma server"""
+        return self.backend == "local"
+
+    @property
+    def location(self) -> str:
+        """Where the vectors live, for status and health reports"""
+        if self.is_local:
+            return f"local:{self.local_path or 'memory'}"
+        return f"{self.host}:{self.port}"
+
     def health_check(self) -> Dict[str, Any]:
         """Check if ChromaDB server is accessible"""
         try:
@@ -195,7 +232,7 @@ class ChromaManager:
             return {
                 "status": "healthy",
                 "heartbeat": heartbeat,
-                "host": f"{self.host}:{self.port}",
+                "host": self.location,
                 "auth_enabled": bool(self.auth_token)
             }
         except Exception as e:
@@ -203,13 +240,14 @@ class ChromaManager:
             return {
                 "status": "unhealthy", 
                 "error": str(e),
-                "host": f"{self.host}:{self.port}",
+                "host": self.location,
                 "auth_enabled": bool(self.auth_token)
             }
 
     def list_collections(self) -> Dict[str, Any]:
         """List all collections"""
         try:
+            request_metrics.increment("chroma_control_plane_calls")
             collections = self.client.list_collections()
             logger.info(f"Found {len(collections)} collections")
             collection_names = [col.name for col in collections]
@@ -235,6 +273,8 @@ class ChromaManager:
         """
         Get or create a collection with the configured embedding function.
         
+        Handles are cached, so only the first call per TTL window reaches the server.
+        
         Args:
             collection_name: Name of the collection
             metadata: Optional metadata for the collection
@@ -242,6 +282,10 @@ class ChromaManager:
         Returns:
             ChromaDB collection object
         """
+        collection = self._get_cached_collection(collection_name)
+        if collection is not None:
+            return collection
+        
         try:
             logger.info(f"Getting or creating collection '{collection_name}'")
             
@@ -250,6 +294,7 @@ class ChromaManager:
                 metadata = {"created_by": "prosus-global-tools", "type": "user_collection"}
             
             # Create collection with our configured embedding function
+            request_metrics.increment("chroma_control_plane_calls")
             collection = self.client.get_or_create_collection(
                 name=collection_name,
                 metadata=metadata,
@@ -257,20 +302,83 @@ class ChromaManager:
             )
             
             logger.info(f"Successfully got/created collection '{collection_name}'")
+            self._cache_collection(collection_name, collection)
             return collection
             
         except Exception as e:
             error_msg = f"ChromaDB collection creation error for '{collection_name}': {e}"
-            logger.error(error_msg)
-            logger.error(f"Error type: {type(e).__name__}")
-            logger.error(f"Host: {self.host}:{self.port}, Auth: {'Yes' if self.auth_token else 'No'}")
-            logger.error("Traceback:")
-            logger.error(traceback.format_exc())
+            logger.error(f"{error_msg} ({type(e).__name__}, host: {self.location}, "
+                         f"auth: {'Yes' if self.auth_token else 'No'})")
+            logger.debug("Traceback:", exc_info=True)
             raise Exception(error_msg)
 
+    def get_collection(self, collection_name: str) -> Optional[Any]:
+        """
+        Get an existing collection without creating it. Used by read-only operations.
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            ChromaDB collection object, or None if the collection does not exist
+        """
+        collection = self._get_cached_collection(collection_name)
+        if collection is not None:
+            return collection
+        
+        try:
+            request_metrics.increment("chroma_control_plane_calls")
+            collection = self.client.get_collection(
+                name=collection_name,
+                embedding_function=self.embedding_function
+            )
+        except CollectionNotFoundError:
+            return None
+        except Exception as e:
+            # Older clients report a missing collection as a generic error
+            if "does not exist" in str(e):
+                return None
+            raise
+        
+        self._cache_collection(collection_name, collection)
+        return collection
+
+    def _get_cached_collection(self, collection_name: str) -> Optional[Any]:
+        """Return a cached collection handle if it has not expired"""
+        if self.collection_cache_ttl <= 0:
+            return None
+        
+        with self._collection_lock:
+            entry = self._collection_cache.get(collection_name)
+            if entry is None:
+                return None
+            collection, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._collection_cache[collection_name]
+                return None
+        
+        request_metrics.increment("chroma_collection_cache_hits")
+        return collection
+
+    def _cache_collection(self, collection_name: str, collection: Any):
+        """Remember a collection handle for the configured TTL"""
+        if self.collection_cache_ttl <= 0:
+            return
+        
+        with self._collection_lock:
+            self._collection_cache[collection_name] = (
+                collection, time.monotonic() + self.collection_cache_ttl
+            )
+
+    def invalidate_collection(self, collection_name: str):
+        """Drop a cached collection handle (e.g. after it was deleted or failed)"""
+        with self._collection_lock:
+            self._collection_cache.pop(collection_name, None)
+
     def add_documents(self, collection_name: str, documents: List[str], 
                      metadatas: Optional[List[Dict]] = None, 
-                     ids: Optional[List[str]] = None) -> Dict[str, Any]:
+                     ids: Optional[List[str]] = None,
+                     embeddings: Optional[List[List[float]]] = None) -> Dict[str, Any]:
         """
         Add documents to a collection. Embeddings are handled by the collection's embedding function.
         
@@ -279,6 +387,7 @@ class ChromaManager:
             documents: List of document texts
             metadatas: Optional list of metadata dicts
             ids: Optional list of document IDs
+            embeddings: Optional pre-computed embeddings (skips the embedding function)
             
         Returns:
             Result information
@@ -291,12 +400,17 @@ class ChromaManager:
                 import uuid
                 ids = [str(uuid.uuid4()) for _ in documents]
             
-            # Add documents. ChromaDB will use the collection's embedding function.
-            collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
-            )
+            # Add documents. ChromaDB will use the collection's embedding function
+            # unless embeddings were already computed.
+            add_params = {
+                "documents": documents,
+                "metadatas": metadatas,
+                "ids": ids
+            }
+            if embeddings is not None:
+                add_params["embeddings"] = embeddings
+            
+            collection.add(**add_params)
             
             logger.info(f"Added {len(documents)} documents to collection '{collection_name}'")
             return {
@@ -306,12 +420,25 @@ class ChromaManager:
             }
             
         except Exception as e:
+            self.invalidate_collection(collection_name)
             logger.error(f"Failed to add documents to '{collection_name}': {e}")
             raise
 
-    def query_documents(self, collection_name: str, query_texts: List[str], 
+    def embed_texts(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Embed texts with the configured embedding function.
+        
+        Returns:
+            A numpy array of embeddings, or None when collections use the on-server embedding function
+        """
+        if self.embedding_function is None:
+            return None
+        return self.embedding_function(texts)
+
+    def query_documents(self, collection_name: str, query_texts: Optional[List[str]] = None, 
                        n_results: int = 10, where: Optional[Dict] = None,
-                       include: Optional[List[str]] = None) -> Dict[str, Any]:
+                       include: Optional[List[str]] = None,
+                       query_embeddings: Optional[List[List[float]]] = None) -> Dict[str, Any]:
         """
         Query documents in a collection. Embeddings are handled by the collection's embedding function.
         
@@ -321,18 +448,33 @@ class ChromaManager:
             n_results: Number of results to return
             where: Optional metadata filter
             include: Optional list of fields to include in results
+            query_embeddings: Optional pre-computed query vectors, used instead of query_texts
             
         Returns:
             Query results
         """
         try:
-            collection = self.get_or_create_collection(collection_name)
+            collection = self.get_collection(collection_name)
+            query_count = len(query_embeddings if query_embeddings is not None else query_texts)
+            if collection is None:
+                # Searching a missing collection must not create it
+                return {
+                    "collection": collection_name,
+                    "results": self._empty_query_results(query_count, include),
+                    "query_count": query_count
+                }
             
-            # Prepare query parameters
-            query_params = {
-                "query_texts": query_texts,
-                "n_results": n_results
-            }
+            # Prepare query parameters. Pre-computed vectors skip the embedding call.
+            if query_embeddings is not None:
+                query_params = {
+                    "query_embeddings": query_embeddings,
+                    "n_results": n_results
+                }
+            else:
+                query_params = {
+                    "query_texts": query_texts,
+                    "n_results": n_results
+                }
             
             if where:
                 query_params["where"] = where
@@ -347,18 +489,100 @@ class ChromaManager:
             return {
                 "collection": collection_name,
                 "results": results,
-                "query_count": len(query_texts)
+                "query_count": query_count
             }
             
         except Exception as e:
+            self.invalidate_collection(collection_name)
             logger.error(f"Failed to query collection '{collection_name}': {e}")
             raise
 
+    def iter_query_documents(self, collection_name: str, query_texts: List[str],
+                             n_results: int = 10, where: Optional[Dict] = None,
+                             include: Optional[List[str]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Query documents one query text at a time, for streaming responses.
+        
+        All query texts are embedded with one call up front; each query then
+        runs on its own, so only one query's hits are held in memory.
+        
+        Yields:
+            (query index, that query's results with one list per field)
+        """
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            # Searching a missing collection must not create it
+            return
+        
+        query_embeddings = self.embed_texts(query_texts)
+        for i, query_text in enumerate(query_texts):
+            if query_embeddings is not None:
+                query_params = {"query_embeddings": [query_embeddings[i]], "n_results": n_results}
+            else:
+                query_params = {"query_texts": [query_text], "n_results": n_results}
+            if where:
+                query_params["where"] = where
+            if include:
+                query_params["include"] = include
+            
+            try:
+                results = collection.query(**query_params)
+            except Exception as e:
+                self.invalidate_collection(collection_name)
+                logger.error(f"Failed to query collection '{collection_name}': {e}")
+                raise
+            
+            yield i, {
+                field: values[0] for field, values in results.items()
+                if field != "included" and values is not None
+            }
+
+    def get_documents(self, collection_name: str, ids: Optional[List[str]] = None,
+                      where: Optional[Dict] = None, include: Optional[List[str]] = None,
+                      limit: Optional[int] = None, offset: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get documents from a collection by ID and/or metadata filter, without a similarity search.
+        
+        Args:
+            collection_name: Name of the collection
+            ids: Optional list of document IDs
+            where: Optional metadata filter
+            include: Optional list of fields to include (e.g. documents, metadatas, embeddings)
+            limit: Optional page size
+            offset: Optional page offset
+            
+        Returns:
+            ChromaDB get result (ids plus the included fields)
+        """
+        try:
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return self._empty_get_results(include)
+            
+            get_params = {}
+            if ids is not None:
+                get_params["ids"] = ids
+            if where:
+                get_params["where"] = where
+            if include is not None:
+                get_params["include"] = include
+            if limit is not None:
+                get_params["limit"] = limit
+            if offset is not None:
+                get_params["offset"] = offset
+            
+            return collection.get(**get_params)
+            
+        except Exception as e:
+            self.invalidate_collection(collection_name)
+            logger.error(f"Failed to get documents from '{collection_name}': {e}")
+            raise
+
     def get_collection_info(self, collection_name: str) -> Dict[str, Any]:
         """Get information about a collection"""
         try:
-            collection = self.get_or_create_collection(collection_name)
-            count = collection.count()
+            collection = self.get_collection(collection_name)
+            count = collection.count() if collection is not None else 0
             
             # Check if embedding function is available
             embedding_function_available = self.embedding_function is not None
@@ -371,16 +595,18 @@ class ChromaManager:
             return {
                 "name": collection_name,
                 "document_count": count,
-                "metadata": collection.metadata or {},
+                "metadata": (collection.metadata or {}) if collection is not None else {},
                 "embedding_function_available": embedding_function_available
             }
         except Exception as e:
+            self.invalidate_collection(collection_name)
             logger.error(f"Failed to get collection info for '{collection_name}': {e}")
             raise
 
     def update_documents(self, collection_name: str, ids: List[str], 
                         documents: Optional[List[str]] = None,
-                        metadatas: Optional[List[Dict]] = None) -> Dict[str, Any]:
+                        metadatas: Optional[List[Dict]] = None,
+                        embeddings: Optional[List[List[float]]] = None) -> Dict[str, Any]:
         """
         Update documents in a collection. Embeddings are handled by the collection's embedding function.
         
@@ -389,6 +615,7 @@ class ChromaManager:
             ids: List of document IDs to update
             documents: Optional new document texts
             metadatas: Optional new metadata
+            embeddings: Optional pre-computed embeddings of the new documents
             
         Returns:
             Update result
@@ -404,6 +631,9 @@ class ChromaManager:
             if metadatas:
                 update_params["metadatas"] = metadatas
             
+            if embeddings is not None:
+                update_params["embeddings"] = embeddings
+            
             collection.update(**update_params)
             
             logger.info(f"Updated {len(ids)} documents in collection '{collection_name}'")
@@ -414,13 +644,20 @@ class ChromaManager:
             }
             
         except Exception as e:
+            self.invalidate_collection(collection_name)
             logger.error(f"Failed to update documents in '{collection_name}': {e}")
             raise
 
     def delete_documents(self, collection_name: str, ids: List[str]) -> Dict[str, Any]:
         """Delete documents from a collection"""
         try:
-            collection = self.get_or_create_collection(collection_name)
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return {
+                    "collection": collection_name,
+                    "deleted_count": 0,
+                    "deleted_ids": []
+                }
             collection.delete(ids=ids)
             
             logger.info(f"Deleted {len(ids)} documents from collection '{collection_name}'")
@@ -431,12 +668,15 @@ class ChromaManager:
             }
             
         except Exception as e:
+            self.invalidate_collection(collection_name)
             logger.error(f"Failed to delete documents from '{collection_name}': {e}")
             raise
 
     def delete_collection(self, collection_name: str) -> Dict[str, Any]:
         """Delete a collection"""
+        self.invalidate_collection(collection_name)
         try:
+            request_metrics.increment("chroma_control_plane_calls")
             self.client.delete_collection(name=collection_name)
             logger.info(f"Deleted collection '{collection_name}'")
             return {
@@ -447,6 +687,39 @@ class ChromaManager:
             logger.error(f"Failed to delete collection '{collection_name}': {e}")
             raise
 
+    @staticmethod
+    def _empty_query_results(query_count: int, include: Optional[List[str]]) -> Dict[str, Any]:
+        """Query result shape for a collection with no documents"""
+        fields = include or ["documents", "metadatas", "distances"]
+        results = {"ids": [[] for _ in range(query_count)]}
+        for field in fields:
+            results[field] = [[] for _ in range(query_count)]
+        return results
+
+    @staticmethod
+    def _empty_get_results(include: Optional[List[str]]) -> Dict[str, Any]:
+        """Get result shape for a collection with no documents"""
+        fields = include if include is not None else ["documents", "metadatas"]
+        results = {"ids": []}
+        for field in fields:
+            results[field] = []
+        return results
+
+    def get_collection_cache_stats(self) -> Dict[str, Any]:
+        """Get the size and TTL of the collection handle cache"""
+        with self._collection_lock:
+            cached = len(self._collection_cache)
+        return {
+            "cached_collections": cached,
+            "ttl_seconds": self.collection_cache_ttl
+        }
+
+    def get_embedding_metrics(self) -> Optional[Dict[str, Any]]:
+        """Get cache hit rate and batch-size metrics of the embedding client"""
+        if self.embedding_function is None:
+            return None
+        return self.embedding_function.get_metrics()
+
     def is_connected(self) -> bool:
         """Check if ChromaDB connection is available"""
         try:
@@ -463,7 +736,7 @@ class ChromaManager:
                 return {
                     "status": "disconnected",
                     "message": "ChromaDB connection not available",
-                    "host": f"{self.host}:{self.port}",
+                    "host": self.location,
                     "embedding_service": self.embedding_api_url,
                     "authentication_enabled": bool(self.auth_token)
                 }
@@ -479,17 +752,18 @@ class ChromaManager:
             return {
                 "status": "connected",
                 "message": "ChromaDB is operational",
-                "host": f"{self.host}:{self.port}",
+                "host": self.location,
                 "embedding_service": self.embedding_api_url,
                 "authentication_enabled": bool(self.auth_token),
                 "collection_count": len(collection_names),
-                "collections": collection_names
+                "collections": collection_names,
+                "embedding_metrics": self.get_embedding_metrics()
             }
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Error getting ChromaDB status: {str(e)}",
-                "host": f"{self.host}:{self.port}",
+                "host": self.location,
                 "authentication_enabled": bool(self.auth_token)
             }
 
@@ -2,7 +2,8 @@
 ChromaDB service for handling vector database operations
 """
 
-from typing import Dict, Any, List, Optional
+import json
+from typing import Dict, Any, List, Optional, Iterator
 from fastapi import HTTPException
 from datetime import datetime
 
@@ -11,10 +12,35 @@ from models import (
     DeleteDocumentsRequest, CollectionInfoResponse, CollectionListResponse
 )
 from validation import validate_user_id
+from hybrid_search import LexicalIndexCache
+
+# NDJSON hit fields for the plural Chroma result fields
+_HIT_FIELDS = {
+    "ids": "id",
+    "documents": "document",
+    "metadatas": "metadata",
+    "distances": "distance",
+    "embeddings": "embedding",
+    "uris": "uri"
+}
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize numpy values (embeddings, distances) in NDJSON records"""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 
 class ChromaService:
-    def __init__(self, chroma_manager):
+    def __init__(self, chroma_manager, lexical_index: Optional[LexicalIndexCache] = None):
+        """
+        Args:
+            lexical_index: Keyword indexes of memory search, kept in step with
+                documents changed through these endpoints
+        """
         self.chroma_manager = chroma_manager
+        self.lexical_index = lexical_index
 
     def add_documents(self, request: AddDocumentsRequest) -> Dict[str, Any]:
         """Add documents to a ChromaDB collection"""
@@ -63,11 +89,88 @@ class ChromaService:
             metadatas=request.metadatas
         )
         
+        if self.lexical_index is not None:
+            metadatas = request.metadatas or [None] * len(request.ids)
+            for doc_id, document, metadata in zip(request.ids, request.documents, metadatas):
+                self.lexical_index.add(collection_name, doc_id, document, metadata)
+        
         result["timestamp"] = datetime.utcnow().isoformat()
         return result
 
     def query_documents(self, request: QueryDocumentsRequest) -> Dict[str, Any]:
         """Query documents from a ChromaDB collection"""
+        collection_name = self._validate_query_request(request)
+        
+        # Query documents using ChromaManager
+        result = self.chroma_manager.query_documents(
+            collection_name=collection_name,
+            query_texts=request.query_texts,
+            n_results=request.n_results,
+            where=request.where,
+            include=request.include
+        )
+        
+        result["timestamp"] = datetime.utcnow().isoformat()
+        return result
+
+    def stream_query_documents(self, request: QueryDocumentsRequest) -> Iterator[str]:
+        """
+        Query documents and return NDJSON lines, one per (query, hit).
+        
+        The request is validated before returning, so invalid requests still
+        fail with an HTTP error. The returned iterator runs one query at a
+        time: each hit is a {"type": "hit", ...} line, the last line is
+        {"type": "end", ...}, or {"type": "error", ...} if a query failed
+        after the response started.
+        """
+        collection_name = self._validate_query_request(request)
+        return self._ndjson_query_records(collection_name, request)
+
+    def _ndjson_query_records(self, collection_name: str, request: QueryDocumentsRequest) -> Iterator[str]:
+        total_hits = 0
+        queries_done = 0
+        try:
+            for query_index, results in self.chroma_manager.iter_query_documents(
+                collection_name=collection_name,
+                query_texts=request.query_texts,
+                n_results=request.n_results,
+                where=request.where,
+                include=request.include
+            ):
+                ids = results.get("ids") or []
+                for rank, _ in enumerate(ids):
+                    record = {
+                        "type": "hit",
+                        "query_index": query_index,
+                        "query": request.query_texts[query_index],
+                        "rank": rank + 1
+                    }
+                    for field, values in results.items():
+                        if values is not None and rank < len(values):
+                            record[_HIT_FIELDS.get(field, field)] = values[rank]
+                    yield json.dumps(record, default=_json_default) + "\n"
+                total_hits += len(ids)
+                queries_done += 1
+        except Exception as e:
+            yield json.dumps({
+                "type": "error",
+                "error": "Query Failed",
+                "message": str(e),
+                "query_index": queries_done,
+                "endpoint": "/api/vector/documents/query"
+            }) + "\n"
+            return
+        
+        yield json.dumps({
+            "type": "end",
+            "collection": collection_name,
+            "query_count": len(request.query_texts),
+            "total_hits": total_hits,
+            "timestamp": datetime.utcnow().isoformat()
+        }) + "\n"
+
+    def _validate_query_request(self, request: QueryDocumentsRequest) -> str:
+        """Validate a query request and return its collection name"""
         # Validate inputs
         if not request.query_texts:
             raise HTTPException(
@@ -92,19 +195,7 @@ class ChromaService:
             )
         
         # Validate collection name
-        collection_name = self._validate_collection_name(request.collection_name)
-        
-        # Query documents using ChromaManager
-        result = self.chroma_manager.query_documents(
-            collection_name=collection_name,
-            query_texts=request.query_texts,
-            n_results=request.n_results,
-            where=request.where,
-            include=request.include
-        )
-        
-        result["timestamp"] = datetime.utcnow().isoformat()
-        return result
+        return self._validate_collection_name(request.collection_name)
 
     def update_documents(self, request: UpdateDocumentsRequest) -> Dict[str, Any]:
         """Update documents in a ChromaDB collection"""
@@ -164,6 +255,10 @@ class ChromaService:
             metadatas=request.metadatas
         )
         
+        # Partial updates leave the stored text or metadata to Chroma; rebuild from it
+        if self.lexical_index is not None:
+            self.lexical_index.invalidate(collection_name)
+        
         result["timestamp"] = datetime.utcnow().isoformat()
         return result
 
@@ -190,6 +285,10 @@ class ChromaService:
             ids=request.ids
         )
         
+        if self.lexical_index is not None:
+            for doc_id in request.ids:
+                self.lexical_index.remove(collection_name, doc_id)
+        
         result["timestamp"] = datetime.utcnow().isoformat()
         return result
 
@@ -218,6 +317,9 @@ class ChromaService:
         # Delete collection using ChromaManager
         result = self.chroma_manager.delete_collection(collection_name)
         
+        if self.lexical_index is not None:
+            self.lexical_index.invalidate(collection_name)
+        
         result["timestamp"] = datetime.utcnow().isoformat()
         return result
 
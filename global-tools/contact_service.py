@@ -4,7 +4,7 @@ Contact service for handling contact-related business logic
 
 import uuid
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from fastapi import HTTPException
 
 from models import Contact, ContactUpdate, ContactResponse, AddContactRequest, UpdateContactRequest
@@ -12,10 +12,17 @@ from validation import (
     validate_database_connection, validate_user_id, 
     validate_contact_fields, validate_update_fields, raise_validation_error
 )
+from user_cache import UserCache
+from contact_store import ContactStore
 
 class ContactService:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, user_cache: Optional[UserCache] = None,
+                 contact_store: Optional[ContactStore] = None):
         self.db_manager = db_manager
+        self.contact_store = contact_store or ContactStore(db_manager)
+        # Only invalidated here: contact reads use projected queries, which stay
+        # O(1) in the number of contacts even right after a write
+        self.user_cache = user_cache or UserCache(db_manager, contact_store=self.contact_store)
 
     def add_contact(self, request: AddContactRequest) -> Dict[str, Any]:
         """Add a new contact to a user's contact list"""
@@ -36,8 +43,8 @@ class ContactService:
         contact_document = self._build_contact_document(request.contact, contact_uid)
         
         # Check if user exists
-        user = self._get_user_by_id(user_id)
-        if not user:
+        storage = self._get_user_storage(user_id)
+        if not storage:
             raise HTTPException(
                 status_code=404,
                 detail={
@@ -49,10 +56,10 @@ class ContactService:
             )
         
         # Check for duplicate email
-        self._check_duplicate_email(user_id, request.contact.email)
+        self._check_duplicate_email(user_id, request.contact.email, storage)
         
         # Add contact to user's Contacts array
-        self._insert_contact_to_user(user_id, contact_document)
+        self._insert_contact_to_user(user_id, contact_document, storage)
         
         # Determine if contact is partial
         is_partial = any(v is None for v in [
@@ -84,8 +91,9 @@ class ContactService:
         raise_validation_error(errors, "/api/contacts/update", "Contact update information contains invalid fields")
         
         # Check if user exists and has the specified contact
-        user = self._get_user_with_contact(user_id, contact_uid)
-        if not user:
+        storage = self._get_user_storage(user_id)
+        contact = self._get_contact(user_id, contact_uid, storage) if storage else None
+        if not contact:
             raise HTTPException(
                 status_code=404,
                 detail={
@@ -99,14 +107,14 @@ class ContactService:
         
         # If email is being updated, check for duplicates
         if request.contact.email:
-            self._check_duplicate_email_for_update(user_id, contact_uid, request.contact.email)
+            self._check_duplicate_email_for_update(user_id, contact_uid, request.contact.email, storage)
         
         # Build and execute update
         update_doc = self._build_update_document(request.contact)
-        fields_updated = self._update_contact_in_db(user_id, contact_uid, update_doc)
+        fields_updated = self._update_contact_in_db(user_id, contact_uid, update_doc, storage)
         
         # Retrieve updated contact
-        updated_contact = self._get_updated_contact(user_id, contact_uid)
+        updated_contact = self._get_updated_contact(user_id, contact_uid, storage)
         
         return {
             "message": "Contact updated successfully",
@@ -125,8 +133,8 @@ class ContactService:
         user_id = validate_user_id(user_id, "User ID")
         
         # Query user and contacts
-        user = self._get_user_contacts_by_id(user_id)
-        if not user:
+        contacts = self._get_user_contacts_by_id(user_id)
+        if contacts is None:
             raise HTTPException(
                 status_code=404,
                 detail={
@@ -138,8 +146,6 @@ class ContactService:
                 }
             )
         
-        contacts = user.get("Contacts", [])
-        
         # Categorize contacts as complete or partial
         complete_contacts, partial_contacts = self._categorize_contacts(contacts)
         
@@ -185,10 +191,10 @@ class ContactService:
         
         return update_doc
 
-    def _get_user_by_id(self, user_id: str) -> Dict[str, Any]:
-        """Get user by ID"""
+    def _get_user_storage(self, user_id: str) -> Optional[str]:
+        """Check that the user exists and get where their contacts are stored"""
         try:
-            return self.db_manager.users.find_one({"uid": user_id})
+            return self.contact_store.get_user_storage(user_id)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -200,13 +206,10 @@ class ContactService:
                 }
             )
 
-    def _get_user_with_contact(self, user_id: str, contact_uid: str) -> Dict[str, Any]:
-        """Get user with specific contact"""
+    def _get_contact(self, user_id: str, contact_uid: str, storage: str) -> Optional[Dict[str, Any]]:
+        """Get a single contact of the user"""
         try:
-            return self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts.uid": contact_uid
-            })
+            return self.contact_store.get_contact(user_id, contact_uid, storage)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -218,13 +221,10 @@ class ContactService:
                 }
             )
 
-    def _get_user_contacts_by_id(self, user_id: str) -> Dict[str, Any]:
-        """Get user contacts by ID"""
+    def _get_user_contacts_by_id(self, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """Get user contacts by ID (None if the user does not exist)"""
         try:
-            return self.db_manager.users.find_one(
-                {"uid": user_id},
-                {"Contacts": 1, "_id": 0}
-            )
+            return self.contact_store.list_contacts(user_id)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -237,13 +237,10 @@ class ContactService:
                 }
             )
 
-    def _check_duplicate_email(self, user_id: str, email: str):
+    def _check_duplicate_email(self, user_id: str, email: str, storage: Optional[str] = None):
         """Check for duplicate email in user's contacts"""
         try:
-            existing_contact = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts.email": email
-            })
+            existing_contact = self.contact_store.email_in_use(user_id, email, storage=storage)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -267,18 +264,13 @@ class ContactService:
                 }
             )
 
-    def _check_duplicate_email_for_update(self, user_id: str, contact_uid: str, email: str):
+    def _check_duplicate_email_for_update(self, user_id: str, contact_uid: str, email: str,
+                                          storage: Optional[str] = None):
         """Check for duplicate email when updating contact"""
         try:
-            existing_email = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts": {
-                    "$elemMatch": {
-                        "email": email,
-                        "uid": {"$ne": contact_uid}
-                    }
-                }
-            })
+            existing_email = self.contact_store.email_in_use(
+                user_id, email, exclude_uid=contact_uid, storage=storage
+            )
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -302,17 +294,13 @@ class ContactService:
                 }
             )
 
-    def _insert_contact_to_user(self, user_id: str, contact_document: Dict[str, Any]):
-        """Insert contact into user's contacts array"""
+    def _insert_contact_to_user(self, user_id: str, contact_document: Dict[str, Any],
+                                storage: Optional[str] = None):
+        """Insert contact into user's contacts"""
         try:
-            result = self.db_manager.users.update_one(
-                {"uid": user_id},
-                {
-                    "$push": {"Contacts": contact_document},
-                    "$set": {"updated_at": datetime.utcnow()}
-                }
-            )
+            modified = self.contact_store.add_contact(user_id, contact_document, storage)
         except Exception as e:
+            self.user_cache.invalidate(user_id)
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -323,7 +311,9 @@ class ContactService:
                 }
             )
         
-        if result.modified_count == 0:
+        self.user_cache.invalidate(user_id)
+        
+        if not modified:
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -334,17 +324,13 @@ class ContactService:
                 }
             )
 
-    def _update_contact_in_db(self, user_id: str, contact_uid: str, update_doc: Dict[str, Any]) -> List[str]:
+    def _update_contact_in_db(self, user_id: str, contact_uid: str, update_doc: Dict[str, Any],
+                              storage: Optional[str] = None) -> List[str]:
         """Update contact in database and return list of updated fields"""
         try:
-            result = self.db_manager.users.update_one(
-                {
-                    "uid": user_id,
-                    "Contacts.uid": contact_uid
-                },
-                update_doc
-            )
+            modified = self.contact_store.update_contact(user_id, contact_uid, update_doc, storage)
         except Exception as e:
+            self.user_cache.invalidate(user_id)
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -355,7 +341,9 @@ class ContactService:
                 }
             )
         
-        if result.modified_count == 0:
+        self.user_cache.invalidate(user_id)
+        
+        if not modified:
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -369,13 +357,11 @@ class ContactService:
         
         return list(update_doc["$set"].keys())
 
-    def _get_updated_contact(self, user_id: str, contact_uid: str) -> Dict[str, Any]:
+    def _get_updated_contact(self, user_id: str, contact_uid: str,
+                             storage: Optional[str] = None) -> Dict[str, Any]:
         """Retrieve updated contact from database"""
         try:
-            updated_user = self.db_manager.users.find_one(
-                {"uid": user_id},
-                {"Contacts": {"$elemMatch": {"uid": contact_uid}}, "_id": 0}
-            )
+            updated_contact = self.contact_store.get_contact(user_id, contact_uid, storage)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -387,7 +373,7 @@ class ContactService:
                 }
             )
         
-        if not updated_user or not updated_user.get("Contacts"):
+        if not updated_contact:
             raise HTTPException(
                 status_code=500,
                 detail={
@@ -399,7 +385,7 @@ class ContactService:
                 }
             )
         
-        return updated_user["Contacts"][0]
+        return updated_contact
 
     def _categorize_contacts(self, contacts: List[Dict[str, Any]]) -> tuple:
         """Categorize contacts as complete or partial"""
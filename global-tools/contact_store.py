@@ -0,0 +1,306 @@
+"""
+Projection-aware storage of user contacts in MongoDB
+
+Contacts live in one of two places, chosen per user:
+
+- embedded (default): the `Contacts` array of the user's `Users` document.
+  Single-contact reads use `$elemMatch` projections and existence checks
+  project only `_id`, so neither transfers the rest of the array.
+- collection: one document per contact in the `Contacts` collection, keyed by
+  `user_id` (the user's uid) and `uid`. Meant for heavy users whose array makes
+  every write rewrite a large document (and which would eventually hit the
+  16 MB document limit). Users are moved with `python contact_store.py migrate`,
+  which sets `contacts_storage: "collection"` on the user document.
+"""
+
+import logging
+import argparse
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from pymongo import ReplaceOne
+
+logger = logging.getLogger(__name__)
+
+EMBEDDED_STORAGE = "embedded"
+COLLECTION_STORAGE = "collection"
+
+CONTACT_FIELD_PREFIX = "Contacts.$."
+
+# Fields of a user document needed to route a contact operation
+_USER_ROUTING_PROJECTION = {"_id": 1, "contacts_storage": 1}
+# Fields stripped from documents in the Contacts collection so both layouts return the same shape
+_CONTACT_PROJECTION = {"_id": 0, "user_id": 0}
+
+
+class ContactStore:
+    """Reads and writes single contacts without loading a user's whole contact list"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    @property
+    def users(self):
+        return self.db_manager.users
+
+    @property
+    def contacts(self):
+        return self.db_manager.contacts
+
+    def get_user_storage(self, user_id: str) -> Optional[str]:
+        """
+        Look up where a user's contacts are stored.
+
+        Returns:
+            "embedded" or "collection", or None if the user does not exist
+        """
+        user = self.users.find_one({"uid": user_id}, _USER_ROUTING_PROJECTION)
+        if not user:
+            return None
+        return user.get("contacts_storage") or EMBEDDED_STORAGE
+
+    @staticmethod
+    def storage_of(user: Dict[str, Any]) -> str:
+        """Storage of an already loaded user document"""
+        return user.get("contacts_storage") or EMBEDDED_STORAGE
+
+    def get_contact(self, user_id: str, contact_uid: str,
+                    storage: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Fetch a single contact"""
+        storage = storage or self.get_user_storage(user_id)
+        if storage is None:
+            return None
+
+        if storage == COLLECTION_STORAGE:
+            return self.contacts.find_one({"user_id": user_id, "uid": contact_uid}, _CONTACT_PROJECTION)
+
+        user = self.users.find_one(
+            {"uid": user_id, "Contacts.uid": contact_uid},
+            {"Contacts": {"$elemMatch": {"uid": contact_uid}}, "_id": 0}
+        )
+        if not user or not user.get("Contacts"):
+            return None
+        return user["Contacts"][0]
+
+    def find_contacts_by_email(self, user_id: str, email: str,
+                               storage: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Fetch the user's contacts with the given email address"""
+        storage = storage or self.get_user_storage(user_id)
+        if storage is None:
+            return []
+
+        if storage == COLLECTION_STORAGE:
+            return list(self.contacts.find({"user_id": user_id, "email": email}, _CONTACT_PROJECTION))
+
+        # $elemMatch projections return the first match only, which is all a
+        # unique-per-user email can have
+        user = self.users.find_one(
+            {"uid": user_id, "Contacts.email": email},
+            {"Contacts": {"$elemMatch": {"email": email}}, "_id": 0}
+        )
+        return list(user.get("Contacts") or []) if user else []
+
+    def email_in_use(self, user_id: str, email: str, exclude_uid: Optional[str] = None,
+                     storage: Optional[str] = None) -> bool:
+        """Check whether another contact of the user already has this email"""
+        storage = storage or self.get_user_storage(user_id)
+        if storage is None:
+            return False
+
+        if storage == COLLECTION_STORAGE:
+            query: Dict[str, Any] = {"user_id": user_id, "email": email}
+            if exclude_uid:
+                query["uid"] = {"$ne": exclude_uid}
+            return self.contacts.find_one(query, {"_id": 1}) is not None
+
+        match: Dict[str, Any] = {"email": email}
+        if exclude_uid:
+            match["uid"] = {"$ne": exclude_uid}
+        return self.users.find_one(
+            {"uid": user_id, "Contacts": {"$elemMatch": match}}, {"_id": 1}
+        ) is not None
+
+    def list_contacts(self, user_id: str, storage: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """All contacts of a user, or None if the user does not exist"""
+        storage = storage or self.get_user_storage(user_id)
+        if storage is None:
+            return None
+
+        if storage == COLLECTION_STORAGE:
+            return list(self.contacts.find({"user_id": user_id}, _CONTACT_PROJECTION).sort("created_at", 1))
+
+        user = self.users.find_one({"uid": user_id}, {"Contacts": 1, "_id": 0})
+        return list(user.get("Contacts") or []) if user else None
+
+    def add_contact(self, user_id: str, contact_document: Dict[str, Any],
+                    storage: Optional[str] = None) -> bool:
+        """Add a contact; returns False if nothing was written"""
+        storage = storage or self.get_user_storage(user_id) or EMBEDDED_STORAGE
+        now = datetime.utcnow()
+
+        if storage == COLLECTION_STORAGE:
+            self.contacts.insert_one({**contact_document, "user_id": user_id})
+            self.users.update_one({"uid": user_id}, {"$set": {"updated_at": now}})
+            return True
+
+        result = self.users.update_one(
+            {"uid": user_id, "contacts_storage": {"$ne": COLLECTION_STORAGE}},
+            {
+                "$push": {"Contacts": contact_document},
+                "$set": {"updated_at": now}
+            }
+        )
+        if result.modified_count == 0 and self.get_user_storage(user_id) == COLLECTION_STORAGE:
+            # The user was migrated after its storage was looked up
+            return self.add_contact(user_id, contact_document, COLLECTION_STORAGE)
+        return result.modified_count > 0
+
+    def update_contact(self, user_id: str, contact_uid: str, update_doc: Dict[str, Any],
+                       storage: Optional[str] = None) -> bool:
+        """
+        Apply an update written against the embedded layout (`Contacts.$.<field>`
+        keys for the contact, top-level keys for the user).
+
+        Returns:
+            False if no contact was modified
+        """
+        storage = storage or self.get_user_storage(user_id) or EMBEDDED_STORAGE
+
+        if storage == COLLECTION_STORAGE:
+            contact_fields = {}
+            user_fields = {}
+            for key, value in update_doc.get("$set", {}).items():
+                if key.startswith(CONTACT_FIELD_PREFIX):
+                    contact_fields[key[len(CONTACT_FIELD_PREFIX):]] = value
+                else:
+                    user_fields[key] = value
+
+            result = self.contacts.update_one(
+                {"user_id": user_id, "uid": contact_uid},
+                {"$set": contact_fields}
+            )
+            if result.modified_count and user_fields:
+                self.users.update_one({"uid": user_id}, {"$set": user_fields})
+            return result.modified_count > 0
+
+        result = self.users.update_one(
+            {
+                "uid": user_id,
+                "Contacts.uid": contact_uid
+            },
+            update_doc
+        )
+        if result.modified_count == 0 and self.get_user_storage(user_id) == COLLECTION_STORAGE:
+            # The user was migrated after its storage was looked up
+            return self.update_contact(user_id, contact_uid, update_doc, COLLECTION_STORAGE)
+        return result.modified_count > 0
+
+    def migrate_user(self, user_id: str, dry_run: bool = False, retries: int = 3) -> Dict[str, Any]:
+        """
+        Move a user's embedded contacts into the Contacts collection.
+
+        Copies are upserts keyed by (user_id, uid), so a re-run after an
+        interruption is safe. The user document is switched over only if its
+        contacts did not change while they were being copied; otherwise the
+        copy is retried.
+
+        Returns:
+            Report with the number of contacts moved
+        """
+        report = {"user_id": user_id, "contacts": 0, "migrated": False}
+
+        for _ in range(retries):
+            user = self.users.find_one(
+                {"uid": user_id},
+                {"Contacts": 1, "contacts_storage": 1, "updated_at": 1}
+            )
+            if not user:
+                report["error"] = "User not found"
+                return report
+            if self.storage_of(user) == COLLECTION_STORAGE:
+                report["already_migrated"] = True
+                return report
+
+            contacts = [contact for contact in user.get("Contacts") or [] if contact.get("uid")]
+            report["contacts"] = len(contacts)
+            if dry_run:
+                return report
+
+            if contacts:
+                self.contacts.bulk_write([
+                    ReplaceOne(
+                        {"user_id": user_id, "uid": contact["uid"]},
+                        {**contact, "user_id": user_id},
+                        upsert=True
+                    )
+                    for contact in contacts
+                ], ordered=False)
+
+            # Contact writes always bump updated_at, so an unchanged value means no contact was lost
+            unchanged = {"_id": user["_id"], "updated_at": user.get("updated_at")}
+            if "Contacts" in user:
+                unchanged["Contacts"] = {"$size": len(user["Contacts"])}
+            else:
+                unchanged["Contacts"] = {"$exists": False}
+            result = self.users.update_one(
+                unchanged,
+                {
+                    "$set": {"contacts_storage": COLLECTION_STORAGE, "updated_at": datetime.utcnow()},
+                    "$unset": {"Contacts": ""}
+                }
+            )
+            if result.modified_count:
+                report["migrated"] = True
+                return report
+
+            logger.info(f"Contacts of user {user_id} changed during migration, retrying")
+
+        report["error"] = "Contacts kept changing during migration"
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage where user contacts are stored")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Move embedded contacts into the Contacts collection")
+    migrate.add_argument("--user-id", help="Only migrate this user (uid)")
+    migrate.add_argument("--min-contacts", type=int, default=1000,
+                         help="Only migrate users with at least this many contacts")
+    migrate.add_argument("--dry-run", action="store_true", help="Report what would be moved")
+
+    args = parser.parse_args()
+
+    from dbmanager import db_manager
+
+    if not db_manager.is_connected():
+        raise SystemExit("MongoDB must be reachable to migrate contacts")
+
+    db_manager.create_contact_indexes()
+    store = ContactStore(db_manager)
+
+    query: Dict[str, Any] = {"contacts_storage": {"$ne": COLLECTION_STORAGE}}
+    if args.user_id:
+        query["uid"] = args.user_id
+    elif args.min_contacts > 0:
+        # Users whose array has at least min_contacts elements
+        query[f"Contacts.{args.min_contacts - 1}"] = {"$exists": True}
+
+    totals = {"users": 0, "contacts": 0}
+    for user in db_manager.users.find(query, {"uid": 1}):
+        if not user.get("uid"):
+            continue
+        report = store.migrate_user(user["uid"], dry_run=args.dry_run)
+        if report.get("error"):
+            print(f"{user['uid']}: {report['error']}")
+            continue
+        totals["users"] += 1
+        totals["contacts"] += report["contacts"]
+        print(f"{user['uid']}: {report['contacts']} contacts")
+
+    prefix = "[dry run] " if args.dry_run else ""
+    print(f"{prefix}Moved {totals['contacts']} contacts of {totals['users']} users to the Contacts collection")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,21 @@
 """
 MongoDB Database Manager for Global Tools API
-Manages connections to the Prosusware database with 4 collections
+Manages connections to the Prosusware database with 6 collections
 """
 
 import os
+import time
 import logging
-from typing import Optional
-from pymongo import MongoClient
+import threading
+from typing import Optional, Dict, Any
+from pymongo import MongoClient, monitoring
 from pymongo.database import Database
 from pymongo.collection import Collection
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from dotenv import load_dotenv
 
+import request_metrics
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -19,6 +23,78 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ConnectionHealth(monitoring.TopologyListener, monitoring.ServerHeartbeatListener):
+    """
+    Tracks MongoDB liveness without pinging on request paths.
+
+    State is fed by pymongo's own server monitoring (topology changes and
+    heartbeats) and by a background ping thread, so request handlers can read
+    a cached health state instead of issuing a synchronous `ping`.
+    """
+    
+    def __init__(self, stale_after_seconds: float = 60.0):
+        self.stale_after_seconds = stale_after_seconds
+        self._lock = threading.Lock()
+        self.healthy: Optional[bool] = None
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+    
+    def record_success(self):
+        with self._lock:
+            self.healthy = True
+            self.last_success = time.time()
+    
+    def record_failure(self, error: Any):
+        with self._lock:
+            self.healthy = False
+            self.last_failure = time.time()
+            self.last_error = str(error)
+    
+    def cached_state(self) -> Optional[bool]:
+        """Return the cached state, or None if it is unknown or too old to trust"""
+        with self._lock:
+            last_event = max(self.last_success or 0, self.last_failure or 0)
+            if self.healthy is None or time.time() - last_event > self.stale_after_seconds:
+                return None
+            return self.healthy
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "healthy": self.healthy,
+                "last_success": self.last_success,
+                "last_failure": self.last_failure,
+                "last_error": self.last_error,
+                "stale_after_seconds": self.stale_after_seconds
+            }
+    
+    # pymongo topology events: healthy while a writable server is known
+    def opened(self, event):
+        pass
+    
+    def description_changed(self, event):
+        if event.new_description.has_writable_server():
+            self.record_success()
+        else:
+            self.record_failure("No writable MongoDB server available")
+    
+    def closed(self, event):
+        pass
+    
+    # pymongo heartbeat events: refresh freshness while the topology is writable
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        with self._lock:
+            if self.healthy:
+                self.last_success = time.time()
+    
+    def failed(self, event):
+        logger.debug(f"MongoDB heartbeat to {event.connection_id} failed: {event.reply}")
+
+
 class DatabaseManager:
     """
     MongoDB Database Manager for Prosusware database
@@ -29,12 +105,22 @@ class DatabaseManager:
         self.database: Optional[Database] = None
         self.mongodb_url = os.getenv("MONGODB_URL")
         
+        # Cached connection health, kept current by server monitoring and a background ping
+        self.health = ConnectionHealth(
+            stale_after_seconds=float(os.getenv("MONGODB_HEALTH_STALE_SECONDS", "60"))
+        )
+        self.heartbeat_interval = float(os.getenv("MONGODB_HEARTBEAT_INTERVAL_SECONDS", "15"))
+        self._heartbeat_stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        
         # Collection names for Prosusware database
         self.collection_names = {
             "users": "Users",
             "tools": "tools", 
             "sessions": "sessions",
-            "analytics": "analytics"
+            "analytics": "analytics",
+            "contacts": "Contacts",
+            "status_updates": "Status_updates"
         }
         
         # Initialize connection
@@ -57,42 +143,102 @@ class DatabaseManager:
                 self.mongodb_url,
                 serverSelectionTimeoutMS=5000,  # 5 second timeout
                 connectTimeoutMS=10000,         # 10 second timeout
-                socketTimeoutMS=10000           # 10 second timeout
+                socketTimeoutMS=10000,          # 10 second timeout
+                event_listeners=[self.health]
             )
             
             # Test the connection
             self.client.admin.command('ping')
+            self.health.record_success()
             
             # Connect to Prosusware database
             self.database = self.client.Prosusware
             
+            self._start_heartbeat()
+            
             logger.info("Successfully connected to MongoDB - Prosusware database")
             return True
             
         except (ConnectionFailure, ServerSelectionTimeoutError) as e:
+            self.health.record_failure(e)
             logger.error(f"Failed to connect to MongoDB: {e}")
             return False
         except Exception as e:
             logger.error(f"Unexpected error connecting to MongoDB: {e}")
             return False
     
-    def is_connected(self) -> bool:
+    def _start_heartbeat(self):
+        """Start the background thread that keeps the cached health state fresh"""
+        if self.heartbeat_interval <= 0:
+            return
+        if self._heartbeat_thread is not None and self._heartbeat_thread.is_alive():
+            return
+        
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, name="mongodb-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+    
+    def _heartbeat_loop(self):
+        """Ping MongoDB periodically and record the outcome"""
+        while not self._heartbeat_stop.wait(self.heartbeat_interval):
+            self.ping()
+    
+    def ping(self) -> bool:
         """
-        Check if database connection is active
+        Ping the database and update the cached health state
         
         Returns:
-            bool: True if connected, False otherwise
+            bool: True if the ping succeeded
         """
         if self.client is None or self.database is None:
             return False
         
         try:
-            # Ping the database
             self.client.admin.command('ping')
+            self.health.record_success()
             return True
-        except Exception:
+        except Exception as e:
+            self.health.record_failure(e)
             return False
     
+    def is_connected(self, force: bool = False) -> bool:
+        """
+        Check if database connection is active
+        
+        Uses the cached health state maintained by server monitoring and the
+        background heartbeat; only pings when that state is unknown or stale.
+        
+        Args:
+            force (bool): Always ping instead of using the cached state
+        
+        Returns:
+            bool: True if connected, False otherwise
+        """
+        if self.client is None or self.database is None:
+            return False
+        
+        if not force:
+            cached = self.health.cached_state()
+            if cached is not None:
+                request_metrics.increment("mongo_pings_saved")
+                return cached
+        
+        request_metrics.increment("mongo_pings")
+        return self.ping()
+    
+    def get_health(self) -> Dict[str, Any]:
+        """
+        Get the cached connection health state
+        
+        Returns:
+            dict: Health state and heartbeat configuration
+        """
+        health = self.health.snapshot()
+        health["heartbeat_interval_seconds"] = self.heartbeat_interval
+        return health
+    
     def get_collection(self, collection_name: str) -> Optional[Collection]:
         """
         Get a specific collection from the database
@@ -132,6 +278,61 @@ class DatabaseManager:
         """Get analytics collection"""
         return self.get_collection(self.collection_names["analytics"])
     
+    @property
+    def contacts(self) -> Optional[Collection]:
+        """Get contacts collection (users whose contacts were moved out of their document)"""
+        return self.get_collection(self.collection_names["contacts"])
+    
+    @property
+    def status_updates(self) -> Optional[Collection]:
+        """Get status updates collection"""
+        return self.get_collection(self.collection_names["status_updates"])
+    
+    def create_status_indexes(self):
+        """
+        Create the index backing paginated status update reads
+        
+        Reads filter on conversation_id and page in (timestamp, _id) order, so
+        a resumed read seeks straight to the first unseen update.
+        """
+        if not self.is_connected():
+            logger.error("Database not connected - cannot create status indexes")
+            return
+        
+        try:
+            if self.status_updates is not None:
+                self.status_updates.create_index([("conversation_id", 1), ("timestamp", 1), ("_id", 1)])
+                logger.info("Created indexes for status updates collection")
+        except Exception as e:
+            logger.error(f"Error creating status indexes: {e}")
+    
+    def create_contact_indexes(self):
+        """
+        Create the indexes backing single-contact reads and writes
+        
+        Embedded contacts are located through `uid` plus a multikey index on the
+        array fields; the Contacts collection is keyed by (user_id, uid) and
+        (user_id, email).
+        """
+        if not self.is_connected():
+            logger.error("Database not connected - cannot create contact indexes")
+            return
+        
+        try:
+            if self.users is not None:
+                self.users.create_index("uid")
+                self.users.create_index([("uid", 1), ("Contacts.uid", 1)])
+                self.users.create_index([("uid", 1), ("Contacts.email", 1)])
+            
+            if self.contacts is not None:
+                self.contacts.create_index([("user_id", 1), ("uid", 1)], unique=True)
+                self.contacts.create_index([("user_id", 1), ("email", 1)])
+                self.contacts.create_index([("user_id", 1), ("created_at", 1)])
+            
+            logger.info("Created contact indexes")
+        except Exception as e:
+            logger.error(f"Error creating contact indexes: {e}")
+    
     def create_indexes(self):
         """
         Create useful indexes for the collections
@@ -172,6 +373,9 @@ class DatabaseManager:
                 
         except Exception as e:
             logger.error(f"Error creating indexes: {e}")
+        
+        self.create_contact_indexes()
+        self.create_status_indexes()
     
     def get_database_stats(self) -> dict:
         """
@@ -186,6 +390,7 @@ class DatabaseManager:
         try:
             stats = {
                 "database_name": self.database.name,
+                "connection_health": self.get_health(),
                 "collections": {}
             }
             
@@ -208,6 +413,7 @@ class DatabaseManager:
         """
         Close the database connection
         """
+        self._heartbeat_stop.set()
         if self.client:
             self.client.close()
             logger.info("MongoDB connection closed")
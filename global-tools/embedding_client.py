@@ -0,0 +1,403 @@
+"""
+Embedding client with request coalescing, connection pooling and a vector cache
+"""
+
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """Return the cache key for a text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU/TTL cache of embedding vectors keyed by content hash"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 86400,
+                 persist_path: Optional[str] = None):
+        """
+        Args:
+            max_size: Maximum number of vectors kept in memory (0 disables the cache)
+            ttl_seconds: Time after which a cached vector is considered stale
+            persist_path: Optional SQLite file used as a second-level cache
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if persist_path:
+            try:
+                self._db = sqlite3.connect(persist_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings "
+                    "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+                logger.info(f"Embedding cache persisted to {persist_path}")
+            except Exception as e:
+                logger.warning(f"Could not open embedding cache file '{persist_path}': {e}")
+                self._db = None
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return a cached vector or None if missing or expired"""
+        if self.max_size <= 0:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if now - created_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    return vector
+                del self._entries[key]
+
+            if self._db is None:
+                return None
+
+            row = self._db.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                return None
+
+            vector = np.frombuffer(row[0], dtype=np.float32)
+            self._store(key, vector, row[1])
+            return vector
+
+    def put(self, key: str, vector: np.ndarray):
+        """Store a vector in the cache"""
+        if self.max_size <= 0:
+            return
+
+        vector = np.asarray(vector, dtype=np.float32)
+        created_at = time.time()
+        with self._lock:
+            self._store(key, vector, created_at)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                        (key, vector.tobytes(), created_at)
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    logger.warning(f"Failed to persist embedding to cache file: {e}")
+
+    def _store(self, key: str, vector: np.ndarray, created_at: float):
+        """Insert into the in-memory LRU (caller holds the lock)"""
+        self._entries[key] = (vector, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def close(self):
+        """Close the persistence file"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class EmbeddingClient:
+    """
+    Client for the remote /embed endpoint.
+
+    Concurrent callers are coalesced into micro-batches: misses are queued and a
+    dispatcher thread hands them to a sender pool in a single request once either
+    `max_batch_size` texts are waiting or `batch_window_ms` has elapsed. Up to
+    `pool_size` batches are upstream at once, one per pooled connection; while
+    all senders are busy, waiting texts keep joining the next batch.
+
+    Cached vectors are keyed by the service URL and model as well as the text,
+    so pointing the client at another model does not serve the old vectors.
+    """
+
+    def __init__(self, api_url: str, max_batch_size: int = 64, batch_window_ms: float = 5.0,
+                 cache: Optional[EmbeddingCache] = None, pool_size: int = 10,
+                 timeout: float = 30, model: str = ""):
+        self.api_url = api_url.rstrip('/')
+        self.model = model
+        self._key_prefix = content_hash(f"{self.api_url}\n{model}")[:16]
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.timeout = timeout
+
+        # Keep-alive connection pool shared by all batches
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._pending: "OrderedDict[str, Tuple[str, Future]]" = OrderedDict()
+        self._pending_lock = threading.Condition()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._closed = False
+        # Batches in flight are bounded by the connection pool
+        self._senders = ThreadPoolExecutor(max_workers=max(1, pool_size), thread_name_prefix="embedding-sender")
+        self._sender_slots = threading.Semaphore(max(1, pool_size))
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "texts": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "coalesced": 0,
+            "batches": 0,
+            "batched_texts": 0,
+            "max_batch_size": 0,
+            "upstream_errors": 0,
+            "upstream_seconds": 0.0
+        }
+        self._batch_size_histogram = {"1": 0, "2-4": 0, "5-16": 0, "17-64": 0, "65+": 0}
+
+    @classmethod
+    def from_env(cls, api_url: str) -> "EmbeddingClient":
+        """Build a client using the EMBEDDING_* environment variables"""
+        cache = EmbeddingCache(
+            max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+            ttl_seconds=float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400")),
+            persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None
+        )
+        return cls(
+            api_url=api_url,
+            max_batch_size=int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "64")),
+            batch_window_ms=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5")),
+            cache=cache,
+            pool_size=int(os.getenv("EMBEDDING_POOL_SIZE", "10")),
+            timeout=float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "30")),
+            model=os.getenv("EMBEDDING_MODEL", "")
+        )
+
+    def ping(self, timeout: float = 5) -> bool:
+        """Check that the embedding service responds"""
+        response = self.session.get(f"{self.api_url}/", timeout=timeout)
+        return response.status_code == 200
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed a list of texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            A float32 array with one row per input text
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [self.cache_key(text) for text in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        waiting: List[Tuple[int, Future]] = []
+        hits = 0
+
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is not None:
+                vectors[i] = cached
+                hits += 1
+            else:
+                waiting.append((i, self._submit(key, texts[i])))
+
+        self._record(requests=1, texts=len(texts), cache_hits=hits, cache_misses=len(waiting))
+
+        for i, future in waiting:
+            vectors[i] = future.result(timeout=self.timeout + self.batch_window + 1)
+
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    def cache_key(self, text: str) -> str:
+        """Cache key of a text's vector from this service and model"""
+        return f"{self._key_prefix}:{content_hash(text)}"
+
+    def _submit(self, key: str, text: str) -> Future:
+        """Queue a text for the next batch, sharing any identical in-flight request"""
+        with self._pending_lock:
+            if self._closed:
+                raise RuntimeError("Embedding client is closed")
+
+            existing = self._pending.get(key)
+            if existing is not None:
+                self._record(coalesced=1)
+                return existing[1]
+
+            future: Future = Future()
+            self._pending[key] = (text, future)
+
+            if self.batch_window == 0:
+                # No batching window: flush this request straight away on the caller thread
+                batch = self._take_batch()
+            else:
+                self._ensure_dispatcher()
+                self._pending_lock.notify()
+                return future
+
+        self._send_batch(batch)
+        return future
+
+    def _ensure_dispatcher(self):
+        """Start the dispatcher thread (caller holds the lock)"""
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop, name="embedding-dispatcher", daemon=True
+            )
+            self._dispatcher.start()
+
+    def _take_batch(self) -> List[Tuple[str, str, Future]]:
+        """Remove up to max_batch_size pending texts (caller holds the lock)"""
+        batch = []
+        while self._pending and len(batch) < self.max_batch_size:
+            key, (text, future) = self._pending.popitem(last=False)
+            batch.append((key, text, future))
+        return batch
+
+    def _dispatch_loop(self):
+        """Collect pending texts into micro-batches and hand them to the sender pool"""
+        while True:
+            # Wait for a free sender first; texts arriving meanwhile join this batch
+            self._sender_slots.acquire()
+            with self._pending_lock:
+                while not self._pending and not self._closed:
+                    self._pending_lock.wait()
+                if self._closed and not self._pending:
+                    self._sender_slots.release()
+                    return
+
+                # Give concurrent callers a short window to join this batch
+                deadline = time.monotonic() + self.batch_window
+                while len(self._pending) < self.max_batch_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._pending_lock.wait(remaining)
+
+                batch = self._take_batch()
+
+            if batch:
+                self._senders.submit(self._send_and_release, batch)
+            else:
+                self._sender_slots.release()
+
+    def _send_and_release(self, batch: List[Tuple[str, str, Future]]):
+        try:
+            self._send_batch(batch)
+        finally:
+            self._sender_slots.release()
+
+    def _send_batch(self, batch: List[Tuple[str, str, Future]]):
+        """Embed one batch and resolve its futures"""
+        texts = [text for _, text, _ in batch]
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.api_url}/embed",
+                json={"texts": texts},
+                timeout=self.timeout
+            )
+
+            if response.status_code != 200:
+                try:
+                    error = response.json().get('error', 'Unknown error')
+                except ValueError:
+                    error = response.text or 'Unknown error'
+                raise Exception(f"API call failed: {error}")
+
+            embeddings = np.array(response.json()['embeddings'], dtype=np.float32)
+            if len(embeddings) != len(texts):
+                raise Exception(
+                    f"API call failed: expected {len(texts)} embeddings, got {len(embeddings)}"
+                )
+        except Exception as e:
+            self._record(upstream_errors=1, upstream_seconds=time.perf_counter() - started)
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self._record_batch(len(texts), time.perf_counter() - started)
+        for (key, _, future), vector in zip(batch, embeddings):
+            self.cache.put(key, vector)
+            future.set_result(vector)
+
+    def _record(self, **increments):
+        with self._metrics_lock:
+            for name, value in increments.items():
+                self._metrics[name] += value
+
+    def _record_batch(self, size: int, seconds: float):
+        if size == 1:
+            bucket = "1"
+        elif size <= 4:
+            bucket = "2-4"
+        elif size <= 16:
+            bucket = "5-16"
+        elif size <= 64:
+            bucket = "17-64"
+        else:
+            bucket = "65+"
+
+        with self._metrics_lock:
+            self._metrics["batches"] += 1
+            self._metrics["batched_texts"] += size
+            self._metrics["max_batch_size"] = max(self._metrics["max_batch_size"], size)
+            self._metrics["upstream_seconds"] += seconds
+            self._batch_size_histogram[bucket] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return cache hit rate and batching statistics"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+            histogram = dict(self._batch_size_histogram)
+
+        lookups = metrics["cache_hits"] + metrics["cache_misses"]
+        batches = metrics["batches"]
+        return {
+            "requests": metrics["requests"],
+            "texts": metrics["texts"],
+            "cache_hits": metrics["cache_hits"],
+            "cache_misses": metrics["cache_misses"],
+            "cache_hit_rate": round(metrics["cache_hits"] / lookups, 4) if lookups else 0.0,
+            "cache_size": len(self.cache),
+            "coalesced_texts": metrics["coalesced"],
+            "batches": batches,
+            "avg_batch_size": round(metrics["batched_texts"] / batches, 2) if batches else 0.0,
+            "max_batch_size": metrics["max_batch_size"],
+            "batch_size_histogram": histogram,
+            "upstream_errors": metrics["upstream_errors"],
+            "avg_upstream_latency_ms": round(metrics["upstream_seconds"] / batches * 1000, 2) if batches else 0.0
+        }
+
+    def close(self):
+        """Flush pending work and release the connection pool"""
+        with self._pending_lock:
+            self._closed = True
+            self._pending_lock.notify_all()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=self.timeout)
+        self._senders.shutdown(wait=True)
+        self.session.close()
+        self.cache.close()
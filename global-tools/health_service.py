@@ -102,5 +102,6 @@ class HealthService:
             embedding_function_available=status_data.get("embedding_function_available"),
             collection_count=status_data.get("collection_count"),
             collections=status_data.get("collections"),
+            embedding_metrics=status_data.get("embedding_metrics"),
             timestamp=datetime.utcnow().isoformat()
         ) 
\ No newline at end of file
@@ -0,0 +1,302 @@
+"""
+Lexical (BM25) retrieval fused with vector search for memory search
+
+Vector search misses exact tokens such as flight numbers, booking codes and
+email addresses. Each memory collection gets a BM25 inverted index kept in
+process next to the vector store; memory search runs both retrievers and
+combines their rankings with reciprocal rank fusion (RRF).
+
+Indexes are built from the collection's documents on first use, kept current
+by writes made through this instance and rebuilt after a TTL so writes made
+elsewhere (other instances, compaction) are picked up. Searches never wait for
+a build: a missing index is built in the background while the collection is
+searched by vector only, and an expired one keeps serving until its
+replacement is ready.
+"""
+
+import os
+import re
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Hashable
+
+from local_vector_store import matches_where
+
+logger = logging.getLogger(__name__)
+
+INDEX_PAGE_SIZE = 1000
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_WORD = re.compile(r"[a-z0-9]+")
+_CODE_PREFIX = re.compile(r"[a-z]{1,3}")
+_JOINED_CODE = re.compile(r"([a-z]{1,3})(\d+)")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word tokens, plus whole email addresses and both forms of codes.
+
+    "LH 1234" and "LH1234" both yield "lh", "1234" and "lh1234", so flight
+    numbers match however they were written.
+    """
+    text = text.lower()
+    tokens = _EMAIL.findall(text)
+    words = _WORD.findall(text)
+    for word in words:
+        code = _JOINED_CODE.fullmatch(word)
+        if code:
+            tokens.extend(code.groups())
+        tokens.append(word)
+    for first, second in zip(words, words[1:]):
+        if _CODE_PREFIX.fullmatch(first) and second.isdigit():
+            tokens.append(first + second)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over the documents of one collection"""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # term -> {doc id: term frequency}
+        self._lengths: Dict[str, int] = {}
+        self._documents: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index a document, replacing an earlier version with the same id"""
+        with self._lock:
+            self.remove(doc_id)
+            terms = Counter(tokenize(text or ""))
+            for term, frequency in terms.items():
+                self._postings[term][doc_id] = frequency
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._documents[doc_id] = (text, metadata or {})
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            if doc_id not in self._documents:
+                return
+            text, _ = self._documents.pop(doc_id)
+            for term in set(tokenize(text or "")):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= self._lengths.pop(doc_id)
+
+    def document(self, doc_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        return self._documents.get(doc_id)
+
+    def search(self, query: str, n_results: int,
+               where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Top documents by BM25 score as (doc id, score), best first"""
+        with self._lock:
+            count = len(self._documents)
+            if count == 0:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+            if where:
+                ranked = [item for item in ranked if matches_where(self._documents[item[0]][1], where)]
+            return ranked[:n_results]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Hashable]], k: int = 60) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse several rankings: score(d) = sum over rankings of 1 / (k + rank of d).
+
+    Returns:
+        (item, fused score) pairs, best first; ties keep first-seen order
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalIndexCache:
+    """BM25 indexes of memory collections, built lazily and expired after a TTL"""
+
+    def __init__(self, chroma_manager, ttl_seconds: Optional[float] = None,
+                 max_collections: Optional[int] = None, build_workers: Optional[int] = None):
+        """
+        Args:
+            chroma_manager: ChromaManager the indexes are built from
+            ttl_seconds: Age after which an index is rebuilt (env MEMORY_LEXICAL_INDEX_TTL_SECONDS)
+            max_collections: Indexes kept in memory, least recently used dropped first
+                (env MEMORY_LEXICAL_INDEX_MAX_COLLECTIONS)
+            build_workers: Threads building indexes in the background
+                (env MEMORY_LEXICAL_INDEX_BUILD_WORKERS)
+        """
+        self.chroma_manager = chroma_manager
+        self.ttl_seconds = (ttl_seconds if ttl_seconds is not None
+                            else float(os.getenv("MEMORY_LEXICAL_INDEX_TTL_SECONDS", "300")))
+        self.max_collections = max_collections or int(os.getenv("MEMORY_LEXICAL_INDEX_MAX_COLLECTIONS", "1000"))
+        self._indexes: "OrderedDict[str, Tuple[BM25Index, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._stats = {"builds": 0, "hits": 0, "misses": 0, "build_ms": 0.0}
+        # Bumped per collection on invalidation so a build racing with a change is not kept
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._scheduled: set = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=build_workers or int(os.getenv("MEMORY_LEXICAL_INDEX_BUILD_WORKERS", "2")),
+            thread_name_prefix="lexical-index"
+        )
+
+    def get(self, collection_name: str) -> BM25Index:
+        """The collection's index, building it if missing or expired"""
+        index = self._cached(collection_name)
+        if index is not None:
+            return index
+
+        # One build per collection at a time; concurrent callers wait for it
+        with self._build_locks[collection_name]:
+            index = self._cached(collection_name)
+            if index is not None:
+                return index
+            return self._build_and_store(collection_name)
+
+    def get_ready(self, collection_name: str) -> Optional[BM25Index]:
+        """
+        The collection's index without waiting for a build.
+
+        A missing index is scheduled for a background build and None is
+        returned; an expired one is returned while its replacement is built.
+        """
+        with self._lock:
+            entry = self._indexes.get(collection_name)
+            if entry is not None:
+                self._indexes.move_to_end(collection_name)
+                self._stats["hits"] += 1
+            else:
+                self._stats["misses"] += 1
+        if entry is None or time.monotonic() >= entry[1]:
+            self._schedule_build(collection_name)
+        return entry[0] if entry is not None else None
+
+    def add(self, collection_name: str, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index a new or changed memory if its collection's index is loaded"""
+        with self._lock:
+            entry = self._indexes.get(collection_name)
+        if entry is not None:
+            entry[0].add(doc_id, text, metadata)
+
+    def remove(self, collection_name: str, doc_id: str):
+        """Drop a deleted memory from its collection's index if loaded"""
+        with self._lock:
+            entry = self._indexes.get(collection_name)
+        if entry is not None:
+            entry[0].remove(doc_id)
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Drop one collection's index, or all of them"""
+        with self._lock:
+            if collection_name is None:
+                self._indexes.clear()
+                for name in list(self._generations):
+                    self._generations[name] += 1
+            else:
+                self._indexes.pop(collection_name, None)
+                self._generations[collection_name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "build_ms": round(self._stats["build_ms"], 1),
+                "collections": len(self._indexes),
+                "documents": sum(len(index) for index, _ in self._indexes.values()),
+                "ttl_seconds": self.ttl_seconds
+            }
+
+    def _cached(self, collection_name: str) -> Optional[BM25Index]:
+        with self._lock:
+            entry = self._indexes.get(collection_name)
+            if entry is None:
+                return None
+            index, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._indexes[collection_name]
+                return None
+            self._indexes.move_to_end(collection_name)
+            self._stats["hits"] += 1
+            return index
+
+    def _schedule_build(self, collection_name: str):
+        with self._lock:
+            if collection_name in self._scheduled:
+                return
+            self._scheduled.add(collection_name)
+        self._executor.submit(self._background_build, collection_name)
+
+    def _background_build(self, collection_name: str):
+        try:
+            with self._build_locks[collection_name]:
+                self._build_and_store(collection_name)
+        except Exception as e:
+            logger.warning(f"Background build of the lexical index for '{collection_name}' failed: {e}")
+        finally:
+            with self._lock:
+                self._scheduled.discard(collection_name)
+
+    def _build_and_store(self, collection_name: str) -> BM25Index:
+        """Build an index and cache it unless the collection was invalidated meanwhile"""
+        with self._lock:
+            generation = self._generations[collection_name]
+        index = self._build(collection_name)
+        with self._lock:
+            if generation != self._generations[collection_name]:
+                return index
+            self._indexes[collection_name] = (index, time.monotonic() + self.ttl_seconds)
+            self._indexes.move_to_end(collection_name)
+            while len(self._indexes) > self.max_collections:
+                self._indexes.popitem(last=False)
+        return index
+
+    def _build(self, collection_name: str) -> BM25Index:
+        started = time.perf_counter()
+        index = BM25Index()
+        offset = 0
+        while True:
+            page = self.chroma_manager.get_documents(
+                collection_name, include=["documents", "metadatas"], limit=INDEX_PAGE_SIZE, offset=offset
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            metadatas = page.get("metadatas") or [None] * len(ids)
+            for doc_id, text, metadata in zip(ids, page.get("documents") or [], metadatas):
+                index.add(doc_id, text, metadata)
+            offset += len(ids)
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._stats["builds"] += 1
+            self._stats["build_ms"] += elapsed_ms
+        logger.info(f"Built lexical index for '{collection_name}': {len(index)} documents in {elapsed_ms:.1f} ms")
+        return index
@@ -0,0 +1,546 @@
+"""
+Embedded vector store used by ChromaManager when CHROMA_BACKEND=local
+
+Implements the subset of the chromadb client and collection API that
+ChromaManager uses, in-process, with an exact (flat) NumPy index. Each
+collection is a directory holding its vectors in a memory-mapped `.npy` file
+and its ids, documents and metadata in a JSON snapshot plus an append-only
+log of the writes since, so data survives restarts, only the pages a query
+touches are read and a write costs one appended line instead of a rewrite of
+every record. The log is folded into a new snapshot once it outgrows the
+collection. With no path the store lives in memory only, which suits tests
+and CI.
+
+Queries are a single matrix-vector product over the collection, which takes
+well under a millisecond for the few thousand memories of a typical user.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+_DEFAULT_SPACE = "l2"
+# Logged writes kept before compaction into a snapshot, at least this many and
+# at least as many as the collection has records
+MIN_LOG_ENTRIES = 1000
+
+
+class HashingEmbeddingFunction:
+    """
+    Dependency-free embedding function for the local backend.
+
+    Words and word bigrams are hashed into a fixed number of signed buckets and
+    the vector is normalized to unit length. Texts sharing words end up close
+    together, which is enough for tests and offline development; use the
+    embedding service (EMBEDDING_SERVICE_URL) for real semantic search.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def name(self) -> str:
+        return f"hashing-{self.dimensions}"
+
+    def __call__(self, input: Union[str, List[str]]) -> np.ndarray:
+        if isinstance(input, str):
+            input = [input]
+        return np.stack([self._embed(text) for text in input]) if input else np.zeros((0, self.dimensions), dtype=np.float32)
+
+    def embed_query(self, input: Union[str, List[str]]) -> np.ndarray:
+        return self(input)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {"backend": "hashing", "dimensions": self.dimensions}
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        tokens = _TOKEN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+def matches_where(metadata: Optional[Dict[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Chroma `where` metadata filter against one record's metadata"""
+    if not where:
+        return True
+    metadata = metadata or {}
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif not _matches_condition(metadata.get(key), key in metadata, condition):
+            return False
+    return True
+
+
+def _matches_condition(value: Any, present: bool, condition: Any) -> bool:
+    if not isinstance(condition, dict):
+        return present and value == condition
+
+    for operator, operand in condition.items():
+        if operator == "$eq":
+            ok = present and value == operand
+        elif operator == "$ne":
+            ok = not present or value != operand
+        elif operator == "$in":
+            ok = present and value in operand
+        elif operator == "$nin":
+            ok = not present or value not in operand
+        elif operator in ("$gt", "$gte", "$lt", "$lte"):
+            if not present or value is None:
+                return False
+            try:
+                ok = {
+                    "$gt": value > operand, "$gte": value >= operand,
+                    "$lt": value < operand, "$lte": value <= operand
+                }[operator]
+            except TypeError:
+                return False
+        else:
+            raise ValueError(f"Unsupported where operator: {operator}")
+        if not ok:
+            return False
+    return True
+
+
+class LocalCollection:
+    """A collection backed by a flat NumPy index"""
+
+    def __init__(self, name: str, metadata: Optional[Dict[str, Any]], embedding_function,
+                 directory: Optional[str]):
+        self.name = name
+        self.metadata = metadata or {}
+        self.embedding_function = embedding_function
+        self.directory = directory
+        self.space = self.metadata.get("hnsw:space", _DEFAULT_SPACE)
+
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._documents: List[Optional[str]] = []
+        self._metadatas: List[Optional[Dict[str, Any]]] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None  # capacity x dimensions; rows [0, count) are live
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._log_generation = 0
+        self._log_entries = 0
+        self._log = None
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    # Chroma collection API
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: List[str], documents: Optional[List[str]] = None,
+            metadatas: Optional[List[Dict[str, Any]]] = None, embeddings=None, **_):
+        """Add records; ids that already exist are ignored, as Chroma does"""
+        documents = documents or [None] * len(ids)
+        metadatas = metadatas or [None] * len(ids)
+        vectors = self._vectors_for(documents, embeddings)
+        with self._lock:
+            self._check_dimensions(vectors)
+            for i, record_id in enumerate(ids):
+                if record_id in self._positions:
+                    continue
+                self._commit({"op": "add", "id": record_id, "document": documents[i],
+                              "metadata": metadatas[i], "vector": vectors[i]})
+            self._compact_if_due()
+
+    def upsert(self, ids: List[str], documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None, embeddings=None, **_):
+        with self._lock:
+            existing = [record_id for record_id in ids if record_id in self._positions]
+            if existing:
+                self.delete(ids=existing)
+            self.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def update(self, ids: List[str], documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None, embeddings=None, **_):
+        """Replace documents (re-embedding them) and merge metadata of existing records"""
+        vectors = self._vectors_for(documents, embeddings) if documents or embeddings is not None else None
+        with self._lock:
+            if vectors is not None:
+                self._check_dimensions(vectors)
+            for i, record_id in enumerate(ids):
+                position = self._positions.get(record_id)
+                if position is None:
+                    continue
+                entry = {"op": "set", "id": record_id}
+                if documents:
+                    entry["document"] = documents[i]
+                if metadatas and metadatas[i] is not None:
+                    merged = dict(self._metadatas[position] or {})
+                    for key, value in metadatas[i].items():
+                        if value is None:
+                            merged.pop(key, None)
+                        else:
+                            merged[key] = value
+                    entry["metadata"] = merged
+                if vectors is not None:
+                    entry["vector"] = vectors[i]
+                self._commit(entry)
+            self._compact_if_due()
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, **_):
+        with self._lock:
+            if ids is None:
+                targets = [record_id for record_id, metadata in zip(self._ids, self._metadatas)
+                           if matches_where(metadata, where)]
+            else:
+                targets = [record_id for record_id in ids if record_id in self._positions
+                           and matches_where(self._metadatas[self._positions[record_id]], where)]
+            for record_id in targets:
+                entry = {"op": "remove", "id": record_id}
+                last = len(self._ids) - 1
+                if self._positions[record_id] != last:
+                    # The last record's vector moves into the freed row
+                    entry["vector"] = np.array(self._vectors[last])
+                self._commit(entry)
+            self._compact_if_due()
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Optional[List[str]] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, **_) -> Dict[str, Any]:
+        include = include if include is not None else ["documents", "metadatas"]
+        with self._lock:
+            if ids is not None:
+                positions = [self._positions[record_id] for record_id in ids if record_id in self._positions]
+            else:
+                positions = range(len(self._ids))
+            positions = [p for p in positions if matches_where(self._metadatas[p], where)]
+            positions = positions[offset or 0:]
+            if limit is not None:
+                positions = positions[:limit]
+            return self._records(positions, include)
+
+    def query(self, query_embeddings=None, query_texts: Optional[List[str]] = None,
+              n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              include: Optional[List[str]] = None, **_) -> Dict[str, Any]:
+        include = include if include is not None else ["documents", "metadatas", "distances"]
+        if query_embeddings is None:
+            embed = getattr(self.embedding_function, "embed_query", self.embedding_function)
+            query_embeddings = embed(query_texts)
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+
+        results: Dict[str, Any] = {"ids": []}
+        for field in include:
+            results[field] = []
+        with self._lock:
+            count = len(self._ids)
+            candidates = None
+            if where:
+                candidates = np.array([p for p in range(count) if matches_where(self._metadatas[p], where)],
+                                      dtype=np.int64)
+            for query in queries:
+                positions, distances = self._nearest(query, n_results, candidates)
+                page = self._records(positions, [field for field in include if field != "distances"])
+                results["ids"].append(page["ids"])
+                for field in include:
+                    results[field].append(distances.tolist() if field == "distances" else page[field])
+        results["included"] = include
+        return results
+
+    # Storage
+
+    def _vectors_for(self, documents: Optional[List[Optional[str]]], embeddings) -> np.ndarray:
+        if embeddings is not None:
+            return np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        if self.embedding_function is None:
+            raise ValueError("No embeddings provided and the collection has no embedding function")
+        return np.asarray(self.embedding_function(list(documents)), dtype=np.float32)
+
+    def _nearest(self, query: np.ndarray, n_results: int, candidates: Optional[np.ndarray]):
+        count = len(self._ids)
+        if count == 0 or n_results <= 0 or (candidates is not None and len(candidates) == 0):
+            return [], np.zeros(0, dtype=np.float32)
+
+        vectors = self._vectors[:count]
+        norms = self._norms[:count]
+        if candidates is not None:
+            vectors = vectors[candidates]
+            norms = norms[candidates]
+
+        dots = vectors @ query
+        if self.space == "cosine":
+            query_norm = np.linalg.norm(query)
+            denominator = np.maximum(norms * query_norm, 1e-12)
+            distances = 1.0 - dots / denominator
+        elif self.space == "ip":
+            distances = 1.0 - dots
+        else:
+            # Squared L2, as reported by Chroma
+            distances = np.maximum(norms ** 2 + float(query @ query) - 2.0 * dots, 0.0)
+
+        k = min(n_results, len(distances))
+        top = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+        top = top[np.argsort(distances[top], kind="stable")]
+        positions = candidates[top] if candidates is not None else top
+        return positions.tolist(), distances[top].astype(np.float32)
+
+    def _records(self, positions, include: List[str]) -> Dict[str, Any]:
+        positions = list(positions)
+        records: Dict[str, Any] = {"ids": [self._ids[p] for p in positions]}
+        if "documents" in include:
+            records["documents"] = [self._documents[p] for p in positions]
+        if "metadatas" in include:
+            records["metadatas"] = [self._metadatas[p] for p in positions]
+        if "embeddings" in include:
+            records["embeddings"] = (np.array(self._vectors[positions]) if positions
+                                     else np.zeros((0, 0), dtype=np.float32))
+        return records
+
+    def _apply(self, entry: Dict[str, Any]):
+        """Apply one logged write; replaying a log applies its entries the same way"""
+        record_id = entry["id"]
+        vector = np.asarray(entry["vector"], dtype=np.float32) if entry.get("vector") is not None else None
+        if entry["op"] == "add":
+            position = len(self._ids)
+            self._ensure_capacity(position + 1, vector.shape[0])
+            self._ids.append(record_id)
+            self._documents.append(entry.get("document"))
+            self._metadatas.append(entry.get("metadata"))
+            self._positions[record_id] = position
+        elif entry["op"] == "set":
+            position = self._positions[record_id]
+            if "document" in entry:
+                self._documents[position] = entry["document"]
+            if "metadata" in entry:
+                self._metadatas[position] = entry["metadata"]
+        else:
+            # Swap the last record into the removed slot so live rows stay contiguous
+            position = self._positions.pop(record_id)
+            last = len(self._ids) - 1
+            if position != last:
+                self._ids[position] = self._ids[last]
+                self._documents[position] = self._documents[last]
+                self._metadatas[position] = self._metadatas[last]
+                self._positions[self._ids[position]] = position
+            self._ids.pop()
+            self._documents.pop()
+            self._metadatas.pop()
+        if vector is not None:
+            self._vectors[position] = vector
+            self._norms[position] = np.linalg.norm(vector)
+
+    def _check_dimensions(self, vectors: np.ndarray):
+        if self._vectors is not None and vectors.shape[1] != self._vectors.shape[1]:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match collection dimensionality {self._vectors.shape[1]}"
+            )
+
+    def _ensure_capacity(self, required: int, dimensions: int):
+        if self._vectors is not None and required <= self._vectors.shape[0]:
+            return
+        capacity = max(64, required, 2 * (self._vectors.shape[0] if self._vectors is not None else 0))
+        if self._vectors is not None:
+            dimensions = self._vectors.shape[1]
+
+        if self.directory:
+            temporary = self._vectors_path + ".tmp"
+            grown = np.lib.format.open_memmap(temporary, mode="w+", dtype=np.float32, shape=(capacity, dimensions))
+            if self._vectors is not None:
+                grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+                grown.flush()
+                del self._vectors
+            del grown
+            os.replace(temporary, self._vectors_path)
+            self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+        else:
+            grown = np.zeros((capacity, dimensions), dtype=np.float32)
+            if self._vectors is not None:
+                grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+            self._vectors = grown
+
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[:len(self._ids)] = self._norms[:len(self._ids)]
+        self._norms = norms
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.npy")
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.directory, "records.json")
+
+    def _log_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"records-{generation}.log")
+
+    def _commit(self, entry: Dict[str, Any]):
+        """
+        Log a write, then apply it.
+
+        Rows of the memory-mapped vectors can reach the file whenever the OS
+        writes them back, so a row only changes after the entry that sets it
+        is in the log. Entries carry every vector they write, which makes
+        replaying them over rows that were or were not written back give the
+        same result.
+        """
+        if self.directory:
+            logged = dict(entry, vector=entry["vector"].tolist()) if entry.get("vector") is not None else entry
+            self._log.write(json.dumps(logged) + "\n")
+            self._log.flush()
+            self._log_entries += 1
+        self._apply(entry)
+
+    def _compact_if_due(self):
+        """Fold the log into a new snapshot once it outgrows the collection"""
+        if self.directory and self._log_entries > max(MIN_LOG_ENTRIES, len(self._ids)):
+            self._save()
+
+    def _save(self):
+        """Write a snapshot of every record and start a new, empty log"""
+        if not self.directory:
+            return
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        previous = self._log_generation
+        self._log_generation += 1
+        temporary = self._records_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump({
+                "name": self.name,
+                "metadata": self.metadata,
+                "log_generation": self._log_generation,
+                "ids": self._ids,
+                "documents": self._documents,
+                "metadatas": self._metadatas
+            }, f)
+        # The snapshot names the log replayed after it, so a crash at any point
+        # leaves either the old snapshot and log or the new ones
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self._log_path(self._log_generation), "w")
+        os.replace(temporary, self._records_path)
+        self._log_entries = 0
+        if previous and os.path.exists(self._log_path(previous)):
+            os.remove(self._log_path(previous))
+
+    def _load(self):
+        if not os.path.exists(self._records_path):
+            self._save()
+            return
+        with open(self._records_path) as f:
+            stored = json.load(f)
+        self.metadata = stored.get("metadata") or self.metadata
+        self.space = self.metadata.get("hnsw:space", _DEFAULT_SPACE)
+        self._ids = stored["ids"]
+        self._documents = stored["documents"]
+        self._metadatas = stored["metadatas"]
+        self._positions = {record_id: i for i, record_id in enumerate(self._ids)}
+        if os.path.exists(self._vectors_path):
+            self._vectors = np.lib.format.open_memmap(self._vectors_path, mode="r+")
+            self._norms = np.zeros(self._vectors.shape[0], dtype=np.float32)
+
+        self._log_generation = stored.get("log_generation", 0)
+        replayed = self._replay(self._log_path(self._log_generation)) if self._log_generation else 0
+        if self._vectors is not None:
+            self._norms[:len(self._ids)] = np.linalg.norm(self._vectors[:len(self._ids)], axis=1)
+        if replayed or not self._log_generation:
+            # Fold the replayed writes (or a snapshot from before logging) into a fresh snapshot
+            self._save()
+        else:
+            self._log = open(self._log_path(self._log_generation), "a")
+
+    def _replay(self, path: str) -> int:
+        """Apply the logged writes to the loaded snapshot; returns how many were applied"""
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A write cut short by a crash; it was never applied
+                    break
+                self._apply(entry)
+                applied += 1
+        return applied
+
+
+class LocalVectorClient:
+    """In-process stand-in for chromadb.HttpClient"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Directory holding one subdirectory per collection; in-memory when empty
+        """
+        self.path = path or None
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.Lock()
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def heartbeat(self) -> int:
+        return time.time_ns()
+
+    def list_collections(self) -> List[LocalCollection]:
+        with self._lock:
+            names = set(self._collections)
+            if self.path:
+                names.update(
+                    entry for entry in os.listdir(self.path)
+                    if os.path.exists(os.path.join(self.path, entry, "records.json"))
+                )
+            return [self._open(name, None, None) for name in sorted(names)]
+
+    def get_or_create_collection(self, name: str, metadata: Optional[Dict[str, Any]] = None,
+                                 embedding_function=None, **_) -> LocalCollection:
+        with self._lock:
+            return self._open(name, metadata, embedding_function)
+
+    def get_collection(self, name: str, embedding_function=None, **_) -> LocalCollection:
+        with self._lock:
+            if not self._exists(name):
+                raise ValueError(f"Collection {name} does not exist.")
+            return self._open(name, None, embedding_function)
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            if not self._exists(name):
+                raise ValueError(f"Collection {name} does not exist.")
+            self._collections.pop(name, None)
+            if self.path:
+                shutil.rmtree(self._directory(name), ignore_errors=True)
+
+    def _exists(self, name: str) -> bool:
+        return name in self._collections or bool(
+            self.path and os.path.exists(os.path.join(self._directory(name), "records.json"))
+        )
+
+    def _open(self, name: str, metadata: Optional[Dict[str, Any]], embedding_function) -> LocalCollection:
+        """Open or create a collection; call with the lock held"""
+        collection = self._collections.get(name)
+        if collection is None:
+            directory = self._directory(name) if self.path else None
+            collection = LocalCollection(name, metadata, embedding_function, directory)
+            self._collections[name] = collection
+        elif embedding_function is not None:
+            collection.embedding_function = embedding_function
+        return collection
+
+    def _directory(self, name: str) -> str:
+        if not re.fullmatch(r"[\w.-]+", name) or name in (".", ".."):
+            raise ValueError(f"Invalid collection name: {name}")
+        return os.path.join(self.path, name)
@@ -2,9 +2,15 @@
 Global Tools API - A comprehensive FastAPI application for GCP Cloud Run
 """
 
+import os
+from datetime import datetime
+from typing import Optional
+
+import anyio
 from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Import models
 from models import (
@@ -13,8 +19,10 @@ from models import (
     ChromaDBStatusResponse, AddDocumentsRequest, QueryDocumentsRequest,
     UpdateDocumentsRequest, DeleteDocumentsRequest, CollectionInfoResponse,
     CollectionListResponse, AddMemoryRequest, SearchMemoryRequest,
-    AddMemoryResponse, SearchMemoryResponse, WriteStatusUpdateRequest,
+    AddMemoryResponse, SearchMemoryResponse, AddMemoriesBatchRequest,
+    AddMemoriesBatchResponse, WriteStatusUpdateRequest,
     ReadStatusUpdatesRequest, WriteStatusUpdateResponse, ReadStatusUpdatesResponse,
+    WriteStatusUpdatesBatchRequest, WriteStatusUpdatesBatchResponse,
     UserResponse, UpdateConversationNameRequest, UpdateConversationNameResponse
 )
 
@@ -29,6 +37,11 @@ from memory_service import MemoryService
 from status_service import StatusService
 from user_service import UserService
 from conversation_service import ConversationService
+from user_cache import UserCache
+from status_events import status_event_bus
+from memory_compaction import MemoryCompactionJob
+from contact_store import ContactStore
+import request_metrics
 
 app = FastAPI(
     title="Global Tools API",
@@ -37,15 +50,77 @@ app = FastAPI(
 )
 
 # Initialize services
-contact_service = ContactService(db_manager)
-search_service = SearchService()
-chroma_service = ChromaService(chroma_manager)
-memory_service = MemoryService(db_manager, chroma_manager)
+# One user cache is shared so a contact write invalidates it for every service
+contact_store = ContactStore(db_manager)
+user_cache = UserCache(db_manager, contact_store=contact_store)
+contact_service = ContactService(db_manager, user_cache, contact_store)
+search_service = SearchService(embed_fn=chroma_manager.embed_texts if chroma_manager else None)
+memory_service = MemoryService(db_manager, chroma_manager, user_cache=user_cache)
+chroma_service = ChromaService(chroma_manager, lexical_index=memory_service.lexical_index)
 health_service = HealthService(db_manager, search_service, chroma_manager)
-status_service = StatusService(db_manager)
-user_service = UserService(db_manager)
+memory_compaction_job = MemoryCompactionJob(
+    chroma_manager, on_compacted=memory_service.lexical_index.invalidate
+) if chroma_manager else None
+status_service = StatusService(db_manager, status_event_bus)
+user_service = UserService(db_manager, user_cache)
 conversation_service = ConversationService(db_manager)
 
+# The services use blocking clients (pymongo, chromadb, requests). Routes hand them to
+# the threadpool so a slow backend call never stalls the event loop.
+@app.on_event("startup")
+async def configure_threadpool():
+    """Size the worker threadpool used for blocking service calls"""
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = int(os.getenv("GLOBAL_TOOLS_THREADPOOL_SIZE", "40"))
+
+@app.on_event("startup")
+async def create_query_indexes():
+    """Make sure contact and status update queries are index-backed"""
+    if os.getenv("MONGODB_CREATE_QUERY_INDEXES", "true").lower() == "true":
+        await run_in_threadpool(db_manager.create_contact_indexes)
+        await run_in_threadpool(db_manager.create_status_indexes)
+
+@app.on_event("startup")
+async def start_user_cache_change_stream():
+    """Follow Users writes from other instances (requires a replica set)"""
+    if os.getenv("USER_CACHE_CHANGE_STREAMS", "false").lower() == "true":
+        user_cache.start_change_stream()
+
+@app.on_event("startup")
+async def start_status_change_stream():
+    """Push status updates written by other instances to this instance's streams"""
+    if os.getenv("STATUS_STREAM_CHANGE_STREAMS", "false").lower() == "true" and db_manager.database is not None:
+        status_event_bus.start_change_stream(db_manager.status_updates)
+
+@app.on_event("startup")
+async def start_memory_compaction():
+    """Periodically merge near-duplicate memories (MEMORY_COMPACTION_INTERVAL_SECONDS > 0)"""
+    if memory_compaction_job and memory_compaction_job.interval > 0:
+        memory_compaction_job.start()
+
+@app.on_event("shutdown")
+async def stop_memory_compaction():
+    if memory_compaction_job:
+        memory_compaction_job.stop()
+
+@app.on_event("shutdown")
+async def flush_status_write_buffer():
+    """Store buffered status updates before the process exits"""
+    await run_in_threadpool(status_service.close)
+
+# Per-request metrics
+@app.middleware("http")
+async def track_request_metrics(request: Request, call_next):
+    """Attribute backend round trips (e.g. Chroma control-plane calls) to the endpoint"""
+    token = request_metrics.begin_request()
+    response = await call_next(request)
+    
+    route = request.scope.get("route")
+    endpoint = f"{request.method} {route.path if route else request.url.path}"
+    counters = request_metrics.end_request(token, endpoint)
+    response.headers["X-Chroma-Control-Plane-Calls"] = str(int(counters.get("chroma_control_plane_calls", 0)))
+    return response
+
 # Exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -90,6 +165,7 @@ async def root():
             "contacts": "/api/contacts/add, /api/contacts/update, /api/contacts/{user_id}",
             "memory": "/api/memory/add, /api/memory/search",
             "database": "/api/database/status",
+            "metrics": "/api/metrics",
             "vector": "/api/vector/collections, /api/vector/documents/*, /api/vector/status",
             "conversations": "/api/conversations/name"
         }
@@ -98,12 +174,12 @@ async def root():
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Enhanced health check with service status monitoring"""
-    return health_service.get_health_status()
+    return await run_in_threadpool(health_service.get_health_status)
 
 @app.get("/api/info", response_model=ServiceInfoResponse)
 async def get_info():
     """Get detailed service information"""
-    return health_service.get_service_info()
+    return await run_in_threadpool(health_service.get_service_info)
 
 @app.get("/api/search", response_model=SearchResponse)
 async def search_web(query: str):
@@ -113,12 +189,12 @@ async def search_web(query: str):
     This endpoint provides formatted context suitable for LLM consumption,
     rather than raw search results.
     """
-    return search_service.search(query)
+    return await search_service.search_async(query)
 
 @app.get("/api/database/status", response_model=DatabaseStatsResponse)
 async def database_status():
     """Get database connection status and statistics"""
-    return health_service.get_database_stats()
+    return await run_in_threadpool(health_service.get_database_stats)
 
 @app.post("/api/contacts/add")
 async def add_contact(request: AddContactRequest):
@@ -128,7 +204,7 @@ async def add_contact(request: AddContactRequest):
     Supports partial contact information - only email is required.
     Additional fields can be added later using the update endpoint.
     """
-    return contact_service.add_contact(request)
+    return await run_in_threadpool(contact_service.add_contact, request)
 
 @app.patch("/api/contacts/update")
 async def update_contact(request: UpdateContactRequest):
@@ -138,7 +214,7 @@ async def update_contact(request: UpdateContactRequest):
     Allows progressive enhancement of contact data.
     At least one field must be provided for update.
     """
-    return contact_service.update_contact(request)
+    return await run_in_threadpool(contact_service.update_contact, request)
 
 @app.get("/api/contacts/{user_id}")
 async def get_user_contacts(user_id: str):
@@ -147,14 +223,14 @@ async def get_user_contacts(user_id: str):
     
     Returns contact list with indicators for complete vs partial contacts.
     """
-    return contact_service.get_user_contacts(user_id)
+    return await run_in_threadpool(contact_service.get_user_contacts, user_id)
 
 @app.get("/api/user/{user_id}", response_model=UserResponse)
 async def get_user(user_id: str):
     """
     Get a single user by their MongoDB _id
     """
-    return user_service.get_user_by_id(user_id)
+    return await run_in_threadpool(user_service.get_user_by_id, user_id)
 
 @app.patch("/api/conversations/name", response_model=UpdateConversationNameResponse)
 async def update_conversation_name(request: UpdateConversationNameRequest):
@@ -165,7 +241,30 @@ async def update_conversation_name(request: UpdateConversationNameRequest):
     a conversation_id and the new name. The conversation must already exist,
     otherwise a 404 error will be returned.
     """
-    return conversation_service.update_conversation_name(request)
+    return await run_in_threadpool(conversation_service.update_conversation_name, request)
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Get per-endpoint backend call counters
+    
+    Reports how many Chroma control-plane calls (collection lookups/creations)
+    each endpoint makes per request, plus collection handle and user cache hits.
+    """
+    summary = request_metrics.get_summary()
+    if chroma_manager:
+        summary["collection_cache"] = chroma_manager.get_collection_cache_stats()
+    summary["user_cache"] = user_cache.get_stats()
+    summary["search_cache"] = search_service.get_cache_stats()
+    summary["search_coalescing"] = search_service.get_coalescing_stats()
+    summary["memory_search_coalescing"] = memory_service.get_coalescing_stats()
+    summary["memory_lexical_index"] = memory_service.get_lexical_index_stats()
+    summary["memory_ranking"] = memory_service.get_ranking_config()
+    summary["status_streams"] = status_event_bus.get_stats()
+    summary["status_write_buffer"] = status_service.get_write_buffer_stats()
+    if memory_compaction_job:
+        summary["memory_compaction"] = memory_compaction_job.get_stats()
+    return summary
 
 # Memory Management endpoints
 @app.post("/api/memory/add", response_model=AddMemoryResponse)
@@ -178,33 +277,45 @@ async def add_memory(request: AddMemoryRequest):
     Both contact_id and email can be provided - they must refer to the same contact.
     Email addresses are looked up to find the corresponding contact ID.
     """
-    return memory_service.add_memory(request)
+    return await run_in_threadpool(memory_service.add_memory, request)
+
+@app.post("/api/memory/add_batch", response_model=AddMemoriesBatchResponse)
+async def add_memories_batch(request: AddMemoriesBatchRequest):
+    """
+    Add many memories for a user in one request
+    
+    Each item takes the same memory, contact_id and email fields as /api/memory/add.
+    Contacts are resolved once per batch, all memories are embedded together and
+    each target collection is written once. Returns one result per item; items that
+    fail do not prevent the others from being stored.
+    """
+    return await run_in_threadpool(memory_service.add_memories_batch, request)
 
 @app.post("/api/memory/search", response_model=SearchMemoryResponse)
 async def search_memory(request: SearchMemoryRequest):
     """Search memory using natural language query"""
-    return memory_service.search_memories(request)
+    return await run_in_threadpool(memory_service.search_memories, request)
 
 # ChromaDB / Vector Database endpoints
 @app.get("/api/vector/status", response_model=ChromaDBStatusResponse)
 async def vector_database_status():
     """Get ChromaDB connection status and statistics"""
-    return health_service.get_chroma_status()
+    return await run_in_threadpool(health_service.get_chroma_status)
 
 @app.get("/api/vector/collections", response_model=CollectionListResponse)
 async def list_vector_collections():
     """List all ChromaDB collections"""
-    return chroma_service.list_collections()
+    return await run_in_threadpool(chroma_service.list_collections)
 
 @app.get("/api/vector/collections/{collection_name}", response_model=CollectionInfoResponse)
 async def get_collection_info(collection_name: str):
     """Get information about a specific ChromaDB collection"""
-    return chroma_service.get_collection_info(collection_name)
+    return await run_in_threadpool(chroma_service.get_collection_info, collection_name)
 
 @app.delete("/api/vector/collections/{collection_name}")
 async def delete_collection(collection_name: str):
     """Delete a ChromaDB collection"""
-    return chroma_service.delete_collection(collection_name)
+    return await run_in_threadpool(chroma_service.delete_collection, collection_name)
 
 @app.post("/api/vector/documents/add")
 async def add_documents_to_collection(request: AddDocumentsRequest):
@@ -214,16 +325,22 @@ async def add_documents_to_collection(request: AddDocumentsRequest):
     Automatically creates the collection if it doesn't exist.
     Documents will be embedded using the configured embedding service.
     """
-    return chroma_service.add_documents(request)
+    return await run_in_threadpool(chroma_service.add_documents, request)
 
 @app.post("/api/vector/documents/query")
-async def query_documents_in_collection(request: QueryDocumentsRequest):
+async def query_documents_in_collection(request: QueryDocumentsRequest, http_request: Request, stream: bool = False):
     """
     Query documents from a ChromaDB collection using semantic search
     
     Returns the most similar documents based on the query text embeddings.
+    With `?stream=true` (or `Accept: application/x-ndjson`) the hits are streamed
+    as NDJSON, one line per (query, hit) as each query completes, followed by an
+    `end` line.
     """
-    return chroma_service.query_documents(request)
+    if stream or "application/x-ndjson" in http_request.headers.get("accept", ""):
+        lines = await run_in_threadpool(chroma_service.stream_query_documents, request)
+        return StreamingResponse(lines, media_type="application/x-ndjson")
+    return await run_in_threadpool(chroma_service.query_documents, request)
 
 @app.patch("/api/vector/documents/update")
 async def update_documents_in_collection(request: UpdateDocumentsRequest):
@@ -232,7 +349,7 @@ async def update_documents_in_collection(request: UpdateDocumentsRequest):
     
     Can update document content and/or metadata for existing documents.
     """
-    return chroma_service.update_documents(request)
+    return await run_in_threadpool(chroma_service.update_documents, request)
 
 @app.post("/api/vector/documents/delete")
 async def delete_documents_from_collection(request: DeleteDocumentsRequest):
@@ -242,18 +359,62 @@ async def delete_documents_from_collection(request: DeleteDocumentsRequest):
     Removes documents by their IDs from the specified collection.
     Note: Uses POST instead of DELETE to properly support request body.
     """
-    return chroma_service.delete_documents(request)
+    return await run_in_threadpool(chroma_service.delete_documents, request)
 
 # Status update endpoints
 @app.post("/api/status/write", response_model=WriteStatusUpdateResponse)
 async def write_status_update(request: WriteStatusUpdateRequest):
     """Write a status update to the database"""
-    return status_service.write_status_update(request)
+    return await run_in_threadpool(status_service.write_status_update, request)
+
+@app.post("/api/status/write_batch", response_model=WriteStatusUpdatesBatchResponse)
+async def write_status_updates_batch(request: WriteStatusUpdatesBatchRequest):
+    """
+    Write up to 500 status updates in one request
+    
+    All updates are validated first and the batch is rejected if any is
+    invalid. Valid batches are stored with a single unordered insert_many;
+    per-update insert failures are reported in `failed`.
+    """
+    return await run_in_threadpool(status_service.write_status_updates_batch, request)
 
 @app.post("/api/status/read", response_model=ReadStatusUpdatesResponse)
 async def read_status_updates(request: ReadStatusUpdatesRequest):
     """Read status updates from the database with optional filtering"""
-    return status_service.read_status_updates(request)
+    return await run_in_threadpool(status_service.read_status_updates, request)
+
+@app.get("/api/status/stream")
+async def stream_status_updates(
+    request: Request,
+    conversation_id: str,
+    agent_type: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    from_now: bool = False
+):
+    """
+    Stream status updates for a conversation as Server-Sent Events
+    
+    Replays the updates after `cursor` or `since` (or the whole history, or
+    nothing with `from_now`), then pushes new updates as soon as they are
+    written, so waiting agents do not need to poll `/api/status/read`. Each event's id is a resume cursor;
+    reconnecting clients send it back as the Last-Event-ID header.
+    """
+    read_request = ReadStatusUpdatesRequest(
+        conversation_id=conversation_id,
+        agent_type=agent_type,
+        agent_id=agent_id,
+        cursor=cursor or request.headers.get("last-event-id"),
+        # The server's clock, not the caller's, decides what "new" means
+        since=datetime.utcnow() if from_now and not since else since
+    )
+    events = await status_service.open_status_stream(read_request)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Deduplication and compaction of stored memories
+
+Agents are told to store memories liberally, so collections accumulate
+near-identical entries ("User prefers window seats" stored dozens of times),
+which makes searches slower and their results noisier. Compaction clusters
+memories whose embeddings are nearly identical and keeps one memory per
+cluster, the most recent one, with provenance in its metadata:
+
+- duplicate_count: how many stored memories the survivor stands for
+- merged_ids: IDs of the memories merged into it (most recent last, capped)
+- first_seen_at / last_seen_at: creation time range of the merged memories
+- compacted_at: when compaction last examined the memory
+
+Only memories (records with a `memory_type`) are compacted, and only within
+the same user, memory type and contact, so the tenant layout is safe too. A
+collection without memories added since its last compaction is skipped.
+
+Run once:
+    python memory_compaction.py [--collection NAME] [--threshold 0.95] [--dry-run]
+
+Or set MEMORY_COMPACTION_INTERVAL_SECONDS to run it in the background of the API.
+"""
+
+import os
+import time
+import logging
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_PAGE_SIZE = 500
+MAX_MERGED_IDS = 50
+LATENCY_PROBES = 5
+
+
+def _group_key(metadata: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+    return metadata.get("user_id"), metadata.get("memory_type"), metadata.get("contact_id")
+
+
+def _load_memories(chroma_manager, collection_name: str) -> Dict[str, Any]:
+    """All memories of a collection with unit-length embeddings, oldest first"""
+    ids, documents, metadatas, embeddings = [], [], [], []
+    offset = 0
+    while True:
+        page = chroma_manager.get_documents(
+            collection_name,
+            include=["documents", "metadatas", "embeddings"],
+            limit=COMPACTION_PAGE_SIZE,
+            offset=offset
+        )
+        page_ids = page.get("ids") or []
+        if not page_ids:
+            break
+        offset += len(page_ids)
+        page_metadatas = page.get("metadatas") or [None] * len(page_ids)
+        for i, memory_id in enumerate(page_ids):
+            metadata = page_metadatas[i] or {}
+            if not metadata.get("memory_type"):
+                continue
+            ids.append(memory_id)
+            documents.append(page["documents"][i])
+            metadatas.append(metadata)
+            embeddings.append(page["embeddings"][i])
+
+    order = sorted(range(len(ids)), key=lambda i: metadatas[i].get("created_at", ""))
+    if order:
+        vectors = np.asarray([embeddings[i] for i in order], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    return {
+        "ids": [ids[i] for i in order],
+        "documents": [documents[i] for i in order],
+        "metadatas": [metadatas[i] for i in order],
+        "vectors": vectors
+    }
+
+
+def cluster_memories(vectors: np.ndarray, groups: List[Any], threshold: float) -> List[List[int]]:
+    """
+    Greedy clustering: each memory joins the most similar existing cluster of
+    its group if the cosine similarity to that cluster's first member is at
+    least the threshold, otherwise it starts a new cluster.
+
+    Returns:
+        Clusters as lists of row indexes, in input order
+    """
+    clusters: List[List[int]] = []
+    leaders: Dict[Any, List[int]] = {}  # group -> cluster indexes
+    for row, group in enumerate(groups):
+        candidates = leaders.setdefault(group, [])
+        if candidates:
+            leader_rows = [clusters[c][0] for c in candidates]
+            similarities = vectors[leader_rows] @ vectors[row]
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                clusters[candidates[best]].append(row)
+                continue
+        candidates.append(len(clusters))
+        clusters.append([row])
+    return clusters
+
+
+def _merged_metadata(memories: Dict[str, Any], cluster: List[int], compacted_at: str) -> Dict[str, Any]:
+    """Metadata of a cluster's survivor (its most recent member) with provenance"""
+    metadatas = [memories["metadatas"][row] for row in cluster]
+    survivor = dict(metadatas[-1])
+
+    merged_ids = []
+    for row, metadata in zip(cluster, metadatas):
+        earlier = metadata.get("merged_ids")
+        if earlier:
+            merged_ids.extend(earlier.split(","))
+        if row != cluster[-1]:
+            merged_ids.append(memories["ids"][row])
+
+    created = [m.get("first_seen_at") or m.get("created_at") for m in metadatas]
+    last_seen = [m.get("last_seen_at") or m.get("created_at") for m in metadatas]
+    survivor.update({
+        "duplicate_count": sum(int(m.get("duplicate_count", 1)) for m in metadatas),
+        "merged_ids": ",".join(merged_ids[-MAX_MERGED_IDS:]),
+        "first_seen_at": min(c for c in created if c) if any(created) else compacted_at,
+        "last_seen_at": max(c for c in last_seen if c) if any(last_seen) else compacted_at,
+        "compacted_at": compacted_at
+    })
+    return survivor
+
+
+def _search_latency_ms(chroma_manager, collection_name: str, probes: np.ndarray, n_results: int = 10) -> Optional[float]:
+    """Average latency of a top-n search for each probe vector"""
+    if len(probes) == 0:
+        return None
+    started = time.perf_counter()
+    for probe in probes:
+        chroma_manager.query_documents(
+            collection_name, query_embeddings=[probe.tolist()], n_results=n_results, include=["distances"]
+        )
+    return round((time.perf_counter() - started) * 1000 / len(probes), 2)
+
+
+def compact_collection(chroma_manager, collection_name: str, threshold: Optional[float] = None,
+                       dry_run: bool = False, force: bool = False) -> Dict[str, Any]:
+    """
+    Merge near-duplicate memories of one collection.
+
+    Args:
+        chroma_manager: ChromaManager instance
+        collection_name: Collection to compact
+        threshold: Minimum cosine similarity of duplicates (env MEMORY_COMPACTION_THRESHOLD)
+        dry_run: Only report what would be merged
+        force: Compact even if no memory was added since the last compaction
+
+    Returns:
+        Report with memory counts before and after and the search latency change
+    """
+    threshold = threshold if threshold is not None else float(os.getenv("MEMORY_COMPACTION_THRESHOLD", "0.95"))
+    report = {
+        "collection": collection_name, "memories_before": 0, "memories_after": 0,
+        "clusters_merged": 0, "removed": 0, "skipped": False, "dry_run": dry_run
+    }
+
+    memories = _load_memories(chroma_manager, collection_name)
+    count = len(memories["ids"])
+    report["memories_before"] = report["memories_after"] = count
+    if not force and all(metadata.get("compacted_at") for metadata in memories["metadatas"]):
+        report["skipped"] = True
+        return report
+
+    groups = [_group_key(metadata) for metadata in memories["metadatas"]]
+    clusters = cluster_memories(memories["vectors"], groups, threshold)
+    duplicates = [cluster for cluster in clusters if len(cluster) > 1]
+
+    # Probe with memories that survive, so the same queries run before and after
+    probe_rows = [cluster[-1] for cluster in clusters][-LATENCY_PROBES:]
+    probes = memories["vectors"][probe_rows]
+    report["search_ms_before"] = _search_latency_ms(chroma_manager, collection_name, probes)
+
+    compacted_at = datetime.utcnow().isoformat()
+    survivor_ids, survivor_metadatas, removed_ids = [], [], []
+    for cluster in clusters:
+        survivor = cluster[-1]
+        if len(cluster) > 1:
+            metadata = _merged_metadata(memories, cluster, compacted_at)
+            removed_ids.extend(memories["ids"][row] for row in cluster[:-1])
+        elif memories["metadatas"][survivor].get("compacted_at"):
+            continue
+        else:
+            metadata = {**memories["metadatas"][survivor], "compacted_at": compacted_at}
+        survivor_ids.append(memories["ids"][survivor])
+        survivor_metadatas.append(metadata)
+
+    report["clusters_merged"] = len(duplicates)
+    report["removed"] = len(removed_ids)
+    report["memories_after"] = count - len(removed_ids)
+
+    if not dry_run:
+        # Record provenance on the survivors before removing what they replace
+        for start in range(0, len(survivor_ids), COMPACTION_PAGE_SIZE):
+            chroma_manager.update_documents(
+                collection_name,
+                ids=survivor_ids[start:start + COMPACTION_PAGE_SIZE],
+                metadatas=survivor_metadatas[start:start + COMPACTION_PAGE_SIZE]
+            )
+        for start in range(0, len(removed_ids), COMPACTION_PAGE_SIZE):
+            chroma_manager.delete_documents(collection_name, removed_ids[start:start + COMPACTION_PAGE_SIZE])
+        report["search_ms_after"] = _search_latency_ms(chroma_manager, collection_name, probes)
+
+    if count:
+        report["size_reduction"] = round(len(removed_ids) / count, 4)
+    return report
+
+
+class MemoryCompactionJob:
+    """Compacts memory collections one at a time on a background thread"""
+
+    def __init__(self, chroma_manager, interval_seconds: Optional[float] = None,
+                 threshold: Optional[float] = None,
+                 on_compacted: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            chroma_manager: ChromaManager instance
+            interval_seconds: Pause between passes over all collections (env MEMORY_COMPACTION_INTERVAL_SECONDS)
+            threshold: Minimum cosine similarity of duplicates (env MEMORY_COMPACTION_THRESHOLD)
+            on_compacted: Called with the name of each collection that lost memories
+        """
+        self.chroma_manager = chroma_manager
+        self.on_compacted = on_compacted
+        self.interval = (interval_seconds if interval_seconds is not None
+                         else float(os.getenv("MEMORY_COMPACTION_INTERVAL_SECONDS", "0")))
+        self.threshold = threshold
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "passes": 0, "collections_compacted": 0, "collections_skipped": 0,
+            "memories_removed": 0, "errors": 0, "last_pass_at": None
+        }
+        self._last_reports: List[Dict[str, Any]] = []
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_pass(self) -> List[Dict[str, Any]]:
+        """Compact every collection once"""
+        reports = []
+        for collection_name in self.chroma_manager.list_collections().get("collections", []):
+            if self._stop.is_set():
+                break
+            try:
+                report = compact_collection(self.chroma_manager, collection_name, self.threshold)
+            except Exception as e:
+                logger.warning(f"Memory compaction of '{collection_name}' failed: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                continue
+            with self._lock:
+                if report["skipped"]:
+                    self._stats["collections_skipped"] += 1
+                else:
+                    self._stats["collections_compacted"] += 1
+                    self._stats["memories_removed"] += report["removed"]
+            if report["removed"]:
+                logger.info(f"Compacted '{collection_name}': {report['memories_before']} -> "
+                            f"{report['memories_after']} memories, search "
+                            f"{report.get('search_ms_before')} -> {report.get('search_ms_after')} ms")
+                reports.append(report)
+                if self.on_compacted:
+                    self.on_compacted(collection_name)
+
+        with self._lock:
+            self._stats["passes"] += 1
+            self._stats["last_pass_at"] = datetime.utcnow().isoformat()
+            self._last_reports = (self._last_reports + reports)[-10:]
+        return reports
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "interval_seconds": self.interval,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "recent": list(self._last_reports)
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_pass()
+            if self._stop.wait(self.interval):
+                return
+
+
+def main():
+    """Command line entry point for one compaction pass"""
+    parser = argparse.ArgumentParser(description="Merge near-duplicate memories in ChromaDB")
+    parser.add_argument("--collection", help="Only compact this collection")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="Minimum cosine similarity of duplicates (defaults to MEMORY_COMPACTION_THRESHOLD or 0.95)")
+    parser.add_argument("--force", action="store_true", help="Also compact collections without new memories")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be merged")
+    args = parser.parse_args()
+
+    from chromaManager import chroma_manager
+
+    if chroma_manager is None:
+        raise SystemExit("ChromaDB must be reachable to compact memories")
+
+    if args.collection:
+        collection_names = [args.collection]
+    else:
+        collection_names = chroma_manager.list_collections().get("collections", [])
+
+    totals = {"before": 0, "after": 0}
+    for collection_name in collection_names:
+        report = compact_collection(chroma_manager, collection_name, args.threshold,
+                                    dry_run=args.dry_run, force=args.force)
+        if not report["memories_before"]:
+            continue
+        totals["before"] += report["memories_before"]
+        totals["after"] += report["memories_after"]
+        if report["skipped"]:
+            print(f"{collection_name}: {report['memories_before']} memories, no new memories since last compaction")
+            continue
+        latency = ""
+        if report.get("search_ms_before") is not None:
+            latency = f", search {report['search_ms_before']} ms"
+            if report.get("search_ms_after") is not None:
+                latency += f" -> {report['search_ms_after']} ms"
+        print(f"{collection_name}: {report['memories_before']} -> {report['memories_after']} memories "
+              f"({report['clusters_merged']} clusters merged{latency})")
+
+    prefix = "[dry run] " if args.dry_run else ""
+    reduction = 1 - totals["after"] / totals["before"] if totals["before"] else 0.0
+    print(f"{prefix}Compacted {totals['before']} -> {totals['after']} memories ({reduction:.1%} smaller)")
+
+
+if __name__ == "__main__":
+    main()
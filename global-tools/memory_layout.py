@@ -0,0 +1,203 @@
+"""
+Storage layouts for user and contact memories in ChromaDB
+
+Two layouts are supported:
+
+- per_contact (default): one collection per user (named after the user ID) and
+  one per contact (named after the contact ID).
+- tenant: all memories of a user live in a single collection (or in one of a
+  fixed set of shared shards), and contact/memory type are selected with
+  metadata `where` filters. Searching a user with many contacts is one ANN query.
+
+Run `python memory_layout.py migrate` to copy existing per-contact collections
+into the tenant layout.
+"""
+
+import os
+import hashlib
+import logging
+import argparse
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PER_CONTACT_LAYOUT = "per_contact"
+TENANT_LAYOUT = "tenant"
+
+MIGRATION_PAGE_SIZE = 500
+
+
+class MemoryLayout:
+    """Maps users and contacts to ChromaDB collections and metadata filters"""
+
+    def __init__(self, mode: Optional[str] = None, shards: Optional[int] = None):
+        """
+        Args:
+            mode: "per_contact" or "tenant" (defaults to env MEMORY_STORAGE_LAYOUT)
+            shards: Number of shared shard collections for the tenant layout;
+                0 gives every user a dedicated collection (defaults to env MEMORY_TENANT_SHARDS)
+        """
+        self.mode = (mode or os.getenv("MEMORY_STORAGE_LAYOUT", PER_CONTACT_LAYOUT)).strip().lower()
+        if self.mode not in (PER_CONTACT_LAYOUT, TENANT_LAYOUT):
+            raise ValueError(
+                f"Unknown MEMORY_STORAGE_LAYOUT '{self.mode}', "
+                f"expected '{PER_CONTACT_LAYOUT}' or '{TENANT_LAYOUT}'"
+            )
+        self.shards = shards if shards is not None else int(os.getenv("MEMORY_TENANT_SHARDS", "0"))
+
+    @property
+    def is_tenant(self) -> bool:
+        return self.mode == TENANT_LAYOUT
+
+    def tenant_collection(self, user_id: str) -> str:
+        """Name of the collection holding all memories of a user in the tenant layout"""
+        if self.shards > 0:
+            shard = int(hashlib.sha1(user_id.encode("utf-8")).hexdigest(), 16) % self.shards
+            return f"memories_shard_{shard:03d}"
+        return f"memories_{user_id}"
+
+    def search_filter(self, user_id: str, memory_type: Optional[str] = None,
+                      contact_id: Optional[str] = None) -> Dict[str, Any]:
+        """Build the `where` filter selecting a user's memories in the tenant layout"""
+        conditions = [{"user_id": user_id}]
+        if memory_type:
+            conditions.append({"memory_type": memory_type})
+        if contact_id:
+            conditions.append({"contact_id": contact_id})
+
+        if len(conditions) == 1:
+            return conditions[0]
+        return {"$and": conditions}
+
+
+def migrate_user_memories(chroma_manager, layout: MemoryLayout, user_id: str,
+                          contact_ids: List[str], delete_source: bool = False,
+                          dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Copy a user's per-contact collections into their tenant collection.
+
+    Stored embeddings are copied as-is, so nothing is re-embedded. Memories that
+    already exist in the target are skipped, which makes the migration safe to rerun.
+
+    Args:
+        chroma_manager: ChromaManager instance
+        layout: Layout describing the target tenant collection
+        user_id: User whose memories are migrated
+        contact_ids: IDs of the user's contacts
+        delete_source: Delete each source collection after it has been copied
+        dry_run: Only count what would be copied
+
+    Returns:
+        Migration report for the user
+    """
+    target = layout.tenant_collection(user_id)
+    report = {"user_id": user_id, "target_collection": target, "collections": {}, "copied": 0, "skipped": 0}
+
+    sources = [(user_id, "user", None)] + [(contact_id, "contact", contact_id) for contact_id in contact_ids]
+
+    for collection_name, memory_type, contact_id in sources:
+        if collection_name == target:
+            continue
+
+        copied = skipped = 0
+        offset = 0
+        while True:
+            page = chroma_manager.get_documents(
+                collection_name,
+                include=["documents", "metadatas", "embeddings"],
+                limit=MIGRATION_PAGE_SIZE,
+                offset=offset
+            )
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            offset += len(ids)
+
+            existing = set()
+            if not dry_run:
+                existing = set(chroma_manager.get_documents(target, ids=ids, include=[]).get("ids") or [])
+
+            new_rows = [i for i, memory_id in enumerate(ids) if memory_id not in existing]
+            skipped += len(ids) - len(new_rows)
+            if not new_rows:
+                continue
+
+            metadatas = []
+            for i in new_rows:
+                metadata = dict((page.get("metadatas") or [None] * len(ids))[i] or {})
+                metadata.setdefault("user_id", user_id)
+                metadata.setdefault("memory_type", memory_type)
+                if contact_id:
+                    metadata.setdefault("contact_id", contact_id)
+                metadatas.append(metadata)
+
+            if not dry_run:
+                chroma_manager.add_documents(
+                    collection_name=target,
+                    documents=[page["documents"][i] for i in new_rows],
+                    metadatas=metadatas,
+                    ids=[ids[i] for i in new_rows],
+                    embeddings=[list(map(float, page["embeddings"][i])) for i in new_rows]
+                )
+            copied += len(new_rows)
+
+        if offset and delete_source and not dry_run:
+            chroma_manager.delete_collection(collection_name)
+
+        if offset:
+            report["collections"][collection_name] = {"copied": copied, "skipped": skipped}
+        report["copied"] += copied
+        report["skipped"] += skipped
+
+    return report
+
+
+def main():
+    """Command line entry point for layout migrations"""
+    parser = argparse.ArgumentParser(description="Manage the memory storage layout in ChromaDB")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Copy per-contact collections into the tenant layout")
+    migrate.add_argument("--user-id", help="Only migrate this user (MongoDB _id)")
+    migrate.add_argument("--shards", type=int, default=None,
+                         help="Number of shared shard collections (defaults to MEMORY_TENANT_SHARDS)")
+    migrate.add_argument("--delete-source", action="store_true",
+                         help="Delete per-contact collections after copying them")
+    migrate.add_argument("--dry-run", action="store_true", help="Report what would be copied")
+
+    args = parser.parse_args()
+
+    from bson import ObjectId
+    from dbmanager import db_manager
+    from chromaManager import chroma_manager
+    from contact_store import ContactStore, COLLECTION_STORAGE
+
+    if chroma_manager is None or not db_manager.is_connected():
+        raise SystemExit("ChromaDB and MongoDB must both be reachable to migrate memories")
+
+    layout = MemoryLayout(mode=TENANT_LAYOUT, shards=args.shards)
+    query = {"_id": ObjectId(args.user_id)} if args.user_id else {}
+
+    totals = {"users": 0, "copied": 0, "skipped": 0}
+    for user in db_manager.users.find(query, {"_id": 1, "uid": 1, "contacts_storage": 1, "Contacts.uid": 1}):
+        user_id = str(user["_id"])
+        if ContactStore.storage_of(user) == COLLECTION_STORAGE:
+            contacts = db_manager.contacts.find({"user_id": user.get("uid")}, {"uid": 1, "_id": 0})
+        else:
+            contacts = user.get("Contacts", [])
+        contact_ids = [contact["uid"] for contact in contacts if contact.get("uid")]
+        report = migrate_user_memories(
+            chroma_manager, layout, user_id, contact_ids,
+            delete_source=args.delete_source, dry_run=args.dry_run
+        )
+        totals["users"] += 1
+        totals["copied"] += report["copied"]
+        totals["skipped"] += report["skipped"]
+        print(f"{user_id}: copied {report['copied']}, skipped {report['skipped']} -> {report['target_collection']}")
+
+    prefix = "[dry run] " if args.dry_run else ""
+    print(f"{prefix}Migrated {totals['users']} users: {totals['copied']} memories copied, {totals['skipped']} already present")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Re-ranking of memory search candidates by relevance, recency, type and contact
+
+Similarity alone ranks a preference stated two years ago level with one stated
+yesterday. The ranker scores the merged candidate set of a search in one
+vectorized pass:
+
+    score = type_weight * ((1 - w_recency - w_contact) * relevance
+                           + w_recency * 0.5 ** (age_days / half_life_days)
+                           + w_contact * affinity)
+
+relevance is the candidate's fused score (hybrid search) or negated distance
+(vector search), min-max normalized over the candidates; affinity is 1 for
+memories about the contact the search focuses on and 0 otherwise. Searches
+without a focus contact give its share to relevance.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from models import MemoryResponse
+
+SECONDS_PER_DAY = 86400.0
+
+
+def parse_type_weights(value: str) -> Dict[str, float]:
+    """Parse "user:1.0,contact:0.8" into {"user": 1.0, "contact": 0.8}"""
+    weights = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        memory_type, _, weight = entry.partition(":")
+        try:
+            weights[memory_type.strip()] = float(weight)
+        except ValueError:
+            raise ValueError(f"Invalid MEMORY_RANKING_TYPE_WEIGHTS entry '{entry}', expected type:weight")
+    return weights
+
+
+class MemoryRanker:
+    """Scores and orders memory search candidates"""
+
+    def __init__(self, enabled: Optional[bool] = None, recency_weight: Optional[float] = None,
+                 half_life_days: Optional[float] = None, contact_weight: Optional[float] = None,
+                 type_weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            enabled: False keeps the retrieval order (env MEMORY_RANKING, "on" or "off")
+            recency_weight: Share of the score given to recency (env MEMORY_RANKING_RECENCY_WEIGHT)
+            half_life_days: Age at which a memory's recency halves (env MEMORY_RANKING_HALF_LIFE_DAYS)
+            contact_weight: Share of the score given to the focus contact (env MEMORY_RANKING_CONTACT_WEIGHT)
+            type_weights: Multiplier per memory type, 1.0 for unlisted types
+                (env MEMORY_RANKING_TYPE_WEIGHTS, e.g. "user:1.0,contact:0.8")
+        """
+        self.enabled = (enabled if enabled is not None
+                        else os.getenv("MEMORY_RANKING", "on").strip().lower() != "off")
+        self.recency_weight = (recency_weight if recency_weight is not None
+                               else float(os.getenv("MEMORY_RANKING_RECENCY_WEIGHT", "0.2")))
+        self.half_life_days = half_life_days or float(os.getenv("MEMORY_RANKING_HALF_LIFE_DAYS", "30"))
+        self.contact_weight = (contact_weight if contact_weight is not None
+                               else float(os.getenv("MEMORY_RANKING_CONTACT_WEIGHT", "0.2")))
+        self.type_weights = (type_weights if type_weights is not None
+                             else parse_type_weights(os.getenv("MEMORY_RANKING_TYPE_WEIGHTS", "")))
+
+        if self.recency_weight < 0 or self.contact_weight < 0 or self.recency_weight + self.contact_weight > 1:
+            raise ValueError("Memory ranking weights must be non-negative and sum to at most 1")
+
+    def rank(self, candidates: List[MemoryResponse], n_results: int, contact_id: Optional[str] = None,
+             now: Optional[datetime] = None) -> List[MemoryResponse]:
+        """
+        The top n_results candidates by ranking score, best first, with their score set.
+
+        Args:
+            candidates: Merged search candidates in retrieval order
+            n_results: Number of memories to return
+            contact_id: Contact the search is about; their memories get the contact share
+            now: Reference time for recency (defaults to the current time)
+        """
+        if not self.enabled or not candidates:
+            return candidates[:n_results]
+
+        relevance = self._normalized_relevance(candidates)
+
+        now_ts = self._timestamp(now or datetime.now(timezone.utc))
+        created = np.fromiter((self._timestamp(memory.created_at) for memory in candidates),
+                              dtype=np.float64, count=len(candidates))
+        age_days = np.maximum(now_ts - created, 0.0) / SECONDS_PER_DAY
+        recency = np.power(0.5, age_days / self.half_life_days)
+
+        affinity = np.fromiter(
+            (contact_id is not None and memory.metadata.get("contact_id") == contact_id for memory in candidates),
+            dtype=np.float64, count=len(candidates)
+        )
+        type_weight = np.fromiter(
+            (self.type_weights.get(memory.memory_type, 1.0) for memory in candidates),
+            dtype=np.float64, count=len(candidates)
+        )
+
+        # Without a focus contact its share goes to relevance
+        contact_weight = self.contact_weight if contact_id is not None else 0.0
+        relevance_weight = 1.0 - self.recency_weight - contact_weight
+        scores = type_weight * (relevance_weight * relevance
+                                + self.recency_weight * recency
+                                + contact_weight * affinity)
+        # Memories stored seconds apart must not reorder equally relevant results
+        scores = np.round(scores, 6)
+
+        # Stable sort keeps retrieval order between equal scores
+        order = np.argsort(-scores, kind="stable")[:n_results]
+        ranked = []
+        for i in order:
+            memory = candidates[i]
+            memory.score = float(scores[i])
+            ranked.append(memory)
+        return ranked
+
+    @staticmethod
+    def _normalized_relevance(candidates: List[MemoryResponse]) -> np.ndarray:
+        """Fused score, or negated distance, scaled to [0, 1]; 0 when neither is known"""
+        raw = np.fromiter(
+            (memory.score if memory.score is not None
+             else -memory.distance if memory.distance is not None
+             else np.nan
+             for memory in candidates),
+            dtype=np.float64, count=len(candidates)
+        )
+        known = ~np.isnan(raw)
+        if not known.any():
+            return np.zeros(len(candidates))
+
+        low, high = raw[known].min(), raw[known].max()
+        relevance = np.zeros(len(candidates))
+        relevance[known] = (raw[known] - low) / (high - low) if high > low else 1.0
+        return relevance
+
+    @staticmethod
+    def _timestamp(moment: datetime) -> float:
+        """POSIX timestamp, treating naive datetimes as UTC like the stored metadata"""
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+    def get_config(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "recency_weight": self.recency_weight,
+            "half_life_days": self.half_life_days,
+            "contact_weight": self.contact_weight,
+            "type_weights": self.type_weights
+        }
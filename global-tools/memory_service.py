@@ -2,22 +2,77 @@
 Memory service for handling memory storage and retrieval using ChromaDB
 """
 
+import os
+import heapq
 import uuid
+import logging
+from itertools import islice
 from datetime import datetime
 from typing import Dict, Any, List, Optional
+import numpy as np
 from fastapi import HTTPException
 from bson import ObjectId
 
 from models import (
     AddMemoryRequest, SearchMemoryRequest, AddMemoryResponse, 
-    SearchMemoryResponse, MemoryResponse
+    SearchMemoryResponse, MemoryResponse, AddMemoriesBatchRequest,
+    AddMemoriesBatchResponse, BatchMemoryResult
 )
 from validation import validate_user_id
+from search_fanout import CollectionFanout
+from memory_layout import MemoryLayout
+from user_cache import UserCache
+from single_flight import SingleFlight
+from hybrid_search import LexicalIndexCache, reciprocal_rank_fusion
+from memory_ranking import MemoryRanker
+
+logger = logging.getLogger(__name__)
+
+MAX_ADD_BATCH_SIZE = 500
+# Single-text embedding retries of a failed batch that may fail before the whole batch is given up
+MAX_EMBED_RETRY_FAILURES = 3
+DEDUP_MODES = ("off", "skip", "update")
+SEARCH_MODES = ("hybrid", "vector")
+# Candidates fetched per collection for fusion and re-ranking, and the cap on that depth
+CANDIDATE_MULTIPLIER = 2
+MIN_CANDIDATES = 20
+MAX_CANDIDATES = 100
+# Keyword matches scoring below this fraction of the best match only share common
+# terms with the query and are left out of the fusion
+MIN_RELATIVE_LEXICAL_SCORE = 0.5
 
 class MemoryService:
-    def __init__(self, db_manager, chroma_manager):
+    def __init__(self, db_manager, chroma_manager, layout: Optional[MemoryLayout] = None,
+                 user_cache: Optional[UserCache] = None, dedup_mode: Optional[str] = None,
+                 dedup_distance: Optional[float] = None, search_mode: Optional[str] = None,
+                 lexical_index: Optional[LexicalIndexCache] = None, ranker: Optional[MemoryRanker] = None):
+        """
+        Args:
+            dedup_mode: What add_memory does when a near-duplicate already exists in the
+                target collection: "off" (store anyway), "skip" or "update" (env MEMORY_DEDUP_MODE)
+            dedup_distance: Largest cosine distance counted as a near-duplicate (env MEMORY_DEDUP_DISTANCE)
+            search_mode: "hybrid" fuses vector and BM25 keyword rankings, "vector" uses
+                similarity only (env MEMORY_SEARCH_MODE)
+        """
         self.db_manager = db_manager
         self.chroma_manager = chroma_manager
+        self.user_cache = user_cache or UserCache(db_manager)
+        self.layout = layout or MemoryLayout()
+        self.fanout = CollectionFanout(chroma_manager)
+        # Identical searches arriving while one is in flight share its vector queries
+        self.search_flight = SingleFlight()
+        
+        self.dedup_mode = (dedup_mode or os.getenv("MEMORY_DEDUP_MODE", "off")).strip().lower()
+        if self.dedup_mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown MEMORY_DEDUP_MODE '{self.dedup_mode}', expected 'off', 'skip' or 'update'")
+        self.dedup_distance = (dedup_distance if dedup_distance is not None
+                               else float(os.getenv("MEMORY_DEDUP_DISTANCE", "0.05")))
+        
+        self.search_mode = (search_mode or os.getenv("MEMORY_SEARCH_MODE", "hybrid")).strip().lower()
+        if self.search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown MEMORY_SEARCH_MODE '{self.search_mode}', expected 'hybrid' or 'vector'")
+        self.lexical_index = lexical_index or LexicalIndexCache(chroma_manager)
+        self.ranker = ranker or MemoryRanker()
 
     def add_memory(self, request: AddMemoryRequest) -> AddMemoryResponse:
         """Add a memory to ChromaDB for a user or contact"""
@@ -56,6 +111,8 @@ class MemoryService:
         collection_name, memory_type, contact_id = self._determine_collection_info(
             user_id, request.contact_id, request.email
         )
+        if self.layout.is_tenant:
+            collection_name = self.layout.tenant_collection(user_id)
         
         # Generate unique memory ID
         memory_id = str(uuid.uuid4())
@@ -65,13 +122,25 @@ class MemoryService:
             user_id, memory_type, contact_id, memory_content
         )
         
+        # Embed once: the vector serves both the duplicate check and the insert
+        embedding = None
+        if self.dedup_mode != "off":
+            embedding = self._embed_memory(memory_content)
+            duplicate = self._find_duplicate(collection_name, embedding, user_id, memory_type, contact_id)
+            if duplicate is not None:
+                return self._handle_duplicate(
+                    duplicate, collection_name, memory_content, embedding,
+                    user_id, memory_type, contact_id
+                )
+        
         # Add memory to ChromaDB
         try:
             self.chroma_manager.add_documents(
                 collection_name=collection_name,
                 documents=[memory_content],
                 ids=[memory_id],
-                metadatas=[metadata]
+                metadatas=[metadata],
+                embeddings=[embedding.tolist()] if embedding is not None else None
             )
         except Exception as e:
             raise HTTPException(
@@ -83,6 +152,7 @@ class MemoryService:
                     "endpoint": "/api/memory/add"
                 }
             )
+        self.lexical_index.add(collection_name, memory_id, memory_content, metadata)
         
         return AddMemoryResponse(
             message=f"Memory successfully stored as {memory_type} memory",
@@ -94,6 +164,346 @@ class MemoryService:
             timestamp=datetime.utcnow().isoformat()
         )
 
+    def _embed_memory(self, memory_content: str) -> Optional[np.ndarray]:
+        """Embedding of a memory, or None if only the Chroma server can embed it"""
+        try:
+            embeddings = self.chroma_manager.embed_texts([memory_content])
+        except Exception as e:
+            logger.warning(f"Could not embed memory for the duplicate check: {e}")
+            return None
+        if embeddings is None or len(embeddings) == 0:
+            return None
+        return np.asarray(embeddings[0], dtype=np.float32)
+
+    def _find_duplicate(self, collection_name: str, embedding: Optional[np.ndarray], user_id: str,
+                        memory_type: str, contact_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        The closest stored memory if it is within the duplicate distance.
+        
+        The cosine distance is computed from the stored embedding, so it does not
+        depend on the distance function the collection was created with.
+        """
+        if embedding is None:
+            return None
+        
+        where = None
+        if self.layout.is_tenant:
+            where = self.layout.search_filter(user_id, memory_type=memory_type, contact_id=contact_id)
+        try:
+            result = self.chroma_manager.query_documents(
+                collection_name=collection_name,
+                query_embeddings=[embedding.tolist()],
+                n_results=1,
+                where=where,
+                include=["documents", "metadatas", "embeddings"]
+            )
+        except Exception as e:
+            # The check is an optimization; never fail the write because of it
+            logger.warning(f"Duplicate check on '{collection_name}' failed: {e}")
+            return None
+        
+        results = result.get("results", {})
+        ids = results.get("ids") or [[]]
+        stored_embeddings = results.get("embeddings")
+        if not ids[0] or stored_embeddings is None or len(stored_embeddings[0]) == 0:
+            return None
+        
+        distance = self._cosine_distance(np.asarray(stored_embeddings[0][0], dtype=np.float32), embedding)
+        if distance is None or distance > self.dedup_distance:
+            return None
+        
+        return {
+            "id": ids[0][0],
+            "document": (results.get("documents") or [[None]])[0][0],
+            "metadata": (results.get("metadatas") or [[None]])[0][0] or {},
+            "distance": distance
+        }
+
+    @staticmethod
+    def _cosine_distance(a: np.ndarray, b: np.ndarray) -> Optional[float]:
+        denominator = float(np.linalg.norm(a) * np.linalg.norm(b))
+        if denominator == 0:
+            return None
+        return 1.0 - float(a @ b) / denominator
+
+    def _handle_duplicate(self, duplicate: Dict[str, Any], collection_name: str, memory_content: str,
+                          embedding: np.ndarray, user_id: str, memory_type: str,
+                          contact_id: Optional[str]) -> AddMemoryResponse:
+        """Skip the insert, or refresh the existing memory with the new wording"""
+        action = "skipped"
+        if self.dedup_mode == "update":
+            # Same provenance fields as the compaction job
+            metadata = dict(duplicate["metadata"])
+            metadata["duplicate_count"] = int(metadata.get("duplicate_count", 1)) + 1
+            metadata.setdefault("first_seen_at", metadata.get("created_at", datetime.utcnow().isoformat()))
+            metadata["last_seen_at"] = datetime.utcnow().isoformat()
+            metadata["content_length"] = len(memory_content)
+            try:
+                self.chroma_manager.update_documents(
+                    collection_name=collection_name,
+                    ids=[duplicate["id"]],
+                    documents=[memory_content],
+                    metadatas=[metadata],
+                    embeddings=[embedding.tolist()]
+                )
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500,
+                    detail={
+                        "error": "Memory Storage Error",
+                        "message": "Failed to update existing memory in vector database",
+                        "details": str(e),
+                        "endpoint": "/api/memory/add"
+                    }
+                )
+            self.lexical_index.add(collection_name, duplicate["id"], memory_content, metadata)
+            action = "updated"
+        
+        return AddMemoryResponse(
+            message=f"Similar {memory_type} memory already exists; existing memory {action}",
+            memory_id=duplicate["id"],
+            memory_type=memory_type,
+            collection_name=collection_name,
+            user_id=user_id,
+            contact_id=contact_id,
+            action=action,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+    def add_memories_batch(self, request: AddMemoriesBatchRequest) -> AddMemoriesBatchResponse:
+        """
+        Add many memories for one user.
+        
+        The user is looked up once, each distinct contact is resolved once, all
+        documents are embedded together and each target collection gets a
+        single add. Near-duplicates are handled per item as in add_memory,
+        including repeats within the batch. Items that fail (empty text,
+        unknown contact, embedding or storage error) are reported in their
+        result without failing the rest.
+        """
+        # Validate user ID
+        user_id = validate_user_id(request.user_id, "user_id")
+        
+        if not request.memories or len(request.memories) > MAX_ADD_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Invalid Batch Size",
+                    "message": f"memories must contain between 1 and {MAX_ADD_BATCH_SIZE} memories",
+                    "details": f"Received {len(request.memories or [])} memories",
+                    "endpoint": "/api/memory/add_batch"
+                }
+            )
+        
+        # Validate that user exists in database
+        user = self._get_user_by_id(user_id)
+        if not user:
+            raise HTTPException(
+                status_code=404,
+                detail={
+                    "error": "User Not Found",
+                    "message": f"User with ID '{user_id}' does not exist",
+                    "details": "Please verify the user ID is correct",
+                    "user_id": user_id,
+                    "endpoint": "/api/memory/add_batch"
+                }
+            )
+        
+        results: List[Optional[BatchMemoryResult]] = [None] * len(request.memories)
+        resolved: Dict[tuple, Any] = {}
+        # collection name -> [(index, memory_id, content, metadata, memory_type, contact_id)]
+        groups: Dict[str, List[tuple]] = {}
+        
+        for index, item in enumerate(request.memories):
+            memory_content = (item.memory or "").strip()
+            if not memory_content:
+                results[index] = BatchMemoryResult(index=index, status="failed", error="Memory content cannot be empty")
+                continue
+            
+            # Resolve each distinct (contact_id, email) pair once per batch
+            contact_key = (item.contact_id, item.email)
+            if contact_key not in resolved:
+                try:
+                    resolved[contact_key] = self._determine_collection_info(
+                        user_id, item.contact_id, item.email, "/api/memory/add_batch"
+                    )
+                except HTTPException as e:
+                    resolved[contact_key] = e
+            collection_info = resolved[contact_key]
+            if isinstance(collection_info, HTTPException):
+                results[index] = BatchMemoryResult(
+                    index=index, status="failed", error=self._error_message(collection_info)
+                )
+                continue
+            
+            collection_name, memory_type, contact_id = collection_info
+            if self.layout.is_tenant:
+                collection_name = self.layout.tenant_collection(user_id)
+            
+            metadata = self._build_memory_metadata(user_id, memory_type, contact_id, memory_content)
+            groups.setdefault(collection_name, []).append(
+                (index, str(uuid.uuid4()), memory_content, metadata, memory_type, contact_id)
+            )
+        
+        # One embedding request for every document in the batch; the embedding
+        # client splits it into upstream batches
+        pending = [entry for entries in groups.values() for entry in entries]
+        vectors, errors = self._embed_batch([entry[2] for entry in pending])
+        embeddings_by_index = {entry[0]: vector for entry, vector in zip(pending, vectors)}
+        embed_errors = {pending[position][0]: error for position, error in errors.items()}
+        
+        for collection_name, entries in groups.items():
+            to_add = []
+            for entry in entries:
+                index, _, _, _, memory_type, contact_id = entry
+                if index in embed_errors:
+                    results[index] = BatchMemoryResult(
+                        index=index, status="failed", memory_type=memory_type,
+                        collection_name=collection_name, contact_id=contact_id, error=embed_errors[index]
+                    )
+                    continue
+                if self.dedup_mode != "off":
+                    results[index] = self._deduplicate_batch_item(
+                        entry, collection_name, embeddings_by_index, to_add, user_id
+                    )
+                    if results[index] is not None:
+                        continue
+                to_add.append(entry)
+            if not to_add:
+                continue
+            
+            embeddings = [embeddings_by_index[entry[0]] for entry in to_add]
+            try:
+                self.chroma_manager.add_documents(
+                    collection_name=collection_name,
+                    documents=[entry[2] for entry in to_add],
+                    ids=[entry[1] for entry in to_add],
+                    metadatas=[entry[3] for entry in to_add],
+                    embeddings=([embedding.tolist() for embedding in embeddings]
+                                if all(embedding is not None for embedding in embeddings) else None)
+                )
+                error = None
+            except Exception as e:
+                error = f"Failed to store memory in vector database: {e}"
+            else:
+                for _, memory_id, memory_content, metadata, _, _ in to_add:
+                    self.lexical_index.add(collection_name, memory_id, memory_content, metadata)
+            
+            for index, memory_id, _, _, memory_type, contact_id in to_add:
+                results[index] = BatchMemoryResult(
+                    index=index,
+                    status="failed" if error else "added",
+                    memory_id=None if error else memory_id,
+                    memory_type=memory_type,
+                    collection_name=collection_name,
+                    contact_id=contact_id,
+                    error=error
+                )
+        
+        added_count = sum(1 for result in results if result.status == "added")
+        failed_count = sum(1 for result in results if result.status == "failed")
+        duplicate_count = len(results) - added_count - failed_count
+        return AddMemoriesBatchResponse(
+            message=f"Stored {added_count} of {len(results)} memories" + (
+                f"; {duplicate_count} matched existing memories" if duplicate_count else ""
+            ),
+            user_id=user_id,
+            added_count=added_count,
+            failed_count=failed_count,
+            duplicate_count=duplicate_count,
+            results=results,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+    def _embed_batch(self, texts: List[str]) -> tuple:
+        """
+        Embeddings of the texts and the errors of those that could not be embedded.
+        
+        Returns:
+            (one float32 vector per text, or None each if only the Chroma server
+            can embed them; {position: error message})
+        """
+        if not texts:
+            return [], {}
+        try:
+            embeddings = self.chroma_manager.embed_texts(texts)
+        except Exception as e:
+            if len(texts) == 1:
+                return [None], {0: f"Failed to embed memory: {e}"}
+            batch_error = e
+        else:
+            if embeddings is None:
+                return [None] * len(texts), {}
+            return [np.asarray(embedding, dtype=np.float32) for embedding in embeddings], {}
+        
+        # Retry one by one so a single bad text does not fail the others; if the
+        # first retries all fail, the service itself is failing
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        errors: Dict[int, str] = {}
+        succeeded = False
+        for position, text in enumerate(texts):
+            if not succeeded and len(errors) >= MAX_EMBED_RETRY_FAILURES:
+                errors[position] = f"Failed to embed memory: {batch_error}"
+                continue
+            try:
+                embeddings = self.chroma_manager.embed_texts([text])
+            except Exception as e:
+                errors[position] = f"Failed to embed memory: {e}"
+                continue
+            succeeded = True
+            if embeddings is not None:
+                vectors[position] = np.asarray(embeddings[0], dtype=np.float32)
+        return vectors, errors
+
+    def _deduplicate_batch_item(self, entry: tuple, collection_name: str, embeddings_by_index: Dict[int, Any],
+                                to_add: List[tuple], user_id: str) -> Optional[BatchMemoryResult]:
+        """
+        Result of a batch item that repeats a stored memory or one queued earlier
+        in the batch, or None if it is new. Queued repeats are folded into the
+        earlier item; in "update" mode the later wording wins.
+        """
+        index, _, memory_content, metadata, memory_type, contact_id = entry
+        embedding = embeddings_by_index.get(index)
+        if embedding is None:
+            return None
+        
+        def result(status: str, memory_id: Optional[str] = None, error: Optional[str] = None):
+            return BatchMemoryResult(index=index, status=status, memory_id=memory_id, memory_type=memory_type,
+                                     collection_name=collection_name, contact_id=contact_id, error=error)
+        
+        for position, queued in enumerate(to_add):
+            if (queued[4], queued[5]) != (memory_type, contact_id):
+                continue
+            distance = self._cosine_distance(embeddings_by_index[queued[0]], embedding)
+            if distance is None or distance > self.dedup_distance:
+                continue
+            if self.dedup_mode == "skip":
+                return result("skipped", queued[1])
+            merged = dict(metadata)
+            merged["duplicate_count"] = int(queued[3].get("duplicate_count", 1)) + 1
+            merged["first_seen_at"] = queued[3].get("first_seen_at", queued[3]["created_at"])
+            to_add[position] = (queued[0], queued[1], memory_content, merged, memory_type, contact_id)
+            embeddings_by_index[queued[0]] = embedding
+            return result("updated", queued[1])
+        
+        duplicate = self._find_duplicate(collection_name, embedding, user_id, memory_type, contact_id)
+        if duplicate is None:
+            return None
+        try:
+            response = self._handle_duplicate(
+                duplicate, collection_name, memory_content, embedding, user_id, memory_type, contact_id
+            )
+        except HTTPException as e:
+            return result("failed", error=self._error_message(e))
+        return result(response.action, response.memory_id)
+
+    @staticmethod
+    def _error_message(error: HTTPException) -> str:
+        """Human-readable message of an HTTP error raised by a validation helper"""
+        if isinstance(error.detail, dict):
+            return error.detail.get("message") or str(error.detail)
+        return str(error.detail)
+
     def search_memories(self, request: SearchMemoryRequest) -> SearchMemoryResponse:
         """Search memories for a user across specified collections"""
         # Validate user ID
@@ -139,14 +549,28 @@ class MemoryService:
             )
         
         # Determine collections to search based on search_all_collections parameter
-        if request.search_all_collections:
+        where = None
+        if self.layout.is_tenant:
+            # All of the user's memories share one collection; narrow with metadata instead
+            collections_to_search = [self.layout.tenant_collection(user_id)]
+            where = self.layout.search_filter(
+                user_id, memory_type=None if request.search_all_collections else "user"
+            )
+        elif request.search_all_collections:
             # Search across user collection + ALL contact collections for this specific user
             # (Does NOT search other users' collections or unrelated collections)
-            collections_to_search = self._get_user_collections(user_id, user)
+            collections_to_search = self._get_user_collections(user_id)
         else:
             # Search only user's own personal collection
             collections_to_search = [user_id]
         
+        # Memories about the contact the conversation is about rank higher
+        focus_contact_id = None
+        if request.contact_id or request.email:
+            _, _, focus_contact_id = self._determine_collection_info(
+                user_id, request.contact_id, request.email, "/api/memory/search"
+            )
+        
         if not collections_to_search:
             return SearchMemoryResponse(
                 query=search_query,
@@ -158,88 +582,158 @@ class MemoryService:
                 timestamp=datetime.utcnow().isoformat()
             )
         
-        # Search across specified collections
-        all_memories = []
-        successfully_searched = []
-        
-        for collection_name in collections_to_search:
-            try:
-                # Check if collection exists
-                collection_info = self.chroma_manager.get_collection_info(collection_name)
-                if collection_info["document_count"] == 0:
-                    continue
-                
-                # Search this collection
-                results = self.chroma_manager.query_documents(
-                    collection_name=collection_name,
-                    query_texts=[search_query],
-                    n_results=request.n_results,
-                    include=["documents", "metadatas", "distances"]
-                )
-                
-                # Process results from this collection
-                collection_memories = self._process_search_results(
-                    results, collection_name
-                )
-                all_memories.extend(collection_memories)
-                successfully_searched.append(collection_name)
-                
-            except Exception as e:
-                # Log error but continue searching other collections
-                print(f"Error searching collection {collection_name}: {str(e)}")
-                continue
-        
-        # Sort all memories by distance (most similar first)
-        all_memories.sort(key=lambda x: x.distance if x.distance is not None else float('inf'))
-        
-        # Return top N results
-        top_memories = all_memories[:request.n_results]
+        flight_key = (user_id, search_query, request.n_results, request.search_all_collections,
+                      self.search_mode, focus_contact_id)
+        top_memories, fanout = self.search_flight.do(
+            flight_key,
+            lambda: self._search_collections(
+                collections_to_search, search_query, request.n_results, where, focus_contact_id
+            )
+        )
         
         return SearchMemoryResponse(
             query=search_query,
             user_id=user_id,
             memories=top_memories,
             total_results=len(top_memories),
-            collections_searched=successfully_searched,
+            collections_searched=fanout.searched,
+            collections_timed_out=fanout.timed_out,
             search_all_collections=request.search_all_collections,
             timestamp=datetime.utcnow().isoformat()
         )
 
+    def _search_collections(self, collections_to_search: List[str], search_query: str,
+                            n_results: int, where: Optional[Dict[str, Any]],
+                            focus_contact_id: Optional[str] = None) -> tuple:
+        """Query the collections and return the overall top memories with the fan-out outcome"""
+        hybrid = self.search_mode == "hybrid"
+        # Fusion and re-ranking need a deeper candidate list than the final page
+        depth = (min(max(n_results * CANDIDATE_MULTIPLIER, MIN_CANDIDATES), MAX_CANDIDATES)
+                 if hybrid or self.ranker.enabled else n_results)
+        
+        # Search all collections concurrently with a single query embedding
+        fanout = self.fanout.query(
+            collection_names=collections_to_search,
+            query_text=search_query,
+            n_results=depth,
+            include=["documents", "metadatas", "distances"],
+            where=where
+        )
+        
+        # Process results from each collection (already sorted by distance)
+        per_collection = [
+            self._process_search_results(results, collection_name)
+            for collection_name, results in fanout.results
+        ]
+        
+        # Merge the per-collection top-k lists (most similar first)
+        vector_ranking = list(islice(
+            heapq.merge(*per_collection, key=self._distance_key),
+            depth
+        ))
+        candidates = vector_ranking
+        if hybrid:
+            try:
+                lexical_ranking = self._lexical_search(fanout.searched, search_query, depth, where)
+                candidates = self._fuse_rankings(vector_ranking, lexical_ranking)
+            except Exception as e:
+                # Keyword matching only refines the ranking; fall back to similarity order
+                logger.warning(f"Lexical memory search failed, using vector results only: {e}")
+        
+        return self.ranker.rank(candidates, n_results, contact_id=focus_contact_id), fanout
+
+    def _lexical_search(self, collection_names: List[str], search_query: str, depth: int,
+                        where: Optional[Dict[str, Any]]) -> List[MemoryResponse]:
+        """BM25 matches across the collections, best first"""
+        scored = []
+        for collection_name in collection_names:
+            # Collections whose index is still being built are matched by vector only
+            index = self.lexical_index.get_ready(collection_name)
+            if index is None:
+                continue
+            for memory_id, score in index.search(search_query, depth, where):
+                stored = index.document(memory_id)
+                if stored is None:
+                    # Deleted since the search released the index
+                    continue
+                document, metadata = stored
+                scored.append((score, collection_name, memory_id, document, metadata))
+        scored.sort(key=lambda item: -item[0])
+        if scored:
+            cutoff = scored[0][0] * MIN_RELATIVE_LEXICAL_SCORE
+            scored = [item for item in scored if item[0] >= cutoff]
+        
+        return [
+            self._memory_response(memory_id, document, metadata, collection_name, distance=None)
+            for _, collection_name, memory_id, document, metadata in scored[:depth]
+        ]
+
+    @staticmethod
+    def _fuse_rankings(vector_ranking: List[MemoryResponse],
+                       lexical_ranking: List[MemoryResponse]) -> List[MemoryResponse]:
+        """Memories ordered by reciprocal rank fusion of the vector and keyword rankings"""
+        memories = {}
+        # Vector hits are stored last so memories found by both keep their distance
+        for memory in lexical_ranking + vector_ranking:
+            memories[(memory.collection_name, memory.id)] = memory
+        
+        # Keyword ranking first: on equal fused scores an exact term match wins
+        fused = reciprocal_rank_fusion([
+            [(memory.collection_name, memory.id) for memory in lexical_ranking],
+            [(memory.collection_name, memory.id) for memory in vector_ranking]
+        ])
+        fused_memories = []
+        for key, score in fused:
+            memory = memories[key]
+            memory.score = round(score, 6)
+            fused_memories.append(memory)
+        return fused_memories
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Vector searches made and requests that shared an in-flight search"""
+        return self.search_flight.get_stats()
+
+    def get_lexical_index_stats(self) -> Dict[str, Any]:
+        """Keyword index builds, cache hits and indexed documents"""
+        return {"search_mode": self.search_mode, **self.lexical_index.get_stats()}
+
+    def get_ranking_config(self) -> Dict[str, Any]:
+        """Weights the search results are ranked with"""
+        return self.ranker.get_config()
+
+    @staticmethod
+    def _distance_key(memory: MemoryResponse) -> float:
+        """Sort key placing memories without a distance last"""
+        return memory.distance if memory.distance is not None else float('inf')
+
     def _determine_collection_info(self, user_id: str, contact_id: Optional[str], 
-                                 email: Optional[str]) -> tuple:
-        """Determine collection name, memory type, and contact ID"""
+                                 email: Optional[str], endpoint: str = "/api/memory/add") -> tuple:
+        """Determine collection name, memory type, and contact ID; errors name the calling endpoint"""
         # If both contact_id and email provided, validate they match
         if contact_id and email:
             # Validate that both refer to the same contact
-            validated_contact_id = self._validate_contact_id_email_match(user_id, contact_id, email)
+            validated_contact_id = self._validate_contact_id_email_match(user_id, contact_id, email, endpoint)
             return validated_contact_id, "contact", validated_contact_id
         
         # If only email provided, look up contact_id
         elif email:
-            contact_id = self._get_contact_id_by_email(user_id, email)
+            contact_id = self._get_contact_id_by_email(user_id, email, endpoint)
             return contact_id, "contact", contact_id
         
         # If only contact_id provided, validate it exists
         elif contact_id:
-            self._validate_contact_exists(user_id, contact_id)
+            self._validate_contact_exists(user_id, contact_id, endpoint)
             return contact_id, "contact", contact_id
         
         # No contact specified - user memory
         else:
             return user_id, "user", None
 
-    def _validate_contact_id_email_match(self, user_id: str, contact_id: str, email: str) -> str:
+    def _validate_contact_id_email_match(self, user_id: str, contact_id: str, email: str,
+                                         endpoint: str) -> str:
         """Validate that contact_id and email refer to the same contact"""
         try:
-            contact = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts": {
-                    "$elemMatch": {
-                        "uid": contact_id,
-                        "email": email
-                    }
-                }
-            }, {"Contacts.$": 1})
+            contact = self.user_cache.get_contact(user_id, contact_id)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -247,11 +741,11 @@ class MemoryService:
                     "error": "Database Query Error",
                     "message": "Failed to validate contact ID and email match",
                     "details": str(e),
-                    "endpoint": "/api/memory/add"
+                    "endpoint": endpoint
                 }
             )
         
-        if not contact or not contact.get("Contacts"):
+        if not contact or contact.get("email") != email:
             # Check if contact_id exists but with different email
             contact_by_id = self._get_contact_by_id(user_id, contact_id)
             contact_by_email = self._get_contact_by_email(user_id, email)
@@ -265,7 +759,8 @@ class MemoryService:
                         "details": "Please ensure both contact_id and email refer to the same contact",
                         "contact_id": contact_id,
                         "email": email,
-                        "user_id": user_id
+                        "user_id": user_id,
+                        "endpoint": endpoint
                     }
                 )
             elif contact_by_id:
@@ -278,7 +773,8 @@ class MemoryService:
                         "details": "Please verify the email address is correct",
                         "contact_id": contact_id,
                         "provided_email": email,
-                        "actual_email": actual_email
+                        "actual_email": actual_email,
+                        "endpoint": endpoint
                     }
                 )
             elif contact_by_email:
@@ -291,7 +787,8 @@ class MemoryService:
                         "details": "Please verify the contact ID is correct",
                         "email": email,
                         "provided_contact_id": contact_id,
-                        "actual_contact_id": actual_contact_id
+                        "actual_contact_id": actual_contact_id,
+                        "endpoint": endpoint
                     }
                 )
             else:
@@ -303,7 +800,8 @@ class MemoryService:
                         "details": "Please verify both the contact ID and email are correct",
                         "contact_id": contact_id,
                         "email": email,
-                        "user_id": user_id
+                        "user_id": user_id,
+                        "endpoint": endpoint
                     }
                 )
         
@@ -312,38 +810,21 @@ class MemoryService:
     def _get_contact_by_id(self, user_id: str, contact_id: str) -> Optional[Dict[str, Any]]:
         """Get contact by contact ID"""
         try:
-            user = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts.uid": contact_id
-            }, {"Contacts.$": 1})
-            
-            if user and user.get("Contacts"):
-                return user["Contacts"][0]
-            return None
+            return self.user_cache.get_contact(user_id, contact_id)
         except Exception:
             return None
 
     def _get_contact_by_email(self, user_id: str, email: str) -> Optional[Dict[str, Any]]:
         """Get contact by email"""
         try:
-            user = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts.email": email
-            }, {"Contacts.$": 1})
-            
-            if user and user.get("Contacts"):
-                return user["Contacts"][0]
-            return None
+            return self.user_cache.get_contact_by_email(user_id, email)
         except Exception:
             return None
 
-    def _get_contact_id_by_email(self, user_id: str, email: str) -> str:
+    def _get_contact_id_by_email(self, user_id: str, email: str, endpoint: str) -> str:
         """Look up contact ID by email address"""
         try:
-            user = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts.email": email
-            }, {"Contacts.$": 1})
+            contact = self.user_cache.get_contact_by_email(user_id, email)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -351,11 +832,11 @@ class MemoryService:
                     "error": "Database Query Error",
                     "message": "Failed to look up contact by email",
                     "details": str(e),
-                    "endpoint": "/api/memory/add"
+                    "endpoint": endpoint
                 }
             )
         
-        if not user or not user.get("Contacts"):
+        if not contact:
             raise HTTPException(
                 status_code=404,
                 detail={
@@ -363,19 +844,17 @@ class MemoryService:
                     "message": f"No contact found with email '{email}' for user '{user_id}'",
                     "details": "Please verify the email address is correct",
                     "email": email,
-                    "user_id": user_id
+                    "user_id": user_id,
+                    "endpoint": endpoint
                 }
             )
         
-        return user["Contacts"][0]["uid"]
+        return contact["uid"]
 
-    def _validate_contact_exists(self, user_id: str, contact_id: str):
+    def _validate_contact_exists(self, user_id: str, contact_id: str, endpoint: str):
         """Validate that contact exists for the user"""
         try:
-            contact = self.db_manager.users.find_one({
-                "uid": user_id,
-                "Contacts.uid": contact_id
-            })
+            contact = self.user_cache.get_contact(user_id, contact_id)
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -383,7 +862,7 @@ class MemoryService:
                     "error": "Database Query Error",
                     "message": "Failed to validate contact",
                     "details": str(e),
-                    "endpoint": "/api/memory/add"
+                    "endpoint": endpoint
                 }
             )
         
@@ -395,7 +874,8 @@ class MemoryService:
                     "message": f"Contact with ID '{contact_id}' not found for user '{user_id}'",
                     "details": "Please verify the contact ID is correct",
                     "contact_id": contact_id,
-                    "user_id": user_id
+                    "user_id": user_id,
+                    "endpoint": endpoint
                 }
             )
 
@@ -407,7 +887,7 @@ class MemoryService:
                 return None # Return None if the ID is not valid, will be handled as "User Not Found"
 
             # Check if user exists in the database using _id
-            return self.db_manager.users.find_one({"_id": ObjectId(user_id)})
+            return self.user_cache.get_user(user_id, by="_id")
         except Exception as e:
             raise HTTPException(
                 status_code=500,
@@ -433,7 +913,7 @@ class MemoryService:
         
         return metadata
 
-    def _get_user_collections(self, user_id: str, user: Dict[str, Any]) -> List[str]:
+    def _get_user_collections(self, user_id: str) -> List[str]:
         """
         Get collection names for a specific user ONLY:
         1. User's own personal collection (user_id)
@@ -446,8 +926,9 @@ class MemoryService:
         # Add user's own personal collection
         collections.append(user_id)
         
-        # Add contact collections that belong to this specific user
-        contacts = user.get("Contacts", [])
+        # Add contact collections that belong to this specific user; users moved to the
+        # Contacts collection have no embedded array, so go through the cache
+        contacts = self.user_cache.get_contacts(user_id, by="_id")
         for contact in contacts:
             contact_id = contact.get("uid")
             if contact_id:
@@ -473,22 +954,29 @@ class MemoryService:
             metadata = metadatas[i] if i < len(metadatas) else {}
             distance = distances[i] if i < len(distances) else None
             
-            # Parse created_at
-            created_at_str = metadata.get("created_at", datetime.utcnow().isoformat())
-            try:
-                created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
-            except:
-                created_at = datetime.utcnow()
-            
-            memory = MemoryResponse(
-                id=memory_id,
-                memory=memory_content,
-                memory_type=metadata.get("memory_type", "unknown"),
-                collection_name=collection_name,
-                metadata=metadata,
-                created_at=created_at,
-                distance=distance
-            )
-            memories.append(memory)
+            memories.append(self._memory_response(memory_id, memory_content, metadata, collection_name, distance))
         
-        return memories 
\ No newline at end of file
+        return memories
+
+    @staticmethod
+    def _memory_response(memory_id: str, memory_content: str, metadata: Optional[Dict[str, Any]],
+                         collection_name: str, distance: Optional[float]) -> MemoryResponse:
+        """Build a MemoryResponse from a stored memory"""
+        metadata = metadata or {}
+        
+        # Parse created_at
+        created_at_str = metadata.get("created_at", datetime.utcnow().isoformat())
+        try:
+            created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
+        except:
+            created_at = datetime.utcnow()
+        
+        return MemoryResponse(
+            id=memory_id,
+            memory=memory_content,
+            memory_type=metadata.get("memory_type", "unknown"),
+            collection_name=collection_name,
+            metadata=metadata,
+            created_at=created_at,
+            distance=distance
+        ) 
\ No newline at end of file
@@ -64,6 +64,7 @@ class SearchResponse(BaseModel):
     query: str
     context: str
     source_count: int
+    cached: bool = False
     timestamp: str
 
 # ChromaDB related models
@@ -99,6 +100,7 @@ class ChromaDBStatusResponse(BaseModel):
     embedding_function_available: Optional[bool] = None
     collection_count: Optional[int] = None
     collections: Optional[List[str]] = None
+    embedding_metrics: Optional[Dict[str, Any]] = None
     timestamp: str
 
 class CollectionInfoResponse(BaseModel):
@@ -121,11 +123,22 @@ class AddMemoryRequest(BaseModel):
     contact_id: Optional[str] = None
     email: Optional[EmailStr] = None
 
+class BatchMemoryItem(BaseModel):
+    memory: str
+    contact_id: Optional[str] = None
+    email: Optional[EmailStr] = None
+
+class AddMemoriesBatchRequest(BaseModel):
+    user_id: str
+    memories: List[BatchMemoryItem]
+
 class SearchMemoryRequest(BaseModel):
     user_id: str
     query: str
     n_results: int = 10
     search_all_collections: bool = False
+    contact_id: Optional[str] = None  # Contact the search is about; their memories rank higher
+    email: Optional[EmailStr] = None  # Alternative to contact_id
 
 class MemoryResponse(BaseModel):
     id: str
@@ -135,6 +148,7 @@ class MemoryResponse(BaseModel):
     metadata: Dict[str, Any]
     created_at: datetime
     distance: Optional[float] = None
+    score: Optional[float] = None  # Ranking score of the search, higher is better
 
 class AddMemoryResponse(BaseModel):
     message: str
@@ -143,6 +157,25 @@ class AddMemoryResponse(BaseModel):
     collection_name: str
     user_id: str
     contact_id: Optional[str] = None
+    action: str = "added"  # "added", or "skipped"/"updated" when a near-duplicate already existed
+    timestamp: str
+
+class BatchMemoryResult(BaseModel):
+    index: int
+    status: str  # "added", "failed", or "skipped"/"updated" when a near-duplicate already existed
+    memory_id: Optional[str] = None
+    memory_type: Optional[str] = None
+    collection_name: Optional[str] = None
+    contact_id: Optional[str] = None
+    error: Optional[str] = None
+
+class AddMemoriesBatchResponse(BaseModel):
+    message: str
+    user_id: str
+    added_count: int
+    failed_count: int
+    duplicate_count: int = 0  # items skipped or merged as near-duplicates
+    results: List[BatchMemoryResult]
     timestamp: str
 
 class SearchMemoryResponse(BaseModel):
@@ -151,6 +184,7 @@ class SearchMemoryResponse(BaseModel):
     memories: List[MemoryResponse]
     total_results: int
     collections_searched: List[str]
+    collections_timed_out: List[str] = []
     search_all_collections: bool
     timestamp: str
 
@@ -175,12 +209,27 @@ class WriteStatusUpdateResponse(BaseModel):
     agent_id: str
     agent_type: str
     conversation_id: str
+    buffered: bool = False
+    timestamp: Optional[str] = None  # stored timestamp; unknown (None) until a buffered update is inserted
+
+class WriteStatusUpdatesBatchRequest(BaseModel):
+    updates: List[WriteStatusUpdateRequest]
+
+class WriteStatusUpdatesBatchResponse(BaseModel):
+    message: str
+    inserted_count: int
+    status_update_ids: List[str]
+    failed: List[Dict[str, Any]] = []
+    buffered: bool = False
     timestamp: str
 
 class ReadStatusUpdatesRequest(BaseModel):
     conversation_id: str
     agent_type: Optional[str] = None
     agent_id: Optional[str] = None
+    cursor: Optional[str] = None  # next_cursor of a previous read; only newer updates are returned
+    since: Optional[datetime] = None  # only updates written after this time (ignored with cursor)
+    limit: Optional[int] = None  # page size; all matching updates when omitted
 
 class ReadStatusUpdatesResponse(BaseModel):
     conversation_id: str
@@ -188,6 +237,8 @@ class ReadStatusUpdatesResponse(BaseModel):
     agent_id: Optional[str]
     status_updates: List[StatusUpdateResponse]
     total_results: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
     timestamp: str 
     
 class UserResponse(BaseModel):
@@ -0,0 +1,79 @@
+"""
+Per-request counters aggregated by endpoint
+
+Components call `increment()` from anywhere inside a request (including worker
+threads started with a copied context) and the HTTP middleware attributes the
+counts to the endpoint that served the request.
+"""
+
+import threading
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+_current_counters: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_counters", default=None)
+
+_lock = threading.Lock()
+_endpoint_totals: Dict[str, Dict[str, float]] = {}
+_endpoint_requests: Dict[str, int] = {}
+_global_totals: Dict[str, float] = {}
+
+
+def begin_request():
+    """Start collecting counters for the current request; returns a token for end_request"""
+    return _current_counters.set({})
+
+
+def current_counters() -> Dict[str, float]:
+    """Counters recorded so far for the current request"""
+    return dict(_current_counters.get() or {})
+
+
+def end_request(token, endpoint: str) -> Dict[str, float]:
+    """Stop collecting, fold the request's counters into the endpoint totals and return them"""
+    counters = _current_counters.get() or {}
+    _current_counters.reset(token)
+
+    with _lock:
+        _endpoint_requests[endpoint] = _endpoint_requests.get(endpoint, 0) + 1
+        totals = _endpoint_totals.setdefault(endpoint, {})
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+
+    return dict(counters)
+
+
+def increment(name: str, value: float = 1):
+    """Increment a counter for the current request and the process-wide totals"""
+    counters = _current_counters.get()
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + value
+
+    with _lock:
+        _global_totals[name] = _global_totals.get(name, 0) + value
+
+
+def get_summary() -> Dict[str, Any]:
+    """Process-wide totals and per-endpoint averages"""
+    with _lock:
+        endpoints = {}
+        for endpoint, requests in _endpoint_requests.items():
+            totals = _endpoint_totals.get(endpoint, {})
+            endpoints[endpoint] = {
+                "requests": requests,
+                "totals": dict(totals),
+                "per_request": {
+                    name: round(value / requests, 3) for name, value in totals.items()
+                }
+            }
+        return {
+            "totals": dict(_global_totals),
+            "endpoints": endpoints
+        }
+
+
+def reset():
+    """Clear all aggregated counters"""
+    with _lock:
+        _endpoint_totals.clear()
+        _endpoint_requests.clear()
+        _global_totals.clear()
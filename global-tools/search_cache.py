@@ -0,0 +1,213 @@
+"""
+Result cache for web search queries
+
+Results are keyed on the normalized query text and expire after a TTL. With
+an embedding function configured, a miss on the exact key can still be served
+from a cached result whose query embedding is close enough (cosine similarity
+at or above the threshold), so near-duplicate phrasings share one upstream call.
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n?!.,;:\"'"
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive cache key for a query"""
+    return _WHITESPACE.sub(" ", query.strip().lower()).strip(_EDGE_PUNCTUATION)
+
+
+class _CachedResult:
+    def __init__(self, query: str, value: Any, expires_at: float, upstream_ms: float,
+                 embedding: Optional[np.ndarray]):
+        self.query = query
+        self.value = value
+        self.expires_at = expires_at
+        self.upstream_ms = upstream_ms
+        self.embedding = embedding
+
+
+class SearchResultCache:
+    """
+    TTL + LRU cache of search results with an optional semantic lookup.
+
+    Exact lookups are dictionary hits. Semantic lookups embed the query (through
+    the embedding service, which caches embeddings itself) and compare it with
+    the embeddings of the cached queries.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_size: Optional[int] = None,
+                 embed_fn: Optional[Callable[[List[str]], Any]] = None,
+                 semantic_threshold: Optional[float] = None,
+                 cost_per_call: Optional[float] = None):
+        """
+        Args:
+            ttl_seconds: Result lifetime; 0 disables the cache (env SEARCH_CACHE_TTL_SECONDS)
+            max_size: Maximum number of cached results (env SEARCH_CACHE_MAX_SIZE)
+            embed_fn: Embeds a list of texts; enables semantic lookups when set
+            semantic_threshold: Minimum cosine similarity of a semantic hit; 0 disables
+                semantic lookups (env SEARCH_CACHE_SEMANTIC_THRESHOLD)
+            cost_per_call: Upstream cost of one search, for the saved-cost metric
+                (env SEARCH_COST_PER_CALL_USD)
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "600"))
+        self.max_size = max_size if max_size is not None else int(os.getenv("SEARCH_CACHE_MAX_SIZE", "1000"))
+        self.semantic_threshold = (semantic_threshold if semantic_threshold is not None
+                                   else float(os.getenv("SEARCH_CACHE_SEMANTIC_THRESHOLD", "0.95")))
+        self.cost_per_call = cost_per_call if cost_per_call is not None else float(os.getenv("SEARCH_COST_PER_CALL_USD", "0.016"))
+        self.embed_fn = embed_fn
+
+        self._entries: "OrderedDict[str, _CachedResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "exact_hits": 0, "semantic_hits": 0, "misses": 0,
+            "saved_upstream_ms": 0.0, "semantic_lookup_errors": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.enabled and self.embed_fn is not None and self.semantic_threshold > 0
+
+    def get_exact(self, query: str) -> Optional[Any]:
+        """Cached result for the normalized query; never calls the embedding service"""
+        if not self.enabled:
+            return None
+
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._fresh_entry(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._record_hit("exact_hits", entry)
+            return entry.value
+
+    def get_semantic(self, query: str) -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Cached result of the most similar cached query, if similar enough.
+
+        Returns:
+            (result or None, the query embedding for a later put())
+        """
+        if not self.semantic_enabled:
+            return None, None
+
+        embedding = self._embed(query)
+        if embedding is None:
+            return None, None
+
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry.embedding is not None and time.monotonic() < entry.expires_at
+            ]
+            if not candidates:
+                return None, embedding
+
+            matrix = np.stack([entry.embedding for _, entry in candidates])
+            similarities = matrix @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.semantic_threshold:
+                return None, embedding
+
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            self._record_hit("semantic_hits", entry)
+            return entry.value, embedding
+
+    def get(self, query: str) -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """Exact lookup, then semantic lookup; counts a miss if both fail"""
+        value = self.get_exact(query)
+        if value is not None:
+            return value, None
+        value, embedding = self.get_semantic(query)
+        if value is None:
+            self.record_miss()
+        return value, embedding
+
+    def record_miss(self):
+        with self._lock:
+            self._stats["misses"] += 1
+
+    def put(self, query: str, value: Any, upstream_ms: float = 0.0,
+            embedding: Optional[np.ndarray] = None):
+        """Cache an upstream result; embeds the query for semantic lookups if needed"""
+        if not self.enabled:
+            return
+
+        if embedding is None and self.semantic_enabled:
+            embedding = self._embed(query)
+
+        key = normalize_query(query)
+        entry = _CachedResult(key, value, time.monotonic() + self.ttl_seconds, upstream_ms, embedding)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate and upstream calls, time and cost saved"""
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._entries)
+
+        hits = stats["exact_hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        return {
+            **stats,
+            "saved_upstream_ms": round(stats["saved_upstream_ms"], 1),
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_cost_usd": round(hits * self.cost_per_call, 4),
+            "size": size,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "semantic_threshold": self.semantic_threshold if self.semantic_enabled else None
+        }
+
+    def _fresh_entry(self, key: str) -> Optional[_CachedResult]:
+        """Entry for key if not expired; call with the lock held"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry.expires_at:
+            del self._entries[key]
+            return None
+        return entry
+
+    def _record_hit(self, counter: str, entry: _CachedResult):
+        """Call with the lock held"""
+        self._stats[counter] += 1
+        self._stats["saved_upstream_ms"] += entry.upstream_ms
+
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        """Unit-length embedding of the normalized query, or None if unavailable"""
+        try:
+            embeddings = self.embed_fn([normalize_query(query)])
+        except Exception:
+            with self._lock:
+                self._stats["semantic_lookup_errors"] += 1
+            return None
+        if embeddings is None or len(embeddings) == 0:
+            return None
+
+        vector = np.asarray(embeddings[0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
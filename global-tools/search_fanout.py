@@ -0,0 +1,145 @@
+"""
+Concurrent fan-out of one vector query across many ChromaDB collections
+"""
+
+import os
+import time
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FanoutResult:
+    """Raw per-collection results of a fan-out query"""
+
+    def __init__(self):
+        self.results: List[Tuple[str, Dict[str, Any]]] = []
+        self.timed_out: List[str] = []
+        self.failed: List[str] = []
+        self.elapsed_ms: float = 0.0
+
+    @property
+    def searched(self) -> List[str]:
+        """Collections that returned results in time"""
+        return [collection_name for collection_name, _ in self.results]
+
+    @property
+    def partial(self) -> bool:
+        """True if some collections did not answer before the deadline"""
+        return bool(self.timed_out)
+
+
+class CollectionFanout:
+    """
+    Query many collections concurrently on a bounded worker pool.
+
+    The query text is embedded once and the vector is reused for every
+    collection. Collections that have not answered when the per-request
+    deadline expires are reported as timed out instead of delaying the response.
+    """
+
+    def __init__(self, chroma_manager, max_workers: Optional[int] = None,
+                 deadline_seconds: Optional[float] = None):
+        self.chroma_manager = chroma_manager
+        self.max_workers = max_workers or int(os.getenv("MEMORY_SEARCH_MAX_WORKERS", "8"))
+        self.deadline_seconds = deadline_seconds or float(os.getenv("MEMORY_SEARCH_DEADLINE_SECONDS", "5"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="memory-search"
+        )
+
+    def query(self, collection_names: List[str], query_text: str, n_results: int,
+              include: Optional[List[str]] = None, where: Optional[Dict] = None,
+              deadline_seconds: Optional[float] = None) -> FanoutResult:
+        """
+        Run the same query against every collection.
+
+        Args:
+            collection_names: Collections to search
+            query_text: Natural language query
+            n_results: Number of results to fetch from each collection
+            include: Fields to include in the results
+            where: Optional metadata filter applied to every collection
+            deadline_seconds: Override of the default per-request deadline
+
+        Returns:
+            FanoutResult with the raw results of each collection that answered
+        """
+        started = time.perf_counter()
+        deadline = deadline_seconds or self.deadline_seconds
+        outcome = FanoutResult()
+
+        if not collection_names:
+            return outcome
+
+        query_embeddings = self._embed_query(query_text)
+
+        # Workers run in a copy of the request context so per-request metrics are attributed
+        futures = {
+            self._executor.submit(
+                contextvars.copy_context().run, self._query_collection,
+                collection_name, query_text, query_embeddings, n_results, include, where
+            ): collection_name
+            for collection_name in collection_names
+        }
+
+        done, not_done = wait(futures, timeout=deadline)
+
+        # Keep the caller's ordering so merges are deterministic
+        answered = {}
+        for future in done:
+            collection_name = futures[future]
+            try:
+                answered[collection_name] = future.result()
+            except Exception as e:
+                logger.error(f"Error searching collection {collection_name}: {str(e)}")
+                outcome.failed.append(collection_name)
+
+        for future in not_done:
+            future.cancel()
+            outcome.timed_out.append(futures[future])
+
+        outcome.results = [
+            (collection_name, answered[collection_name])
+            for collection_name in collection_names if collection_name in answered
+        ]
+        outcome.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        if outcome.timed_out:
+            logger.warning(
+                f"Memory search deadline of {deadline}s exceeded for "
+                f"{len(outcome.timed_out)}/{len(collection_names)} collections"
+            )
+
+        return outcome
+
+    def _embed_query(self, query_text: str) -> Optional[List[List[float]]]:
+        """Embed the query once; None means the server embeds query_texts itself"""
+        try:
+            embeddings = self.chroma_manager.embed_texts([query_text])
+        except Exception as e:
+            logger.warning(f"Failed to pre-compute query embedding, falling back to query_texts: {e}")
+            return None
+
+        if embeddings is None:
+            return None
+        return [list(map(float, vector)) for vector in embeddings]
+
+    def _query_collection(self, collection_name: str, query_text: str,
+                          query_embeddings: Optional[List[List[float]]], n_results: int,
+                          include: Optional[List[str]], where: Optional[Dict]) -> Dict[str, Any]:
+        """Query a single collection with the shared query vector"""
+        return self.chroma_manager.query_documents(
+            collection_name=collection_name,
+            query_texts=None if query_embeddings else [query_text],
+            n_results=n_results,
+            where=where,
+            include=include,
+            query_embeddings=query_embeddings
+        )
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
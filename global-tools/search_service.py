@@ -3,27 +3,115 @@ Search service for handling search operations using Tavily API
 """
 
 import os
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 import tavily
 from validation import validate_search_query
 from models import SearchResponse
+from search_cache import SearchResultCache, normalize_query
+from single_flight import SingleFlight, AsyncSingleFlight
 
 class SearchService:
-    def __init__(self):
+    def __init__(self, embed_fn: Optional[Callable[[List[str]], Any]] = None,
+                 cache: Optional[SearchResultCache] = None):
+        """
+        Args:
+            embed_fn: Embeds texts; used for semantic cache lookups when SEARCH_CACHE_SEMANTIC=true
+            cache: Result cache (defaults to one configured from the environment)
+        """
+        if os.getenv("SEARCH_CACHE_SEMANTIC", "false").lower() != "true":
+            embed_fn = None
+        self.cache = cache or SearchResultCache(embed_fn=embed_fn)
+
+        # Identical queries arriving while one is in flight share its upstream call
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
+        
         self.api_key = os.getenv("TAVILY_API_KEY")
         if self.api_key:
             self.client = tavily.TavilyClient(api_key=self.api_key)
         else:
             self.client = None
 
+        # Native async client; the sync client stays available as a fallback
+        self.async_client = None
+        if self.api_key and os.getenv("SEARCH_ASYNC_CLIENT", "true").lower() == "true":
+            async_client_class = getattr(tavily, "AsyncTavilyClient", None)
+            if async_client_class is not None:
+                self.async_client = async_client_class(api_key=self.api_key)
+
     def search(self, query: str) -> SearchResponse:
         """Perform search using Tavily API"""
+        validated_query = self._prepare_query(query)
+
+        cached, query_embedding = self.cache.get(validated_query)
+        if cached is not None:
+            return self._build_response(validated_query, cached, cached=True)
+
+        def fetch():
+            started = time.perf_counter()
+            try:
+                # Use context search for LLM optimization
+                response = self.client.get_search_context(
+                    query=validated_query,
+                    search_depth="advanced",
+                    max_tokens=8000
+                )
+            except Exception as e:
+                raise self._search_error(validated_query, e)
+
+            self.cache.put(validated_query, response, (time.perf_counter() - started) * 1000, query_embedding)
+            return response
+
+        response = self.single_flight.do(normalize_query(validated_query), fetch)
+        return self._build_response(validated_query, response)
+
+    async def search_async(self, query: str) -> SearchResponse:
+        """Perform search using the async Tavily client without blocking the event loop"""
+        if self.async_client is None:
+            return await run_in_threadpool(self.search, query)
+
+        validated_query = self._prepare_query(query)
+
+        # Exact hits are served on the event loop; semantic lookups call the embedding service
+        cached = self.cache.get_exact(validated_query)
+        query_embedding = None
+        if cached is None and self.cache.semantic_enabled:
+            cached, query_embedding = await run_in_threadpool(self.cache.get_semantic, validated_query)
+        if cached is not None:
+            return self._build_response(validated_query, cached, cached=True)
+        self.cache.record_miss()
+
+        async def fetch():
+            started = time.perf_counter()
+            try:
+                response = await self.async_client.get_search_context(
+                    query=validated_query,
+                    search_depth="advanced",
+                    max_tokens=8000
+                )
+            except Exception as e:
+                raise self._search_error(validated_query, e)
+
+            upstream_ms = (time.perf_counter() - started) * 1000
+            if self.cache.semantic_enabled and query_embedding is None:
+                await run_in_threadpool(self.cache.put, validated_query, response, upstream_ms)
+            else:
+                self.cache.put(validated_query, response, upstream_ms, query_embedding)
+            return response
+
+        response = await self.async_single_flight.do(normalize_query(validated_query), fetch)
+        return self._build_response(validated_query, response)
+
+    def _prepare_query(self, query: str) -> str:
+        """Validate the query and check that Tavily is configured"""
         # Validate query
         validated_query = validate_search_query(query)
-        
+
         # Check if Tavily is available
         if not self.client:
             raise HTTPException(
@@ -35,40 +123,48 @@ class SearchService:
                     "endpoint": "/api/search"
                 }
             )
-        
-        try:
-            # Use context search for LLM optimization
-            response = self.client.get_search_context(
-                query=validated_query,
-                search_depth="advanced",
-                max_tokens=8000
-            )
-            
-            # Extract context from response
-            context = response if isinstance(response, str) else str(response)
-            
-            # Estimate source count (approximation based on context length)
-            estimated_sources = max(1, len(context) // 500)
-            
-            return SearchResponse(
-                query=validated_query,
-                context=context,
-                source_count=estimated_sources,
-                timestamp=datetime.utcnow().isoformat()
-            )
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail={
-                    "error": "Search Request Failed",
-                    "message": "Failed to execute search query",
-                    "details": f"Tavily API error: {str(e)}",
-                    "query": validated_query,
-                    "endpoint": "/api/search"
-                }
-            )
+
+        return validated_query
+
+    def _build_response(self, validated_query: str, response: Any, cached: bool = False) -> SearchResponse:
+        """Build the LLM-oriented search response from the Tavily context"""
+        # Extract context from response
+        context = response if isinstance(response, str) else str(response)
+
+        # Estimate source count (approximation based on context length)
+        estimated_sources = max(1, len(context) // 500)
+
+        return SearchResponse(
+            query=validated_query,
+            context=context,
+            source_count=estimated_sources,
+            cached=cached,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+    def _search_error(self, validated_query: str, error: Exception) -> HTTPException:
+        """Wrap a Tavily failure in an HTTP error"""
+        return HTTPException(
+            status_code=500,
+            detail={
+                "error": "Search Request Failed",
+                "message": "Failed to execute search query",
+                "details": f"Tavily API error: {str(error)}",
+                "query": validated_query,
+                "endpoint": "/api/search"
+            }
+        )
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Result cache hit rate and saved upstream calls"""
+        return self.cache.get_stats()
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Upstream calls made and requests that shared an in-flight call"""
+        sync_stats = self.single_flight.get_stats()
+        async_stats = self.async_single_flight.get_stats()
+        return {key: sync_stats[key] + async_stats[key] for key in sync_stats}
 
     def is_available(self) -> bool:
         """Check if search service is available"""
-        return self.client is not None 
\ No newline at end of file
+        return self.client is not None
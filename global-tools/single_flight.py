@@ -0,0 +1,100 @@
+"""
+Request coalescing ("single-flight") for identical concurrent calls
+
+While a call for a key is in flight, later callers with the same key wait for
+it and receive its result (or its exception) instead of making their own
+upstream call. Nothing is cached: once the call finishes, the next caller
+starts a new one. A caller that is cancelled or interrupted only stops its
+own wait: coroutine calls run as a detached task that outlives the caller that
+started it, and when a thread leader is interrupted its followers start over
+instead of receiving the interruption.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Coalesces identical calls made from worker threads"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "shared": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn, or wait for the in-flight call with the same key and share its outcome"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["calls"] += 1
+            else:
+                self._stats["shared"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is None:
+                return call.result
+            if isinstance(call.error, Exception):
+                raise call.error
+            # The leader was interrupted (KeyboardInterrupt, SystemExit), not the call
+            return self.do(key, fn)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """Coalesces identical calls made from coroutines on one event loop"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn(), or the in-flight call with the same key"""
+        task = self._calls.get(key)
+        if task is not None:
+            self._stats["shared"] += 1
+        else:
+            # A task of its own, so cancelling whichever caller started it
+            # leaves the call running for the others
+            task = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self._calls[key] = task
+            self._stats["calls"] += 1
+        # shield: a cancelled caller must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Every caller may have gone; avoid "exception was never retrieved" warnings
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "in_flight": len(self._calls)}
@@ -0,0 +1,145 @@
+"""
+In-process publish/subscribe of status updates for streaming endpoints
+
+`StatusService.write_status_update` publishes every inserted update. Stream
+handlers subscribe per conversation and receive updates as soon as they are
+written, without reading MongoDB. With several API instances, a MongoDB
+change stream on `Status_updates` can feed the bus instead, so updates written
+by any instance reach every subscriber.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class StatusSubscription:
+    """A subscriber's queue of status update documents for one conversation"""
+
+    def __init__(self, conversation_id: str, loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.conversation_id = conversation_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        # Set when the subscriber fell behind and updates were dropped
+        self.lagged = False
+
+    def _deliver(self, document: Dict[str, Any]):
+        """Runs on the subscriber's event loop"""
+        try:
+            self.queue.put_nowait(document)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next update, or None if none arrived within the timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class StatusEventBus:
+    """Fans status updates out to the subscribers of their conversation"""
+
+    def __init__(self, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._subscriptions: Dict[str, Set[StatusSubscription]] = {}
+        self._lock = threading.Lock()
+        self._published = 0
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+    @property
+    def uses_change_stream(self) -> bool:
+        """True while a change stream, not local writes, feeds the bus"""
+        return self._watch_thread is not None and self._watch_thread.is_alive()
+
+    def subscribe(self, conversation_id: str) -> StatusSubscription:
+        """Subscribe the calling event loop to a conversation"""
+        subscription = StatusSubscription(conversation_id, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscriptions.setdefault(conversation_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: StatusSubscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.conversation_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscriptions[subscription.conversation_id]
+
+    def publish(self, document: Dict[str, Any], from_change_stream: bool = False):
+        """
+        Deliver a status update document to its conversation's subscribers.
+
+        Safe to call from any thread. Local publishes are skipped while a
+        change stream is running, since it will deliver the same insert.
+        """
+        if self.uses_change_stream and not from_change_stream:
+            return
+
+        with self._lock:
+            subscribers = list(self._subscriptions.get(document.get("conversation_id"), ()))
+            self._published += 1
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, document)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(subscription)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "conversations": len(self._subscriptions),
+                "subscribers": sum(len(subscribers) for subscribers in self._subscriptions.values()),
+                "published": self._published,
+                "change_stream": self.uses_change_stream
+            }
+
+    def start_change_stream(self, collection):
+        """Feed the bus from inserts into the Status_updates collection (requires a replica set)"""
+        if self.uses_change_stream:
+            return
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop, args=(collection,), name="status-change-stream", daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_change_stream(self):
+        self._watch_stop.set()
+
+    def _watch_loop(self, collection):
+        """Follow inserts, reconnecting with backoff on errors"""
+        backoff = 1.0
+        resume_token = None
+        pipeline = [{"$match": {"operationType": "insert"}}]
+        while not self._watch_stop.is_set():
+            try:
+                with collection.watch(pipeline, resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    logger.info("Status event bus following Status_updates change stream")
+                    backoff = 1.0
+                    while not self._watch_stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        document = change.get("fullDocument")
+                        if document:
+                            self.publish(document, from_change_stream=True)
+            except Exception as e:
+                logger.warning(f"Status change stream error, retrying in {backoff:.0f}s: {e}")
+                if self._watch_stop.wait(backoff):
+                    return
+                backoff = min(backoff * 2, 60.0)
+
+
+# Global event bus shared by the status service and the stream endpoint
+status_event_bus = StatusEventBus()
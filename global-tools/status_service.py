@@ -2,20 +2,112 @@
 Status service for handling status update operations with MongoDB
 """
 
+import os
+import json
+import time
 import uuid
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from pymongo.errors import BulkWriteError
 
 from models import (
     WriteStatusUpdateRequest, ReadStatusUpdatesRequest,
-    WriteStatusUpdateResponse, ReadStatusUpdatesResponse, StatusUpdateResponse
+    WriteStatusUpdateResponse, ReadStatusUpdatesResponse, StatusUpdateResponse,
+    WriteStatusUpdatesBatchRequest, WriteStatusUpdatesBatchResponse
 )
 from validation import validate_user_id
+from status_events import StatusEventBus, StatusSubscription, status_event_bus
+from status_write_buffer import StatusWriteBuffer
+
+MAX_READ_LIMIT = 1000
+MAX_WRITE_BATCH_SIZE = 500
+
+
+Position = Tuple[int, str]
+
+# Positions of updates delivered past the cursor's horizon that a cursor carries at most
+MAX_CURSOR_SEEN = 200
+
+
+def _position_key(timestamp: datetime, status_update_id: str) -> Position:
+    """Sort key of an update at the millisecond precision MongoDB stores"""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (timestamp - datetime(1970, 1, 1)) // timedelta(milliseconds=1), status_update_id
+
+
+def _encode_cursor(horizon: Position, seen: List[Position]) -> str:
+    """Opaque resume token: everything up to the horizon plus the listed updates was delivered"""
+    payload = [horizon[0], horizon[1]]
+    if seen:
+        payload.append([list(position) for position in seen])
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[Position, List[Position]]:
+    """Inverse of _encode_cursor; raises ValueError for malformed tokens"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        millis, status_update_id, *rest = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        seen = [(int(seen_millis), str(seen_id)) for seen_millis, seen_id in (rest[0] if rest else [])]
+        return (int(millis), str(status_update_id)), seen
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed cursor: {e}")
+
+
+def _position_time(position: Position) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(milliseconds=position[0])
+
+
+def _advance_cursor(horizon: Optional[Position], seen: List[Position], delivered: List[Position],
+                    page_end: Optional[Position], settle: timedelta) -> Tuple[Position, List[Position]]:
+    """
+    Cursor state after delivering some updates.
+
+    Timestamps are taken by the writing instance before the insert commits, so
+    an update can become visible after later-stamped ones were already read.
+    The horizon therefore trails the newest update by the settle window, and
+    updates delivered inside the window are remembered instead of skipped
+    over; the next read re-reads the window and leaves them out.
+
+    Args:
+        page_end: Last update of a truncated page, None if everything visible was delivered
+    """
+    settled = _position_key(datetime.utcnow() - settle, "")
+    candidate = min(page_end, settled) if page_end is not None else settled
+    if horizon is None or candidate > horizon:
+        horizon = candidate
+    seen = sorted(position for position in set(seen) | set(delivered) if position > horizon)
+    if len(seen) > MAX_CURSOR_SEEN:
+        # Burst inside the settle window; settle the oldest delivered updates early
+        horizon = seen[-MAX_CURSOR_SEEN - 1]
+        seen = seen[-MAX_CURSOR_SEEN:]
+    return horizon, seen
+
 
 class StatusService:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, event_bus: Optional[StatusEventBus] = None):
         self.db_manager = db_manager
+        self.event_bus = event_bus or status_event_bus
+        self.stream_heartbeat_seconds = float(os.getenv("STATUS_STREAM_HEARTBEAT_SECONDS", "15"))
+        # Without a change stream, how often open streams look in MongoDB for writes from other instances
+        self.stream_poll_seconds = float(os.getenv("STATUS_STREAM_POLL_SECONDS", "1"))
+        # Longest an update may take from being stamped to being visible to reads
+        self.read_settle = timedelta(milliseconds=float(os.getenv("STATUS_READ_SETTLE_MS", "5000")))
+        
+        # Optional write-behind buffer; subscribers are notified once a batch is stored
+        self.write_buffer: Optional[StatusWriteBuffer] = None
+        if os.getenv("STATUS_WRITE_BUFFER", "false").lower() == "true":
+            self.write_buffer = StatusWriteBuffer(
+                lambda: self.db_manager.status_updates,
+                on_flushed=self._publish_all
+            )
 
     def write_status_update(self, request: WriteStatusUpdateRequest) -> WriteStatusUpdateResponse:
         """Write a status update to the Status_updates collection"""
@@ -34,23 +126,26 @@ class StatusService:
         # Validate required fields
         self._validate_status_update_fields(request)
         
-        # Generate unique status update ID and timestamp
-        status_update_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow()
+        # Create status update document with a unique ID and timestamp
+        status_update_document = self._build_status_update_document(request)
+        status_update_id = status_update_document["_id"]
+        timestamp = status_update_document["timestamp"]
         
-        # Create status update document
-        status_update_document = {
-            "_id": status_update_id,
-            "agent_id": request.agent_id.strip(),
-            "agent_type": request.agent_type.strip(),
-            "conversation_id": request.conversation_id.strip(),
-            "update": request.update.strip(),
-            "timestamp": timestamp
-        }
+        if self.write_buffer is not None:
+            self.write_buffer.add(status_update_document)
+            # The buffer stamps the update when its batch is inserted, so no timestamp is known yet
+            return WriteStatusUpdateResponse(
+                message="Status update accepted and queued for writing",
+                status_update_id=status_update_id,
+                agent_id=status_update_document["agent_id"],
+                agent_type=status_update_document["agent_type"],
+                conversation_id=status_update_document["conversation_id"],
+                buffered=True
+            )
         
         # Insert into MongoDB
         try:
-            result = self.db_manager.client["Prosusware"]["Status_updates"].insert_one(status_update_document)
+            result = self.db_manager.status_updates.insert_one(status_update_document)
             
             if not result.inserted_id:
                 raise HTTPException(
@@ -74,6 +169,9 @@ class StatusService:
                 }
             )
         
+        # Wake up stream subscribers of this conversation
+        self.event_bus.publish(status_update_document)
+        
         return WriteStatusUpdateResponse(
             message="Status update successfully written",
             status_update_id=status_update_id,
@@ -83,6 +181,119 @@ class StatusService:
             timestamp=timestamp.isoformat()
         )
 
+    def write_status_updates_batch(self, request: WriteStatusUpdatesBatchRequest) -> WriteStatusUpdatesBatchResponse:
+        """Write many status updates with a single unordered insert_many"""
+        # Validate database connection
+        if not self.db_manager.is_connected():
+            raise HTTPException(
+                status_code=503,
+                detail={
+                    "error": "Database Unavailable",
+                    "message": "Database connection not available",
+                    "details": "Cannot write status updates - MongoDB connection is down",
+                    "endpoint": "/api/status/write_batch"
+                }
+            )
+        
+        if not request.updates or len(request.updates) > MAX_WRITE_BATCH_SIZE:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Invalid Batch Size",
+                    "message": f"updates must contain between 1 and {MAX_WRITE_BATCH_SIZE} status updates",
+                    "details": f"Received {len(request.updates or [])} status updates",
+                    "endpoint": "/api/status/write_batch"
+                }
+            )
+        
+        # Validate every update up front; the batch is rejected as a whole
+        invalid = []
+        for index, update in enumerate(request.updates):
+            errors = self._status_update_errors(update)
+            if errors:
+                invalid.append({"index": index, "errors": errors})
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Validation Error",
+                    "message": f"{len(invalid)} status updates in the batch contain invalid fields",
+                    "details": invalid,
+                    "endpoint": "/api/status/write_batch"
+                }
+            )
+        
+        documents = [self._build_status_update_document(update) for update in request.updates]
+        
+        if self.write_buffer is not None:
+            for document in documents:
+                self.write_buffer.add(document)
+            return WriteStatusUpdatesBatchResponse(
+                message="Status updates accepted and queued for writing",
+                inserted_count=len(documents),
+                status_update_ids=[document["_id"] for document in documents],
+                buffered=True,
+                timestamp=datetime.utcnow().isoformat()
+            )
+        
+        # Unordered: one bad document does not stop the rest of the batch
+        failed = []
+        try:
+            self.db_manager.status_updates.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = [
+                {"index": error["index"], "error": error.get("errmsg", "Write error")}
+                for error in e.details.get("writeErrors", [])
+            ]
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail={
+                    "error": "Database Insert Error",
+                    "message": "Failed to insert status updates into database",
+                    "details": str(e),
+                    "endpoint": "/api/status/write_batch"
+                }
+            )
+        
+        failed_indexes = {failure["index"] for failure in failed}
+        inserted = [document for index, document in enumerate(documents) if index not in failed_indexes]
+        
+        # Wake up stream subscribers of these conversations
+        self._publish_all(inserted)
+        
+        return WriteStatusUpdatesBatchResponse(
+            message=(f"{len(inserted)} of {len(documents)} status updates written" if failed
+                     else "Status updates successfully written"),
+            inserted_count=len(inserted),
+            status_update_ids=[document["_id"] for document in inserted],
+            failed=failed,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
+    def close(self):
+        """Flush buffered status updates; called on shutdown"""
+        if self.write_buffer is not None:
+            self.write_buffer.close()
+
+    def get_write_buffer_stats(self) -> Optional[Dict[str, Any]]:
+        return self.write_buffer.get_stats() if self.write_buffer is not None else None
+
+    def _build_status_update_document(self, request: WriteStatusUpdateRequest) -> Dict[str, Any]:
+        """Status update document with a generated ID and timestamp"""
+        return {
+            "_id": str(uuid.uuid4()),
+            "agent_id": request.agent_id.strip(),
+            "agent_type": request.agent_type.strip(),
+            "conversation_id": request.conversation_id.strip(),
+            "update": request.update.strip(),
+            "timestamp": datetime.utcnow()
+        }
+
+    def _publish_all(self, documents: List[Dict[str, Any]]):
+        for document in documents:
+            self.event_bus.publish(document)
+
     def read_status_updates(self, request: ReadStatusUpdatesRequest) -> ReadStatusUpdatesResponse:
         """Read status updates from the Status_updates collection with optional filtering"""
         # Validate database connection
@@ -119,11 +330,38 @@ class StatusService:
         if request.agent_id and request.agent_id.strip():
             query_filter["agent_id"] = request.agent_id.strip()
         
+        # Only updates after the caller's position: a cursor resumes after its
+        # horizon minus the updates it already delivered, `since` after a point in time
+        horizon, seen = None, []
+        if request.cursor:
+            horizon, seen = self._parse_cursor(request.cursor)
+            horizon_time = _position_time(horizon)
+            query_filter["$or"] = [
+                {"timestamp": {"$gt": horizon_time}},
+                {"timestamp": horizon_time, "_id": {"$gt": horizon[1]}}
+            ]
+            if seen:
+                query_filter["_id"] = {"$nin": [status_update_id for _, status_update_id in seen]}
+        elif request.since:
+            since = request.since
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            query_filter["timestamp"] = {"$gt": since}
+            # Every update in the millisecond of `since` is excluded too
+            horizon = (_position_key(since, "")[0] + 1, "")
+        
+        limit = self._validate_limit(request.limit)
+        
         # Query status updates from MongoDB
         try:
-            status_updates_cursor = self.db_manager.client["Prosusware"]["Status_updates"].find(
+            # Oldest first; _id breaks ties between updates written in the same millisecond
+            status_updates_cursor = self.db_manager.status_updates.find(
                 query_filter
-            ).sort("timestamp", 1)  # Sort by timestamp ascending (oldest first)
+            ).sort([("timestamp", 1), ("_id", 1)])
+            
+            if limit:
+                # One extra document tells whether another page follows
+                status_updates_cursor = status_updates_cursor.limit(limit + 1)
             
             status_updates_list = list(status_updates_cursor)
             
@@ -138,18 +376,19 @@ class StatusService:
                 }
             )
         
+        has_more = bool(limit) and len(status_updates_list) > limit
+        if has_more:
+            status_updates_list = status_updates_list[:limit]
+        
+        # Resume after the updates returned; the horizon only moves past updates
+        # old enough that no earlier-stamped update can still appear
+        delivered = [_position_key(doc["timestamp"], str(doc["_id"])) for doc in status_updates_list]
+        next_cursor = _encode_cursor(*_advance_cursor(
+            horizon, seen, delivered, delivered[-1] if has_more else None, self.read_settle
+        ))
+        
         # Convert MongoDB documents to response objects
-        status_updates = []
-        for doc in status_updates_list:
-            status_update = StatusUpdateResponse(
-                id=str(doc["_id"]),
-                agent_id=doc["agent_id"],
-                agent_type=doc["agent_type"],
-                conversation_id=doc["conversation_id"],
-                update=doc["update"],
-                timestamp=doc["timestamp"]
-            )
-            status_updates.append(status_update)
+        status_updates = [self._to_response(doc) for doc in status_updates_list]
         
         return ReadStatusUpdatesResponse(
             conversation_id=request.conversation_id.strip(),
@@ -157,11 +396,171 @@ class StatusService:
             agent_id=request.agent_id.strip() if request.agent_id else None,
             status_updates=status_updates,
             total_results=len(status_updates),
+            next_cursor=next_cursor,
+            has_more=has_more,
             timestamp=datetime.utcnow().isoformat()
         )
 
+    async def open_status_stream(self, request: ReadStatusUpdatesRequest) -> AsyncIterator[str]:
+        """
+        Open a Server-Sent Events stream of a conversation's status updates.
+
+        Updates after `request.cursor` (or all of them) are replayed from MongoDB
+        first, then new ones are pushed as they are written. Validation and
+        database errors are raised here, before the response starts.
+
+        Returns:
+            Async iterator of SSE-formatted events
+        """
+        conversation_id = (request.conversation_id or "").strip()
+        subscription = self.event_bus.subscribe(conversation_id)
+        try:
+            # Subscribe before the replay so nothing written in between is missed
+            backlog = await run_in_threadpool(self._read_page, request, request.cursor)
+        except Exception:
+            self.event_bus.unsubscribe(subscription)
+            raise
+        
+        return self._stream_events(request, subscription, backlog)
+
+    async def _stream_events(self, request: ReadStatusUpdatesRequest, subscription: StatusSubscription,
+                             backlog: ReadStatusUpdatesResponse) -> AsyncIterator[str]:
+        """Replay the backlog, then forward live updates with periodic keep-alives"""
+        agent_type = request.agent_type.strip() if request.agent_type else None
+        agent_id = request.agent_id.strip() if request.agent_id else None
+        horizon, seen = _decode_cursor(request.cursor) if request.cursor else (None, [])
+        last_sent = time.monotonic()
+        
+        try:
+            updates, has_more, page_cursor = backlog.status_updates, backlog.has_more, backlog.next_cursor
+            while True:
+                for status_update in updates:
+                    key = _position_key(status_update.timestamp, status_update.id)
+                    # Live updates may already have been sent as part of a replay
+                    if (horizon is not None and key <= horizon) or key in seen:
+                        continue
+                    # A replayed page is complete up to each of its updates; live updates
+                    # come from a subscription that sees every later write
+                    horizon, seen = _advance_cursor(horizon, seen, [key], key if page_cursor else None,
+                                                    self.read_settle)
+                    yield self._format_event(status_update, _encode_cursor(horizon, seen))
+                    last_sent = time.monotonic()
+                
+                if page_cursor:
+                    # Take over the page's cursor, which settles once the replay reached the head
+                    page_horizon, page_seen = _decode_cursor(page_cursor)
+                    if horizon is None or page_horizon > horizon:
+                        horizon, seen = page_horizon, [key for key in seen if key > page_horizon]
+                    seen = sorted(set(seen) | {key for key in page_seen if key > horizon})
+                    page_cursor = None
+                
+                if has_more or subscription.lagged:
+                    # Catch up from MongoDB: more backlog, or the subscriber fell behind
+                    subscription.lagged = False
+                    page = await run_in_threadpool(
+                        self._read_page, request, _encode_cursor(horizon, seen) if horizon else None
+                    )
+                    updates, has_more, page_cursor = page.status_updates, page.has_more, page.next_cursor
+                    continue
+                
+                updates = []
+                polling = not self.event_bus.uses_change_stream
+                document = await subscription.get(
+                    timeout=self.stream_poll_seconds if polling else self.stream_heartbeat_seconds
+                )
+                if document is None:
+                    if time.monotonic() - last_sent >= self.stream_heartbeat_seconds:
+                        yield ": keep-alive\n\n"
+                        last_sent = time.monotonic()
+                    if polling:
+                        # Writes through other instances only reach this one through MongoDB
+                        page = await run_in_threadpool(self._read_page, request, _encode_cursor(horizon, seen))
+                        updates, has_more, page_cursor = page.status_updates, page.has_more, page.next_cursor
+                    continue
+                
+                status_update = self._to_response(document)
+                if agent_type and status_update.agent_type != agent_type:
+                    continue
+                if agent_id and status_update.agent_id != agent_id:
+                    continue
+                updates = [status_update]
+        finally:
+            self.event_bus.unsubscribe(subscription)
+
+    def _read_page(self, request: ReadStatusUpdatesRequest, cursor: Optional[str]) -> ReadStatusUpdatesResponse:
+        """One page of updates after a cursor, with the request's filters"""
+        return self.read_status_updates(ReadStatusUpdatesRequest(
+            conversation_id=request.conversation_id,
+            agent_type=request.agent_type,
+            agent_id=request.agent_id,
+            cursor=cursor,
+            since=request.since,
+            limit=MAX_READ_LIMIT
+        ))
+
+    def _format_event(self, status_update: StatusUpdateResponse, cursor: str) -> str:
+        """Server-Sent Event whose id is the resume cursor after this update"""
+        data = json.dumps(jsonable_encoder(status_update))
+        return f"id: {cursor}\nevent: status_update\ndata: {data}\n\n"
+
+    def _to_response(self, doc: Dict[str, Any]) -> StatusUpdateResponse:
+        """Convert a MongoDB document to its response model"""
+        return StatusUpdateResponse(
+            id=str(doc["_id"]),
+            agent_id=doc["agent_id"],
+            agent_type=doc["agent_type"],
+            conversation_id=doc["conversation_id"],
+            update=doc["update"],
+            timestamp=doc["timestamp"]
+        )
+
+    def _parse_cursor(self, cursor: str) -> Tuple[Position, List[Position]]:
+        """Decode a resume token from a previous read"""
+        try:
+            return _decode_cursor(cursor.strip())
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Invalid Cursor",
+                    "message": "cursor is not a valid resume token",
+                    "details": str(e),
+                    "endpoint": "/api/status/read"
+                }
+            )
+
+    def _validate_limit(self, limit: Optional[int]) -> Optional[int]:
+        """Validate the optional page size"""
+        if limit is None:
+            return None
+        if limit < 1 or limit > MAX_READ_LIMIT:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Invalid Limit",
+                    "message": f"limit must be between 1 and {MAX_READ_LIMIT}",
+                    "details": f"Received limit={limit}",
+                    "endpoint": "/api/status/read"
+                }
+            )
+        return limit
+
     def _validate_status_update_fields(self, request: WriteStatusUpdateRequest):
         """Validate status update request fields"""
+        errors = self._status_update_errors(request)
+        if errors:
+            raise HTTPException(
+                status_code=400,
+                detail={
+                    "error": "Validation Error",
+                    "message": "Status update request contains invalid fields",
+                    "details": errors,
+                    "endpoint": "/api/status/write"
+                }
+            )
+
+    def _status_update_errors(self, request: WriteStatusUpdateRequest) -> List[str]:
+        """Collect the validation errors of a status update"""
         errors = []
         
         # Validate agent_id
@@ -196,13 +595,4 @@ class StatusService:
         elif len(request.update.strip()) > 5000:
             errors.append("update cannot exceed 5000 characters")
         
-        if errors:
-            raise HTTPException(
-                status_code=400,
-                detail={
-                    "error": "Validation Error",
-                    "message": "Status update request contains invalid fields",
-                    "details": errors,
-                    "endpoint": "/api/status/write"
-                }
-            ) 
\ No newline at end of file
+        return errors
@@ -0,0 +1,185 @@
+"""
+Write-behind buffer for status updates
+
+When enabled, `StatusService.write_status_update` hands documents to this
+buffer and returns immediately. A background thread writes them with one
+`insert_many(ordered=False)` per batch: when `max_batch_size` documents are
+waiting or `max_delay_ms` after the first one arrived, whichever comes first.
+`close()` (called on application shutdown) flushes whatever is left.
+
+Updates are acknowledged before they are stored, so a read issued right
+after a write may not see it until the next flush. Their `timestamp` is set
+when a batch is inserted rather than when it was accepted, so the time spent
+waiting in the buffer does not count against the read settle window; updates
+of a batch are stamped a millisecond apart to keep the order they arrived in.
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Callable
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class StatusWriteBuffer:
+    """Groups status update inserts into batched insert_many calls"""
+
+    def __init__(self, get_collection: Callable[[], Any],
+                 on_flushed: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 max_batch_size: Optional[int] = None, max_delay_ms: Optional[float] = None,
+                 max_retries: int = 3):
+        """
+        Args:
+            get_collection: Returns the Status_updates collection at flush time
+            on_flushed: Called with the documents of each stored batch
+            max_batch_size: Flush once this many documents are waiting (env STATUS_WRITE_BUFFER_MAX_SIZE)
+            max_delay_ms: Longest a document waits before being flushed (env STATUS_WRITE_BUFFER_MAX_DELAY_MS)
+            max_retries: Attempts per batch before its documents are dropped
+        """
+        self.get_collection = get_collection
+        self.on_flushed = on_flushed
+        self.max_batch_size = max_batch_size or int(os.getenv("STATUS_WRITE_BUFFER_MAX_SIZE", "100"))
+        self.max_delay = (max_delay_ms if max_delay_ms is not None
+                          else float(os.getenv("STATUS_WRITE_BUFFER_MAX_DELAY_MS", "50"))) / 1000
+        self.max_retries = max_retries
+
+        self._pending: List[Dict[str, Any]] = []
+        self._first_pending_at: Optional[float] = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._last_stamp: Optional[datetime] = None
+        self._stats = {"buffered": 0, "flushed": 0, "batches": 0, "failed_batches": 0, "dropped": 0}
+
+        self._thread = threading.Thread(target=self._run, name="status-write-buffer", daemon=True)
+        self._thread.start()
+
+    def add(self, document: Dict[str, Any]):
+        """Queue a status update document for insertion"""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Status write buffer is closed")
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending.append(document)
+            self._stats["buffered"] += 1
+            if len(self._pending) >= self.max_batch_size or len(self._pending) == 1:
+                self._condition.notify()
+
+    def flush(self):
+        """Write everything queued so far before returning"""
+        with self._condition:
+            batch = self._take_batch(force=True)
+        while batch:
+            self._write(batch)
+            with self._condition:
+                batch = self._take_batch(force=True)
+
+    def close(self, timeout: float = 10.0):
+        """Stop accepting updates and flush the remaining ones"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join(timeout)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                **self._stats,
+                "pending": len(self._pending),
+                "max_batch_size": self.max_batch_size,
+                "max_delay_ms": self.max_delay * 1000
+            }
+
+    def _take_batch(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Pop the next batch if it is due; call with the condition held"""
+        if not self._pending:
+            return []
+        due = (
+            force
+            or len(self._pending) >= self.max_batch_size
+            or time.monotonic() - self._first_pending_at >= self.max_delay
+        )
+        if not due:
+            return []
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        self._first_pending_at = time.monotonic() if self._pending else None
+        return batch
+
+    def _run(self):
+        """Background loop flushing batches when they are full or old enough"""
+        while True:
+            with self._condition:
+                batch = self._take_batch(force=self._closed)
+                while not batch:
+                    if self._closed:
+                        return
+                    if self._pending:
+                        wait = self.max_delay - (time.monotonic() - self._first_pending_at)
+                        self._condition.wait(max(wait, 0.0))
+                    else:
+                        self._condition.wait()
+                    batch = self._take_batch(force=self._closed)
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]):
+        """Insert a batch, retrying documents that failed for transient reasons"""
+        remaining = batch
+        for attempt in range(1, self.max_retries + 1):
+            self._stamp(remaining)
+            try:
+                self.get_collection().insert_many(remaining, ordered=False)
+                self._record_flushed(remaining)
+                return
+            except BulkWriteError as e:
+                failed_indexes = {error["index"] for error in e.details.get("writeErrors", [])}
+                # Duplicate keys mean an earlier attempt already stored the document
+                retryable = {
+                    error["index"] for error in e.details.get("writeErrors", []) if error.get("code") != 11000
+                }
+                stored = [document for i, document in enumerate(remaining) if i not in failed_indexes]
+                self._record_flushed(stored)
+                remaining = [document for i, document in enumerate(remaining) if i in retryable]
+                if not remaining:
+                    return
+                error = e
+            except Exception as e:
+                error = e
+
+            with self._condition:
+                self._stats["failed_batches"] += 1
+            logger.warning(f"Status write buffer flush failed (attempt {attempt}/{self.max_retries}): {error}")
+            time.sleep(min(0.1 * 2 ** attempt, 2.0))
+
+        with self._condition:
+            self._stats["dropped"] += len(remaining)
+        logger.error(f"Dropped {len(remaining)} buffered status updates after {self.max_retries} attempts")
+
+    def _stamp(self, documents: List[Dict[str, Any]]):
+        """Set insert-time timestamps, one millisecond apart so ties keep the accept order"""
+        with self._condition:
+            stamped_at = datetime.utcnow()
+            if self._last_stamp is not None:
+                stamped_at = max(stamped_at, self._last_stamp + timedelta(milliseconds=1))
+            for i, document in enumerate(documents):
+                document["timestamp"] = stamped_at + timedelta(milliseconds=i)
+            self._last_stamp = documents[-1]["timestamp"]
+
+    def _record_flushed(self, documents: List[Dict[str, Any]]):
+        with self._condition:
+            self._stats["flushed"] += len(documents)
+            self._stats["batches"] += 1
+        if self.on_flushed and documents:
+            try:
+                self.on_flushed(documents)
+            except Exception as e:
+                logger.warning(f"Status write buffer flush callback failed: {e}")
@@ -0,0 +1,28 @@
+"""
+Shared fixtures for the global-tools tests
+
+Run from global-tools: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeUserCache:
+    """Stands in for UserCache: every user exists and has no embedded contacts"""
+
+    def get_user(self, user_id, by="uid"):
+        return {"_id": user_id, "uid": user_id, "Contacts": []}
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    """ChromaManager on the in-memory local backend, embedding with the hashing fallback"""
+    monkeypatch.delenv("EMBEDDING_SERVICE_URL", raising=False)
+    from chromaManager import ChromaManager
+
+    return ChromaManager(backend="local", local_path="")
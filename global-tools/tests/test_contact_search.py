@@ -0,0 +1,109 @@
+"""
+Searching across all collections finds contact memories before and after the
+user's contacts are moved to the Contacts collection
+"""
+
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from bson import ObjectId
+
+from contact_store import ContactStore, COLLECTION_STORAGE
+from memory_service import MemoryService
+from models import SearchMemoryRequest
+from user_cache import UserCache
+
+USER_ID = ObjectId()
+
+
+class ReplaceOneCollection:
+    """mongomock collection whose bulk_write takes pymongo 4 ReplaceOne requests"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def bulk_write(self, requests, ordered=True):
+        for request in requests:
+            self._collection.replace_one(request._filter, request._doc, upsert=request._upsert)
+
+
+class FakeDBManager:
+    def __init__(self):
+        database = mongomock.MongoClient().db
+        self.users = database.Users
+        self.contacts = ReplaceOneCollection(database.Contacts)
+
+
+@pytest.fixture
+def db_manager():
+    manager = FakeDBManager()
+    manager.users.insert_one({
+        "_id": USER_ID,
+        "uid": "user-uid",
+        "updated_at": datetime(2026, 1, 1),
+        "Contacts": [
+            {"uid": "anna-id", "email": "anna@example.com", "created_at": datetime(2026, 1, 1)},
+            {"uid": "ken-id", "email": "ken@example.com", "created_at": datetime(2026, 1, 2)},
+        ]
+    })
+    return manager
+
+
+@pytest.fixture
+def service(db_manager, manager):
+    manager.add_documents(str(USER_ID), ["User prefers window seats"],
+                          metadatas=[{"user_id": str(USER_ID), "memory_type": "user"}], ids=["own"])
+    for contact_id, text in (("anna-id", "Anna prefers aisle seats"), ("ken-id", "Ken prefers exit rows")):
+        manager.add_documents(contact_id, [text], ids=[contact_id + "-memory"], metadatas=[
+            {"user_id": str(USER_ID), "memory_type": "contact", "contact_id": contact_id}
+        ])
+    return MemoryService(db_manager, manager, user_cache=UserCache(db_manager, ttl_seconds=0),
+                         search_mode="vector")
+
+
+def searched_collections(service):
+    request = SearchMemoryRequest(user_id=str(USER_ID), query="seat preference", search_all_collections=True)
+    return sorted(service.search_memories(request).collections_searched)
+
+
+def test_search_all_collections_after_contact_migration(service, db_manager):
+    expected = sorted([str(USER_ID), "anna-id", "ken-id"])
+    assert searched_collections(service) == expected
+
+    report = ContactStore(db_manager).migrate_user("user-uid")
+    assert report["migrated"]
+    user = db_manager.users.find_one({"_id": USER_ID})
+    assert "Contacts" not in user and user["contacts_storage"] == COLLECTION_STORAGE
+
+    assert searched_collections(service) == expected
+
+
+def test_unknown_search_contact_names_the_search_endpoint(service):
+    from fastapi import HTTPException
+
+    request = SearchMemoryRequest(user_id=str(USER_ID), query="seat preference", contact_id="nobody")
+    with pytest.raises(HTTPException) as raised:
+        service.search_memories(request)
+
+    assert raised.value.status_code == 404
+    assert raised.value.detail["endpoint"] == "/api/memory/search"
+
+
+def test_contact_added_elsewhere_is_found_through_a_warm_cache(db_manager):
+    cache = UserCache(db_manager, ttl_seconds=60)
+    assert cache.get_contact("user-uid", "anna-id")["email"] == "anna@example.com"
+
+    # Written through another instance, after this one cached the user
+    db_manager.users.update_one({"_id": USER_ID}, {"$push": {"Contacts": {
+        "uid": "mia-id", "email": "mia@example.com", "created_at": datetime(2026, 1, 3)
+    }}})
+
+    assert cache.get_contact("user-uid", "mia-id")["email"] == "mia@example.com"
+    assert [contact["uid"] for contact in cache.get_contacts_by_email("user-uid", "mia@example.com")] == ["mia-id"]
+    assert cache.get_contact("user-uid", "nobody") is None
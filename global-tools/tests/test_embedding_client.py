@@ -0,0 +1,139 @@
+"""
+Embedding client: concurrent misses share micro-batches, vectors are cached per service and model
+"""
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from embedding_client import EmbeddingCache, EmbeddingClient
+
+CALLERS = 8
+
+
+def vector_of(text):
+    """What the stub service returns for a text"""
+    return [float(len(text)), float(sum(map(ord, text)) % 997)]
+
+
+class StubEmbeddingService:
+    """Local /embed endpoint recording the batches it receives"""
+
+    def __init__(self):
+        self.batches = []
+        self.error = None
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["texts"]
+                service.batches.append(texts)
+                if service.error:
+                    status, body = 500, {"error": service.error}
+                else:
+                    status, body = 200, {"embeddings": [vector_of(text) for text in texts]}
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    service = StubEmbeddingService()
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(url, **kwargs):
+        client = EmbeddingClient(url, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def embed_concurrently(client, texts_per_caller):
+    """Embed each caller's texts from its own thread, all released at once"""
+    start = threading.Barrier(len(texts_per_caller))
+
+    def call(texts):
+        start.wait()
+        try:
+            return client.embed(texts)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=len(texts_per_caller)) as pool:
+        return list(pool.map(call, texts_per_caller))
+
+
+def test_concurrent_calls_share_one_batch_and_keep_their_order(stub, make_client):
+    client = make_client(stub.url, batch_window_ms=200, cache=EmbeddingCache(max_size=0))
+    texts_per_caller = [[f"caller {i} first", f"caller {i} second text", "shared"] for i in range(CALLERS)]
+
+    results = embed_concurrently(client, texts_per_caller)
+
+    assert len(stub.batches) == 1
+    # "shared" is sent once for every caller asking for it
+    assert sorted(stub.batches[0]) == sorted({text for texts in texts_per_caller for text in texts})
+    for texts, vectors in zip(texts_per_caller, results):
+        assert np.array_equal(vectors, np.array([vector_of(text) for text in texts], dtype=np.float32))
+    assert client.get_metrics()["coalesced_texts"] == CALLERS - 1
+
+
+def test_cache_is_keyed_by_service_and_model(stub, make_client):
+    other = StubEmbeddingService()
+    try:
+        cache = EmbeddingCache()
+        client = make_client(stub.url, batch_window_ms=0, cache=cache, model="model-a")
+        client.embed(["hello"])
+        client.embed(["hello"])
+        assert len(stub.batches) == 1
+        assert client.get_metrics()["cache_hits"] == 1
+
+        # Same cache, another model or another service: not served the cached vector
+        make_client(stub.url, batch_window_ms=0, cache=cache, model="model-b").embed(["hello"])
+        assert len(stub.batches) == 2
+        make_client(other.url, batch_window_ms=0, cache=cache, model="model-a").embed(["hello"])
+        assert len(other.batches) == 1
+
+        make_client(stub.url, batch_window_ms=0, cache=cache, model="model-a").embed(["hello"])
+        assert len(stub.batches) == 2
+    finally:
+        other.close()
+
+
+def test_upstream_error_reaches_every_waiting_caller(stub, make_client):
+    stub.error = "model overloaded"
+    client = make_client(stub.url, batch_window_ms=200)
+
+    results = embed_concurrently(client, [[f"text {i}"] for i in range(CALLERS)])
+
+    assert len(stub.batches) == 1
+    assert all(isinstance(result, Exception) and "model overloaded" in str(result) for result in results)
+    assert client.get_metrics()["upstream_errors"] == 1
+    assert len(client.cache) == 0
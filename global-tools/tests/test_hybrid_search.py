@@ -0,0 +1,141 @@
+"""
+Hybrid memory search: BM25 keyword index fused with vector similarity
+"""
+
+import time
+
+import pytest
+
+from hybrid_search import BM25Index, LexicalIndexCache, reciprocal_rank_fusion, tokenize
+from tests.conftest import FakeUserCache
+
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+
+
+def test_tokenize_keeps_emails_and_joins_codes():
+    tokens = tokenize("Flight LH 1234, mail Anna.B@example.com")
+
+    assert "lh1234" in tokens
+    assert "anna.b@example.com" in tokens
+    assert sorted(tokenize("LH1234")) == sorted(tokenize("LH 1234")) == ["1234", "lh", "lh1234"]
+
+
+def test_bm25_ranks_rare_terms_and_filters_metadata():
+    index = BM25Index()
+    index.add("a", "User prefers window seats", {"memory_type": "user"})
+    index.add("b", "Booked flight LH1234 to Lisbon", {"memory_type": "user"})
+    index.add("c", "Contact booked flight LH 1234 too", {"memory_type": "contact"})
+
+    assert [doc_id for doc_id, _ in index.search("LH 1234", 5)] == ["b", "c"]
+    assert [doc_id for doc_id, _ in index.search("LH1234", 5, {"memory_type": "contact"})] == ["c"]
+
+    index.add("b", "Booked a train to Porto", {"memory_type": "user"})
+    index.remove("c")
+    assert index.search("LH1234", 5) == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]])
+
+    assert [item for item, _ in fused] == ["a", "c", "b"]
+
+
+def make_service(manager, search_mode, lexical_index=None):
+    from memory_service import MemoryService
+    from memory_layout import MemoryLayout, PER_CONTACT_LAYOUT
+
+    return MemoryService(None, manager, layout=MemoryLayout(PER_CONTACT_LAYOUT), user_cache=FakeUserCache(),
+                         dedup_mode="off", search_mode=search_mode, lexical_index=lexical_index)
+
+
+def test_hybrid_search_finds_exact_identifiers(manager):
+    from models import AddMemoryRequest, SearchMemoryRequest
+
+    hybrid = make_service(manager, "hybrid")
+    # Build the index first so the adds below exercise incremental updates
+    hybrid.lexical_index.get(USER_ID)
+    for i in range(40):
+        hybrid.add_memory(AddMemoryRequest(user_id=USER_ID, memory=f"User booked flight QR{100 + i} to Doha"))
+
+    request = SearchMemoryRequest(user_id=USER_ID, query="what about QR 117", n_results=3)
+    result = hybrid.search_memories(request)
+
+    assert result.memories[0].memory == "User booked flight QR117 to Doha"
+    assert result.memories[0].score is not None
+    assert hybrid.lexical_index.get_stats()["builds"] == 1
+
+
+def test_lexical_index_rebuilds_after_invalidation(manager):
+    cache = LexicalIndexCache(manager, ttl_seconds=300)
+    manager.add_documents(USER_ID, ["Hotel confirmation X7K9Q2"], metadatas=[{"user_id": USER_ID}], ids=["m1"])
+    assert [doc_id for doc_id, _ in cache.get(USER_ID).search("X7K9Q2", 5)] == ["m1"]
+
+    # Written behind the cache's back: visible only after invalidation
+    manager.add_documents(USER_ID, ["Second confirmation ZZ11AA"], metadatas=[{"user_id": USER_ID}], ids=["m2"])
+    assert cache.get(USER_ID).search("ZZ11AA", 5) == []
+
+    cache.invalidate(USER_ID)
+    assert [doc_id for doc_id, _ in cache.get(USER_ID).search("ZZ11AA", 5)] == ["m2"]
+    assert cache.get_stats()["builds"] == 2
+
+
+def test_cold_index_is_built_in_the_background(manager):
+    from models import SearchMemoryRequest
+
+    manager.add_documents(USER_ID, ["Hotel confirmation X7K9Q2"], metadatas=[{"user_id": USER_ID}], ids=["m1"])
+    hybrid = make_service(manager, "hybrid")
+    request = SearchMemoryRequest(user_id=USER_ID, query="X7K9Q2", n_results=3)
+
+    # The first search does not wait for the index and scores by similarity only
+    assert hybrid.search_memories(request).memories[0].id == "m1"
+    assert hybrid.lexical_index.get_stats()["misses"] == 1
+    for _ in range(100):
+        if hybrid.lexical_index.get_stats()["collections"]:
+            break
+        time.sleep(0.01)
+
+    assert hybrid.search_memories(request).memories[0].id == "m1"
+    assert hybrid.lexical_index.get_stats()["hits"] == 1
+    assert hybrid.lexical_index.get_stats()["builds"] == 1
+
+
+def test_vector_endpoint_changes_reach_the_index(manager):
+    from chroma_service import ChromaService
+    from models import AddDocumentsRequest, DeleteDocumentsRequest, UpdateDocumentsRequest
+
+    cache = LexicalIndexCache(manager, ttl_seconds=300)
+    service = ChromaService(manager, lexical_index=cache)
+    service.add_documents(AddDocumentsRequest(
+        collection_name=USER_ID, documents=["Hotel confirmation X7K9Q2"], ids=["m1"], metadatas=[{"user_id": USER_ID}]
+    ))
+    cache.get(USER_ID)
+    service.add_documents(AddDocumentsRequest(
+        collection_name=USER_ID, documents=["Second confirmation ZZ11AA"], ids=["m2"], metadatas=[{"user_id": USER_ID}]
+    ))
+    assert [doc_id for doc_id, _ in cache.get(USER_ID).search("ZZ11AA", 5)] == ["m2"]
+
+    service.delete_documents(DeleteDocumentsRequest(collection_name=USER_ID, ids=["m2"]))
+    assert cache.get(USER_ID).search("ZZ11AA", 5) == []
+
+    service.update_documents(UpdateDocumentsRequest(collection_name=USER_ID, ids=["m1"], documents=["Booking QQ42"]))
+    assert cache.get(USER_ID).search("X7K9Q2", 5) == []
+    assert [doc_id for doc_id, _ in cache.get(USER_ID).search("QQ42", 5)] == ["m1"]
+
+
+def test_memory_deleted_during_a_keyword_search_is_skipped(manager):
+    manager.add_documents(USER_ID, ["Flight QR117 booked", "Seat 12A on QR117"],
+                          metadatas=[{"user_id": USER_ID}] * 2, ids=["m1", "m2"])
+    hybrid = make_service(manager, "hybrid")
+    index = hybrid.lexical_index.get(USER_ID)
+    search = index.search
+
+    def search_then_delete(*args, **kwargs):
+        # Another request removes a hit once the index lock is released
+        hits = search(*args, **kwargs)
+        index.remove("m2")
+        return hits
+
+    index.search = search_then_delete
+    memories = hybrid._lexical_search([USER_ID], "QR117", 5, None)
+
+    assert [memory.id for memory in memories] == ["m1"]
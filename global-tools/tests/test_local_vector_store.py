@@ -0,0 +1,162 @@
+"""
+Embedded vector backend (CHROMA_BACKEND=local): runs without a Chroma server
+"""
+
+import numpy as np
+import pytest
+
+from local_vector_store import LocalVectorClient, HashingEmbeddingFunction, matches_where
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_SERVICE_URL", raising=False)
+    from chromaManager import ChromaManager
+
+    return ChromaManager(backend="local", local_path=str(tmp_path))
+
+
+def add_sample_memories(manager):
+    manager.add_documents(
+        "user-1",
+        ["likes thai food", "prefers window seats", "allergic to peanuts"],
+        metadatas=[{"memory_type": "user", "rank": 1}, {"memory_type": "contact", "rank": 2},
+                   {"memory_type": "user", "rank": 3}],
+        ids=["m1", "m2", "m3"]
+    )
+
+
+class TestChromaManagerLocalBackend:
+    def test_query_returns_nearest_documents(self, manager):
+        add_sample_memories(manager)
+
+        result = manager.query_documents("user-1", ["thai food"], n_results=2)
+
+        assert result["results"]["ids"] == [["m1", "m3"]]
+        distances = result["results"]["distances"][0]
+        assert distances == sorted(distances)
+
+    def test_where_filter(self, manager):
+        add_sample_memories(manager)
+        where = {"$and": [{"memory_type": "user"}, {"rank": {"$gte": 2}}]}
+
+        result = manager.query_documents("user-1", ["thai food"], n_results=5, where=where)
+
+        assert result["results"]["ids"] == [["m3"]]
+
+    def test_update_delete_and_get(self, manager):
+        add_sample_memories(manager)
+        manager.update_documents("user-1", ["m2"], documents=["prefers aisle seats"],
+                                 metadatas=[{"memory_type": "user"}])
+        manager.delete_documents("user-1", ["m1"])
+
+        stored = manager.get_documents("user-1")
+        assert sorted(stored["ids"]) == ["m2", "m3"]
+        assert stored["metadatas"][stored["ids"].index("m2")] == {"memory_type": "user", "rank": 2}
+        assert manager.query_documents("user-1", ["aisle seats"], n_results=1)["results"]["ids"] == [["m2"]]
+
+    def test_data_survives_reopen(self, manager):
+        from chromaManager import ChromaManager
+
+        add_sample_memories(manager)
+        reopened = ChromaManager(backend="local", local_path=manager.local_path)
+
+        assert reopened.list_collections()["collections"] == ["user-1"]
+        assert reopened.get_collection_info("user-1")["document_count"] == 3
+        assert reopened.query_documents("user-1", ["peanuts"], n_results=1)["results"]["ids"] == [["m3"]]
+
+    def test_missing_collection_is_not_created(self, manager):
+        result = manager.query_documents("missing", ["anything"], n_results=3)
+
+        assert result["results"]["ids"] == [[]]
+        assert manager.get_collection("missing") is None
+        assert manager.list_collections()["collections"] == []
+
+
+class TestLocalVectorClient:
+    def test_in_memory_collection_grows_past_initial_capacity(self):
+        client = LocalVectorClient()
+        collection = client.get_or_create_collection("vectors", metadata={"hnsw:space": "cosine"})
+        vectors = np.random.default_rng(0).standard_normal((200, 16)).astype(np.float32)
+
+        collection.add(ids=[str(i) for i in range(200)], embeddings=vectors)
+        result = collection.query(query_embeddings=[vectors[150]], n_results=3)
+
+        assert collection.count() == 200
+        assert result["ids"][0][0] == "150"
+        assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+
+    def test_duplicate_ids_are_ignored(self):
+        collection = LocalVectorClient().get_or_create_collection(
+            "docs", embedding_function=HashingEmbeddingFunction()
+        )
+        collection.add(ids=["a"], documents=["first"])
+        collection.add(ids=["a", "b"], documents=["second", "third"])
+
+        assert collection.get(ids=["a"])["documents"] == ["first"]
+        assert collection.count() == 2
+
+    def test_writes_are_logged_and_compacted(self, tmp_path, monkeypatch):
+        import local_vector_store
+
+        monkeypatch.setattr(local_vector_store, "MIN_LOG_ENTRIES", 10)
+        vectors = np.random.default_rng(1).standard_normal((30, 8)).astype(np.float32)
+        collection = LocalVectorClient(str(tmp_path)).get_or_create_collection("vectors")
+        for i in range(30):
+            collection.add(ids=[str(i)], embeddings=vectors[i:i + 1], metadatas=[{"n": i}])
+        collection.update(ids=["3"], metadatas=[{"n": -3}])
+        collection.delete(ids=["0", "7"])
+
+        # Only the writes since the last compaction are in the log
+        assert collection._log_entries <= 30
+        assert collection._log_generation > 1
+
+        reopened = LocalVectorClient(str(tmp_path)).get_collection("vectors")
+        assert reopened.count() == 28
+        assert reopened.get(ids=["3"])["metadatas"] == [{"n": -3}]
+        assert reopened.get(ids=["0", "7"])["ids"] == []
+        result = reopened.query(query_embeddings=[vectors[29]], n_results=1)
+        assert result["ids"][0] == ["29"]
+        assert result["distances"][0][0] == pytest.approx(0.0, abs=1e-4)
+
+    def test_write_cut_short_by_a_crash_leaves_vectors_matching_ids(self, tmp_path):
+        vectors = np.random.default_rng(2).standard_normal((10, 8)).astype(np.float32)
+        collection = LocalVectorClient(str(tmp_path)).get_or_create_collection("vectors")
+        collection.add(ids=[str(i) for i in range(10)], embeddings=vectors)
+        collection.update(ids=["4"], embeddings=vectors[:1] * 2)
+        # Moves the last record's vector into the deleted row
+        collection.delete(ids=["2"])
+        collection._vectors.flush()
+
+        # Crash while the delete's entry was being logged
+        log_path = collection._log_path(collection._log_generation)
+        with open(log_path) as f:
+            lines = f.readlines()
+        with open(log_path, "w") as f:
+            f.writelines(lines[:-1] + [lines[-1][:len(lines[-1]) // 2]])
+
+        reopened = LocalVectorClient(str(tmp_path)).get_collection("vectors")
+        assert reopened.count() == 10
+        stored = reopened.get(include=["embeddings"])
+        expected = {str(i): vectors[i] for i in range(10)}
+        expected["4"] = vectors[0] * 2
+        for record_id, vector in zip(stored["ids"], stored["embeddings"]):
+            assert np.allclose(vector, expected[record_id]), record_id
+
+    def test_deleted_collection_is_gone(self, tmp_path):
+        client = LocalVectorClient(str(tmp_path))
+        client.get_or_create_collection("docs")
+        client.delete_collection("docs")
+
+        with pytest.raises(ValueError, match="does not exist"):
+            client.get_collection("docs")
+
+
+def test_where_operators():
+    metadata = {"memory_type": "user", "rank": 2}
+
+    assert matches_where(metadata, {"memory_type": "user"})
+    assert matches_where(metadata, {"rank": {"$in": [1, 2]}})
+    assert matches_where(metadata, {"$or": [{"rank": {"$gt": 5}}, {"memory_type": {"$ne": "contact"}}]})
+    assert not matches_where(metadata, {"contact_id": "c1"})
+    assert not matches_where(metadata, {"rank": {"$lt": 2}})
@@ -0,0 +1,142 @@
+"""
+Memory deduplication: compaction merges near-duplicates, add_memory suppresses them
+"""
+
+import pytest
+
+from memory_compaction import compact_collection
+from tests.conftest import FakeUserCache
+
+
+def add_memory(manager, memory_id, text, created_at, memory_type="user", contact_id=None):
+    metadata = {"user_id": "user-1", "memory_type": memory_type, "created_at": created_at}
+    if contact_id:
+        metadata["contact_id"] = contact_id
+    manager.add_documents("user-1", [text], metadatas=[metadata], ids=[memory_id])
+
+
+def test_duplicates_merge_into_most_recent_memory(manager):
+    for day in range(1, 11):
+        add_memory(manager, f"seat-{day}", "User prefers window seats", f"2026-01-{day:02d}T09:00:00")
+    add_memory(manager, "peanuts", "User is allergic to peanuts", "2026-01-05T09:00:00")
+
+    report = compact_collection(manager, "user-1")
+
+    assert report["memories_before"] == 11
+    assert report["memories_after"] == 2
+    assert report["search_ms_before"] is not None and report["search_ms_after"] is not None
+
+    stored = manager.get_documents("user-1")
+    assert sorted(stored["ids"]) == ["peanuts", "seat-10"]
+    survivor = stored["metadatas"][stored["ids"].index("seat-10")]
+    assert survivor["duplicate_count"] == 10
+    assert survivor["merged_ids"].split(",") == [f"seat-{day}" for day in range(1, 10)]
+    assert survivor["first_seen_at"] == "2026-01-01T09:00:00"
+
+
+def test_memories_of_different_contacts_are_kept_apart(manager):
+    add_memory(manager, "own", "Prefers window seats", "2026-01-01T09:00:00")
+    add_memory(manager, "contact", "Prefers window seats", "2026-01-02T09:00:00", "contact", "contact-1")
+
+    assert compact_collection(manager, "user-1")["removed"] == 0
+
+
+def test_compaction_is_incremental(manager):
+    add_memory(manager, "first", "User prefers window seats", "2026-01-01T09:00:00")
+    add_memory(manager, "second", "User prefers window seats", "2026-01-02T09:00:00")
+    compact_collection(manager, "user-1")
+
+    assert compact_collection(manager, "user-1")["skipped"]
+
+    add_memory(manager, "third", "User prefers window seats", "2026-01-03T09:00:00")
+    report = compact_collection(manager, "user-1")
+
+    assert report["removed"] == 1
+    survivor = manager.get_documents("user-1", ids=["third"])["metadatas"][0]
+    assert survivor["duplicate_count"] == 3
+    assert survivor["merged_ids"] == "first,second"
+
+
+def test_dry_run_changes_nothing(manager):
+    add_memory(manager, "first", "User prefers window seats", "2026-01-01T09:00:00")
+    add_memory(manager, "second", "User prefers window seats", "2026-01-02T09:00:00")
+
+    assert compact_collection(manager, "user-1", dry_run=True)["removed"] == 1
+    assert manager.get_collection_info("user-1")["document_count"] == 2
+
+
+@pytest.mark.parametrize("mode, action", [("skip", "skipped"), ("update", "updated")])
+def test_add_memory_suppresses_near_duplicates(manager, mode, action):
+    from memory_service import MemoryService
+    from memory_layout import MemoryLayout, PER_CONTACT_LAYOUT
+    from models import AddMemoryRequest
+
+    service = MemoryService(None, manager, layout=MemoryLayout(PER_CONTACT_LAYOUT),
+                            user_cache=FakeUserCache(), dedup_mode=mode)
+    user_id = "64b7f0c2a1b2c3d4e5f60718"
+
+    first = service.add_memory(AddMemoryRequest(user_id=user_id, memory="User prefers window seats"))
+    repeat = service.add_memory(AddMemoryRequest(user_id=user_id, memory="user prefers window seats!"))
+    other = service.add_memory(AddMemoryRequest(user_id=user_id, memory="User is allergic to peanuts"))
+
+    assert [first.action, repeat.action, other.action] == ["added", action, "added"]
+    assert repeat.memory_id == first.memory_id
+    assert manager.get_collection_info(user_id)["document_count"] == 2
+    stored = manager.get_documents(user_id, ids=[first.memory_id])
+    if mode == "update":
+        assert stored["documents"] == ["user prefers window seats!"]
+        assert stored["metadatas"][0]["duplicate_count"] == 2
+    else:
+        assert stored["documents"] == ["User prefers window seats"]
+
+
+@pytest.mark.parametrize("mode, action", [("skip", "skipped"), ("update", "updated")])
+def test_add_batch_suppresses_near_duplicates(manager, mode, action):
+    from memory_service import MemoryService
+    from memory_layout import MemoryLayout, PER_CONTACT_LAYOUT
+    from models import AddMemoriesBatchRequest, AddMemoryRequest, BatchMemoryItem
+
+    service = MemoryService(None, manager, layout=MemoryLayout(PER_CONTACT_LAYOUT),
+                            user_cache=FakeUserCache(), dedup_mode=mode)
+    user_id = "64b7f0c2a1b2c3d4e5f60718"
+    stored = service.add_memory(AddMemoryRequest(user_id=user_id, memory="User prefers window seats"))
+
+    response = service.add_memories_batch(AddMemoriesBatchRequest(user_id=user_id, memories=[
+        BatchMemoryItem(memory="user prefers window seats!"),
+        BatchMemoryItem(memory="User is allergic to peanuts"),
+        BatchMemoryItem(memory="User is allergic to peanuts!"),
+    ]))
+
+    assert [result.status for result in response.results] == [action, "added", action]
+    assert response.results[0].memory_id == stored.memory_id
+    assert response.results[2].memory_id == response.results[1].memory_id
+    assert (response.added_count, response.duplicate_count, response.failed_count) == (1, 2, 0)
+    assert manager.get_collection_info(user_id)["document_count"] == 2
+
+
+def test_add_batch_reports_embedding_errors_per_item(manager, monkeypatch):
+    from memory_service import MemoryService
+    from memory_layout import MemoryLayout, PER_CONTACT_LAYOUT
+    from models import AddMemoriesBatchRequest, BatchMemoryItem
+
+    embed_texts = manager.embed_texts
+
+    def failing_embed(texts):
+        if any("poison" in text for text in texts):
+            raise RuntimeError("text rejected by the embedding service")
+        return embed_texts(texts)
+
+    monkeypatch.setattr(manager, "embed_texts", failing_embed)
+    service = MemoryService(None, manager, layout=MemoryLayout(PER_CONTACT_LAYOUT),
+                            user_cache=FakeUserCache(), dedup_mode="off")
+    user_id = "64b7f0c2a1b2c3d4e5f60718"
+
+    response = service.add_memories_batch(AddMemoriesBatchRequest(user_id=user_id, memories=[
+        BatchMemoryItem(memory="User prefers window seats"),
+        BatchMemoryItem(memory="poison pill"),
+        BatchMemoryItem(memory="User is allergic to peanuts"),
+    ]))
+
+    assert [result.status for result in response.results] == ["added", "failed", "added"]
+    assert "rejected" in response.results[1].error
+    assert manager.get_collection_info(user_id)["document_count"] == 2
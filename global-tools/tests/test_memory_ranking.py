@@ -0,0 +1,63 @@
+"""
+Memory search ranking: relevance combined with recency, memory type and contact affinity
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from memory_ranking import MemoryRanker, parse_type_weights
+from models import MemoryResponse
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+
+
+def memory(memory_id, distance, age_days, memory_type="user", contact_id=None):
+    metadata = {"memory_type": memory_type}
+    if contact_id:
+        metadata["contact_id"] = contact_id
+    return MemoryResponse(
+        id=memory_id, memory=memory_id, memory_type=memory_type, collection_name="c",
+        metadata=metadata, created_at=NOW - timedelta(days=age_days), distance=distance
+    )
+
+
+def ranked_ids(ranker, candidates, n_results=10, **kwargs):
+    return [m.id for m in ranker.rank(candidates, n_results, now=NOW, **kwargs)]
+
+
+def test_recent_memory_outranks_slightly_closer_stale_one():
+    ranker = MemoryRanker(enabled=True, recency_weight=0.3, half_life_days=30, contact_weight=0.2, type_weights={})
+    candidates = [memory("stale", 0.30, 400), memory("fresh", 0.32, 2), memory("far", 0.90, 1)]
+
+    assert ranked_ids(ranker, candidates, n_results=2) == ["fresh", "stale"]
+
+
+def test_focus_contact_and_type_weights():
+    ranker = MemoryRanker(enabled=True, recency_weight=0.0, half_life_days=30, contact_weight=0.6,
+                          type_weights={"contact": 0.9})
+
+    def candidates():
+        return [
+            memory("user", 0.20, 1),
+            memory("anna", 0.25, 1, "contact", "anna-id"),
+            memory("ken", 0.21, 1, "contact", "ken-id"),
+        ]
+
+    assert ranked_ids(ranker, candidates(), contact_id="anna-id")[0] == "anna"
+    # Without a focus contact the contact share goes back to relevance
+    assert ranked_ids(ranker, candidates()) == ["user", "ken", "anna"]
+
+
+def test_disabled_ranker_keeps_retrieval_order():
+    candidates = [memory("a", 0.5, 300), memory("b", 0.1, 1)]
+
+    assert ranked_ids(MemoryRanker(enabled=False), candidates, n_results=1) == ["a"]
+
+
+def test_invalid_configuration_is_rejected():
+    assert parse_type_weights("user:1.0, contact:0.8") == {"user": 1.0, "contact": 0.8}
+    with pytest.raises(ValueError):
+        parse_type_weights("user=1")
+    with pytest.raises(ValueError):
+        MemoryRanker(recency_weight=0.7, contact_weight=0.5)
@@ -0,0 +1,275 @@
+"""
+Request coalescing: N concurrent identical requests make one upstream call
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fastapi import HTTPException
+
+from single_flight import SingleFlight, AsyncSingleFlight
+from search_cache import SearchResultCache
+from search_fanout import FanoutResult
+from models import SearchMemoryRequest
+from tests.conftest import FakeUserCache
+
+CONCURRENCY = 10
+USER_ID = "64b7f0c2a1b2c3d4e5f60718"
+
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for concurrent callers"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, call, release: threading.Event):
+    """Start CONCURRENCY calls, release the upstream once all but the leader are waiting"""
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        futures = [pool.submit(call) for _ in range(CONCURRENCY)]
+        wait_until(lambda: flight.get_stats()["shared"] == CONCURRENCY - 1)
+        release.set()
+        return [future.result() for future in futures]
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_upstream_call(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def upstream():
+            calls.append(1)
+            release.wait(5)
+            return "result"
+
+        results = run_concurrently(flight, lambda: flight.do("key", upstream), release)
+
+        assert len(calls) == 1
+        assert results == ["result"] * CONCURRENCY
+        assert flight.get_stats() == {"calls": 1, "shared": CONCURRENCY - 1, "in_flight": 0}
+
+    def test_errors_are_shared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def upstream():
+            release.wait(5)
+            raise ValueError("upstream failed")
+
+        def call():
+            try:
+                flight.do("key", upstream)
+            except ValueError as e:
+                return str(e)
+
+        assert run_concurrently(flight, call, release) == ["upstream failed"] * CONCURRENCY
+        assert flight.get_stats()["calls"] == 1
+
+    def test_sequential_and_distinct_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        assert [flight.do("a", lambda: 1), flight.do("a", lambda: 2), flight.do("b", lambda: 3)] == [1, 2, 3]
+        assert flight.get_stats()["shared"] == 0
+
+    def test_interrupted_leader_lets_a_follower_lead(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def interrupted():
+            started.set()
+            release.wait(5)
+            raise KeyboardInterrupt
+
+        def leader():
+            try:
+                flight.do("key", interrupted)
+            except KeyboardInterrupt:
+                return "interrupted"
+
+        def upstream():
+            calls.append(1)
+            return "result"
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(leader)
+            started.wait(5)
+            second = pool.submit(flight.do, "key", upstream)
+            wait_until(lambda: flight.get_stats()["shared"] == 1)
+            release.set()
+            assert first.result() == "interrupted"
+            assert second.result() == "result"
+        assert calls == [1]
+
+
+class TestAsyncSingleFlight:
+    def test_concurrent_tasks_share_one_upstream_call(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(*(flight.do("key", upstream) for _ in range(CONCURRENCY)))
+
+        assert asyncio.run(main()) == ["result"] * CONCURRENCY
+        assert len(calls) == 1
+        assert flight.get_stats() == {"calls": 1, "shared": CONCURRENCY - 1, "in_flight": 0}
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def main():
+            leader = asyncio.ensure_future(flight.do("key", upstream))
+            await asyncio.sleep(0)
+            followers = [asyncio.ensure_future(flight.do("key", upstream)) for _ in range(CONCURRENCY - 1)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await asyncio.gather(*followers), leader.cancelled()
+
+        results, leader_cancelled = asyncio.run(main())
+        assert leader_cancelled
+        assert results == ["result"] * (CONCURRENCY - 1)
+        assert len(calls) == 1
+
+
+class FakeTavilyClient:
+    def __init__(self, release: threading.Event):
+        self.release = release
+        self.calls = 0
+
+    def get_search_context(self, query, search_depth, max_tokens):
+        self.calls += 1
+        self.release.wait(5)
+        return f"context for {query}"
+
+
+class FakeAsyncTavilyClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_search_context(self, query, search_depth, max_tokens):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return f"context for {query}"
+
+
+@pytest.fixture
+def search_service(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "test-key")
+    from search_service import SearchService
+
+    # A disabled result cache isolates coalescing from caching
+    return SearchService(cache=SearchResultCache(ttl_seconds=0))
+
+
+class TestSearchCoalescing:
+    def test_sync_search(self, search_service):
+        release = threading.Event()
+        search_service.client = FakeTavilyClient(release)
+
+        # Differently formatted spellings of the same query share one call
+        queries = iter(["Weather in Lisbon", "weather in lisbon?", "  WEATHER in Lisbon "] * CONCURRENCY)
+        responses = run_concurrently(
+            search_service.single_flight, lambda: search_service.search(next(queries)), release
+        )
+
+        assert search_service.client.calls == 1
+        assert len({response.context for response in responses}) == 1
+
+    def test_async_search(self, search_service):
+        search_service.async_client = FakeAsyncTavilyClient()
+
+        async def main():
+            return await asyncio.gather(
+                *(search_service.search_async("weather in lisbon") for _ in range(CONCURRENCY))
+            )
+
+        responses = asyncio.run(main())
+
+        assert search_service.async_client.calls == 1
+        assert len(responses) == CONCURRENCY
+        assert search_service.get_coalescing_stats()["shared"] == CONCURRENCY - 1
+
+    def test_failures_are_shared(self, search_service):
+        class FailingClient(FakeTavilyClient):
+            def get_search_context(self, *args, **kwargs):
+                super().get_search_context(*args, **kwargs)
+                raise RuntimeError("rate limited")
+
+        release = threading.Event()
+        search_service.client = FailingClient(release)
+
+        def call():
+            try:
+                search_service.search("weather in lisbon")
+            except HTTPException as e:
+                return e.status_code
+
+        assert run_concurrently(search_service.single_flight, call, release) == [500] * CONCURRENCY
+        assert search_service.client.calls == 1
+
+
+class FakeFanout:
+    def __init__(self, release: threading.Event):
+        self.release = release
+        self.calls = 0
+
+    def query(self, collection_names, query_text, n_results, include, where=None):
+        self.calls += 1
+        self.release.wait(5)
+        fanout = FanoutResult()
+        fanout.results = [(name, {"results": {
+            "ids": [[f"{name}-memory"]],
+            "documents": [[f"memory about {query_text}"]],
+            "metadatas": [[{"memory_type": "user", "user_id": USER_ID}]],
+            "distances": [[0.1]]
+        }}) for name in collection_names]
+        return fanout
+
+
+def make_memory_service(release: threading.Event):
+    from memory_service import MemoryService
+    from memory_layout import MemoryLayout, PER_CONTACT_LAYOUT
+
+    service = MemoryService(db_manager=None, chroma_manager=None,
+                            layout=MemoryLayout(PER_CONTACT_LAYOUT), user_cache=FakeUserCache())
+    service.fanout = FakeFanout(release)
+    return service
+
+
+class TestMemorySearchCoalescing:
+    def test_concurrent_identical_searches(self):
+        release = threading.Event()
+        service = make_memory_service(release)
+        request = SearchMemoryRequest(user_id=USER_ID, query="favourite restaurant", n_results=5)
+
+        responses = run_concurrently(service.search_flight, lambda: service.search_memories(request), release)
+
+        assert service.fanout.calls == 1
+        assert all(response.total_results == 1 for response in responses)
+        assert service.get_coalescing_stats()["shared"] == CONCURRENCY - 1
+
+    def test_different_users_are_not_coalesced(self):
+        release = threading.Event()
+        release.set()
+        service = make_memory_service(release)
+
+        for user_id in (USER_ID, "64b7f0c2a1b2c3d4e5f60719"):
+            service.search_memories(SearchMemoryRequest(user_id=user_id, query="favourite restaurant"))
+
+        assert service.fanout.calls == 2
@@ -0,0 +1,109 @@
+"""
+Status update cursors: updates committed after later-stamped ones are still read
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from models import ReadStatusUpdatesRequest
+from status_events import StatusEventBus
+from status_service import StatusService, MAX_CURSOR_SEEN
+
+
+class FakeDBManager:
+    def __init__(self):
+        self.status_updates = mongomock.MongoClient().db.Status_updates
+
+    def is_connected(self):
+        return True
+
+
+@pytest.fixture
+def db_manager():
+    return FakeDBManager()
+
+
+@pytest.fixture
+def service(db_manager, monkeypatch):
+    monkeypatch.delenv("STATUS_WRITE_BUFFER", raising=False)
+    monkeypatch.setenv("STATUS_READ_SETTLE_MS", "5000")
+    return StatusService(db_manager, StatusEventBus())
+
+
+def insert(db_manager, status_update_id, timestamp):
+    db_manager.status_updates.insert_one({
+        "_id": status_update_id, "agent_id": "agent-1", "agent_type": "assistant",
+        "conversation_id": "conv-1", "update": status_update_id, "timestamp": timestamp
+    })
+
+
+def read(service, cursor=None, limit=None):
+    response = service.read_status_updates(
+        ReadStatusUpdatesRequest(conversation_id="conv-1", cursor=cursor, limit=limit)
+    )
+    return [update.id for update in response.status_updates], response
+
+
+def test_late_commit_inside_settle_window_is_read_once(service, db_manager):
+    now = datetime.utcnow()
+    insert(db_manager, "b", now - timedelta(milliseconds=100))
+    ids, first = read(service)
+    assert ids == ["b"]
+
+    # Stamped before "b" but committed after the read
+    insert(db_manager, "a", now - timedelta(milliseconds=200))
+    ids, second = read(service, first.next_cursor)
+    assert ids == ["a"]
+
+    ids, third = read(service, second.next_cursor)
+    assert ids == []
+
+
+def test_settled_updates_move_the_horizon(service, db_manager):
+    old = datetime.utcnow() - timedelta(minutes=5)
+    for i in range(5):
+        insert(db_manager, f"old-{i}", old + timedelta(seconds=i))
+
+    ids, page = read(service, limit=3)
+    assert ids == ["old-0", "old-1", "old-2"] and page.has_more
+    ids, page = read(service, page.next_cursor, limit=3)
+    assert ids == ["old-3", "old-4"] and not page.has_more
+
+    # Nothing is carried for updates older than the settle window
+    assert len(page.next_cursor) < 40
+
+
+def test_cursor_size_is_bounded(service, db_manager):
+    now = datetime.utcnow()
+    for i in range(MAX_CURSOR_SEEN + 50):
+        insert(db_manager, f"burst-{i:04d}", now - timedelta(microseconds=i))
+
+    ids, page = read(service)
+    assert len(ids) == MAX_CURSOR_SEEN + 50
+    ids, _ = read(service, page.next_cursor)
+    assert ids == []
+
+
+def test_stream_picks_up_writes_from_other_instances(service, db_manager):
+    import asyncio
+
+    service.stream_poll_seconds = 0.01
+    insert(db_manager, "before", datetime.utcnow() - timedelta(seconds=1))
+
+    async def first_event():
+        request = ReadStatusUpdatesRequest(conversation_id="conv-1", since=datetime.utcnow())
+        events = await service.open_status_stream(request)
+        # Written through another instance: stored in MongoDB, never published on this bus
+        insert(db_manager, "elsewhere", datetime.utcnow() + timedelta(milliseconds=10))
+        try:
+            async for event in events:
+                if not event.startswith(":"):
+                    return event
+        finally:
+            await events.aclose()
+
+    event = asyncio.run(asyncio.wait_for(first_event(), timeout=5))
+    assert '"id": "elsewhere"' in event
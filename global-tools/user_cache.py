@@ -0,0 +1,273 @@
+"""
+Read-through cache of user documents and their contact indexes
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+from bson import ObjectId
+
+import request_metrics
+from contact_store import ContactStore, COLLECTION_STORAGE
+
+logger = logging.getLogger(__name__)
+
+
+class _CachedUser:
+    """A user document plus contact indexes built once per load"""
+
+    def __init__(self, document: Dict[str, Any], expires_at: float):
+        self.document = document
+        self.expires_at = expires_at
+        self.contacts_by_uid: Dict[str, Dict[str, Any]] = {}
+        self.contacts_by_email: Dict[str, List[Dict[str, Any]]] = {}
+        self.uid = document.get("uid")
+        self.external_contacts = document.get("contacts_storage") == COLLECTION_STORAGE
+
+        for contact in document.get("Contacts") or []:
+            if contact.get("uid"):
+                self.contacts_by_uid[contact["uid"]] = contact
+            if contact.get("email"):
+                self.contacts_by_email.setdefault(contact["email"], []).append(contact)
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """All cache keys this document is reachable under"""
+        keys = [("_id", str(self.document["_id"]))] if self.document.get("_id") is not None else []
+        if self.document.get("uid"):
+            keys.append(("uid", str(self.document["uid"])))
+        return keys
+
+
+class UserCache:
+    """
+    In-process read-through cache of `Users` documents, shared by the services.
+
+    Users can be looked up by `uid` or by `_id`; both keys point at the same
+    entry. Contacts are indexed by uid and by email when a document is loaded.
+    Entries expire after a TTL, are evicted LRU beyond `max_size`, and are
+    invalidated explicitly after contact writes. With change streams enabled,
+    writes made by other instances invalidate entries too.
+
+    Users whose contacts were moved to the Contacts collection have no array
+    to index; their contact lookups go to the indexed collection instead.
+    A contact lookup that misses on a cached entry reloads the user once before
+    answering, so only found contacts are ever served from a stale entry.
+
+    Returned documents are shared and must not be mutated by callers.
+    """
+
+    def __init__(self, db_manager, max_size: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None,
+                 contact_store: Optional[ContactStore] = None):
+        self.db_manager = db_manager
+        self.contact_store = contact_store or ContactStore(db_manager)
+        self.max_size = max_size if max_size is not None else int(os.getenv("USER_CACHE_MAX_SIZE", "1000"))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+        self._entries: "OrderedDict[Tuple[str, str], _CachedUser]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        # Bumped on every invalidation so a load racing with a write is not cached
+        self._generation = 0
+        self._watch_thread: Optional[threading.Thread] = None
+        self._watch_stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get_user(self, user_id: str, by: str = "uid") -> Optional[Dict[str, Any]]:
+        """
+        Get a user document, loading it from MongoDB on a miss.
+
+        Args:
+            user_id: The user's uid or MongoDB _id
+            by: "uid" or "_id"
+
+        Returns:
+            The user document or None if the user does not exist
+        """
+        entry = self._get_entry(user_id, by)
+        return entry.document if entry else None
+
+    def get_contact(self, user_id: str, contact_uid: str, by: str = "uid") -> Optional[Dict[str, Any]]:
+        """Get one of the user's contacts by contact uid"""
+        def lookup(entry: _CachedUser) -> Optional[Dict[str, Any]]:
+            if entry.external_contacts:
+                return self.contact_store.get_contact(entry.uid, contact_uid, COLLECTION_STORAGE)
+            return entry.contacts_by_uid.get(contact_uid)
+
+        return self._find_contacts(user_id, by, lookup)
+
+    def get_contacts(self, user_id: str, by: str = "uid") -> List[Dict[str, Any]]:
+        """Get all of the user's contacts"""
+        entry = self._get_entry(user_id, by)
+        if entry is None:
+            return []
+        if entry.external_contacts:
+            return self.contact_store.list_contacts(entry.uid, COLLECTION_STORAGE) or []
+        return list(entry.contacts_by_uid.values())
+
+    def get_contacts_by_email(self, user_id: str, email: str, by: str = "uid") -> List[Dict[str, Any]]:
+        """Get the user's contacts with the given email address"""
+        def lookup(entry: _CachedUser) -> List[Dict[str, Any]]:
+            if entry.external_contacts:
+                return self.contact_store.find_contacts_by_email(entry.uid, email, COLLECTION_STORAGE)
+            return list(entry.contacts_by_email.get(email, []))
+
+        return self._find_contacts(user_id, by, lookup) or []
+
+    def get_contact_by_email(self, user_id: str, email: str, by: str = "uid") -> Optional[Dict[str, Any]]:
+        """Get the user's first contact with the given email address"""
+        contacts = self.get_contacts_by_email(user_id, email, by)
+        return contacts[0] if contacts else None
+
+    def invalidate(self, user_id: str):
+        """Drop a user from the cache (by uid or _id)"""
+        with self._lock:
+            for key in (("uid", user_id), ("_id", user_id)):
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                for alias in entry.keys():
+                    self._entries.pop(alias, None)
+                self._stats["invalidations"] += 1
+            self._generation += 1
+
+    def clear(self):
+        """Drop every cached user"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rate and size of the cache"""
+        with self._lock:
+            stats = dict(self._stats)
+            users = len({id(entry) for entry in self._entries.values()})
+
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+            "cached_users": users,
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "change_streams": self._watch_thread is not None and self._watch_thread.is_alive()
+        }
+
+    def _find_contacts(self, user_id: str, by: str, lookup: Callable[[_CachedUser], Any]) -> Any:
+        """
+        Run a contact lookup against the user's entry, rechecking a miss.
+
+        A contact added through another instance is missing from entries cached
+        before it, so an empty answer from a cached entry is only trusted after
+        the user has been reloaded from MongoDB.
+        """
+        entry, cached = self._lookup_entry(user_id, by)
+        if entry is None:
+            return None
+        result = lookup(entry)
+        if not result and cached:
+            self.invalidate(user_id)
+            entry, _ = self._lookup_entry(user_id, by)
+            result = lookup(entry) if entry else None
+        return result
+
+    def _get_entry(self, user_id: str, by: str) -> Optional[_CachedUser]:
+        """Return a fresh cache entry, loading the document on a miss"""
+        return self._lookup_entry(user_id, by)[0]
+
+    def _lookup_entry(self, user_id: str, by: str) -> Tuple[Optional[_CachedUser], bool]:
+        """The entry for a user and whether it was served from the cache rather than loaded"""
+        key = (by, user_id)
+        generation = None
+        if self.enabled:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and time.monotonic() < entry.expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    request_metrics.increment("user_cache_hits")
+                    return entry, True
+                if entry is not None:
+                    for alias in entry.keys():
+                        self._entries.pop(alias, None)
+                self._stats["misses"] += 1
+                generation = self._generation
+
+        request_metrics.increment("user_cache_misses")
+        document = self._load(user_id, by)
+        if document is None:
+            return None, False
+
+        entry = _CachedUser(document, time.monotonic() + self.ttl_seconds)
+        if self.enabled:
+            with self._lock:
+                if generation != self._generation:
+                    # Invalidated while loading; serve the document but do not cache it
+                    return entry, False
+                for alias in entry.keys():
+                    self._entries[alias] = entry
+                    self._entries.move_to_end(alias)
+                # Each user is reachable under up to two keys
+                while len(self._entries) > self.max_size * 2:
+                    _, evicted = self._entries.popitem(last=False)
+                    for alias in evicted.keys():
+                        self._entries.pop(alias, None)
+        return entry, False
+
+    def _load(self, user_id: str, by: str) -> Optional[Dict[str, Any]]:
+        """Fetch a user document from MongoDB"""
+        if by == "_id":
+            if not ObjectId.is_valid(user_id):
+                return None
+            return self.db_manager.users.find_one({"_id": ObjectId(user_id)})
+        return self.db_manager.users.find_one({"uid": user_id})
+
+    def start_change_stream(self):
+        """Invalidate entries on writes from any instance using a MongoDB change stream"""
+        if self._watch_thread is not None and self._watch_thread.is_alive():
+            return
+
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop, name="user-cache-change-stream", daemon=True
+        )
+        self._watch_thread.start()
+
+    def stop_change_stream(self):
+        """Stop the change stream thread"""
+        self._watch_stop.set()
+
+    def _watch_loop(self):
+        """Follow the Users change stream, reconnecting with backoff on errors"""
+        backoff = 1.0
+        resume_token = None
+        while not self._watch_stop.is_set():
+            try:
+                users = self.db_manager.users
+                if users is None:
+                    raise RuntimeError("Users collection not available")
+
+                with users.watch(resume_after=resume_token, max_await_time_ms=1000) as stream:
+                    logger.info("User cache following Users change stream")
+                    backoff = 1.0
+                    while not self._watch_stop.is_set() and stream.alive:
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        resume_token = stream.resume_token
+                        document_key = change.get("documentKey", {}).get("_id")
+                        if document_key is not None:
+                            self.invalidate(str(document_key))
+                        else:
+                            self.clear()
+            except Exception as e:
+                logger.warning(f"User cache change stream error, retrying in {backoff:.0f}s: {e}")
+                if self._watch_stop.wait(backoff):
+                    return
+                backoff = min(backoff * 2, 60.0)
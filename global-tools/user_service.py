@@ -1,12 +1,16 @@
 """
 User service for handling user-related business logic
 """
+from typing import Optional
 from fastapi import HTTPException
 from bson import ObjectId
 
+from user_cache import UserCache
+
 class UserService:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, user_cache: Optional[UserCache] = None):
         self.db_manager = db_manager
+        self.user_cache = user_cache or UserCache(db_manager)
 
     def get_user_by_id(self, user_id: str):
         """Get a single user by their MongoDB _id"""
@@ -22,7 +26,7 @@ class UserService:
                     }
                 )
             
-            user = self.db_manager.users.find_one({"_id": ObjectId(user_id)})
+            user = self.user_cache.get_user(user_id, by="_id")
             
             if not user:
                 raise HTTPException(
@@ -34,7 +38,8 @@ class UserService:
                     }
                 )
             
-            # Convert ObjectId to string for JSON serialization
+            # Convert ObjectId to string for JSON serialization (on a copy; the cached document is shared)
+            user = dict(user)
             user["_id"] = str(user["_id"])
             return user
 
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Throughput of concurrent flight searches: blocking SerpApiClient vs the async client
+
+- blocking: what the tools did before. Each async tool call runs
+            SerpApiClient(...).get_dict(), which blocks the event loop, so the
+            searches run one after another.
+- async:    AsyncSerpApiClient over a shared httpx connection pool, limited per
+            engine by SERP_MAX_CONCURRENCY / --concurrency.
+
+By default the searches go to a local stand-in for SerpApi that answers after
+--latency-ms, so the benchmark costs no API credits. Pass --live to hit
+serpapi.com with SERPAPI_API_KEY (one search credit per request and mode).
+
+Examples:
+    python benchmark_concurrency.py
+    python benchmark_concurrency.py --requests 50 --latency-ms 1500 --concurrency 20
+    python benchmark_concurrency.py --live --requests 10
+"""
+
+import os
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from serpapi import SerpApiClient as SerpApiSearch
+
+from serp_client import AsyncSerpApiClient, DEFAULT_BASE_URL
+
+
+class FakeSerpApiHandler(BaseHTTPRequestHandler):
+    """Answers GET /search with a small Google Flights response after a fixed delay"""
+
+    latency_seconds = 1.0
+
+    def do_GET(self):
+        time.sleep(self.latency_seconds)
+        body = json.dumps({
+            "search_metadata": {"status": "Success"},
+            "best_flights": [{"price": 420, "flights": [{"departure_airport": {"id": "LHR"},
+                                                         "arrival_airport": {"id": "FCO"}}]}]
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeSerpApiServer(ThreadingHTTPServer):
+    # Accept a burst of concurrent connections without dropping SYNs
+    request_queue_size = 128
+    daemon_threads = True
+
+
+def start_fake_serpapi(latency_ms: int) -> FakeSerpApiServer:
+    FakeSerpApiHandler.latency_seconds = latency_ms / 1000
+    server = FakeSerpApiServer(("127.0.0.1", 0), FakeSerpApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def flight_params(i: int) -> Dict[str, Any]:
+    """Distinct one-way searches so no two requests are identical"""
+    return {
+        "engine": "google_flights",
+        "departure_id": "LHR",
+        "arrival_id": "FCO",
+        "outbound_date": (date.today() + timedelta(days=30 + i)).isoformat(),
+        "type": 2,
+        "currency": "USD"
+    }
+
+
+async def run_blocking(base_url: str, api_key: str, requests: int) -> List[float]:
+    async def search(i):
+        started = time.perf_counter()
+        client = SerpApiSearch({"api_key": api_key, **flight_params(i)})
+        client.BACKEND = base_url
+        client.get_dict()
+        return (time.perf_counter() - started) * 1000
+
+    return await asyncio.gather(*(search(i) for i in range(requests)))
+
+
+async def run_async(base_url: str, api_key: str, requests: int, concurrency: int) -> List[float]:
+    client = AsyncSerpApiClient(api_key=api_key, base_url=base_url, default_concurrency=concurrency)
+
+    async def search(i):
+        started = time.perf_counter()
+        await client.search(flight_params(i))
+        return (time.perf_counter() - started) * 1000
+
+    try:
+        return await asyncio.gather(*(search(i) for i in range(requests)))
+    finally:
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SerpApi concurrent flight search benchmark")
+    parser.add_argument("--requests", type=int, default=50, help="Concurrent flight searches per mode")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("SERP_MAX_CONCURRENCY", "10")),
+                        help="Async requests in flight for the engine")
+    parser.add_argument("--latency-ms", type=int, default=1000, help="Response time of the local stand-in")
+    parser.add_argument("--live", action="store_true", help="Query serpapi.com instead of the local stand-in")
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.live:
+        base_url, api_key = DEFAULT_BASE_URL, os.getenv("SERPAPI_API_KEY")
+        if not api_key:
+            raise SystemExit("SERPAPI_API_KEY is required with --live")
+        target = "serpapi.com"
+    else:
+        server = start_fake_serpapi(args.latency_ms)
+        base_url, api_key = f"http://127.0.0.1:{server.server_address[1]}", "benchmark"
+        target = f"local stand-in answering in {args.latency_ms} ms"
+
+    print("🚀 SerpApi Concurrency Benchmark")
+    print("=" * 50)
+    print(f"✈️  {args.requests} concurrent flight searches against {target}, async concurrency {args.concurrency}")
+
+    print(f"\n{'mode':>10} {'total s':>10} {'req/s':>10} {'p50 ms':>10} {'max ms':>10}")
+    for mode in ("blocking", "async"):
+        started = time.perf_counter()
+        if mode == "blocking":
+            latencies = asyncio.run(run_blocking(base_url, api_key, args.requests))
+        else:
+            latencies = asyncio.run(run_async(base_url, api_key, args.requests, args.concurrency))
+        total = time.perf_counter() - started
+        print(f"{mode:>10} {total:>10.2f} {args.requests / total:>10.1f} "
+              f"{statistics.median(latencies):>10.0f} {max(latencies):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Response size of the flights and hotels tools: raw SerpApi objects vs compact records
+
+Sizes are of the JSON the tool returns, which is what ends up in the agent's
+ToolMessage and is resent to the LLM on every later iteration. Tokens are
+estimated at 4 bytes per token.
+
+By default the responses are the JSON examples of docs/serp-flights-api.md and
+docs/serp-hotels-api.md, with their results repeated up to --flights and
+--hotels entries to match the size of a real results page. Pass --flights-json
+or --hotels-json with a saved SerpApi response to measure that instead.
+
+Examples:
+    python benchmark_projection.py
+    python benchmark_projection.py --flights-json lhr_fco.json --hotels-json rome.json
+"""
+
+import os
+import re
+import json
+import argparse
+from typing import Any, Dict, List
+
+from projection import compact_flights, compact_hotels
+
+DOCS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "docs")
+
+
+def load_docs_example(filename: str) -> Dict[str, Any]:
+    """First "JSON Example" block of an API doc, with its "..." elisions removed"""
+    lines = open(os.path.join(DOCS, filename)).read().split("\n")
+    start = lines.index("JSON Example") + 2
+    end = lines.index("}", start) + 1
+    kept = [line for line in lines[start:end] if line.strip() not in ("...", "...,")]
+    return json.loads(re.sub(r",(\s*[\]}])", r"\1", "\n".join(kept)))
+
+
+def repeat(items: List[Any], count: int) -> List[Any]:
+    return [items[i % len(items)] for i in range(count)] if items else []
+
+
+def size(value: Any) -> int:
+    return len(json.dumps(value).encode())
+
+
+def report(name: str, raw: Dict[str, Any], compact: Dict[str, Any], narrowed: Dict[str, Any],
+           narrowed_label: str):
+    raw_bytes = size(raw)
+    print(f"\n{name}")
+    print(f"{'output':>28} {'bytes':>10} {'~tokens':>10} {'reduction':>10}")
+    for label, output in (("raw", raw), ("compact (default)", compact), (narrowed_label, narrowed)):
+        output_bytes = size(output)
+        print(f"{label:>28} {output_bytes:>10} {output_bytes // 4:>10} {raw_bytes / output_bytes:>9.1f}x")
+
+
+FLIGHT_SUMMARY = ["price", "airlines", "departure_time", "arrival_time", "total_duration", "stops", "booking_token"]
+HOTEL_SUMMARY = ["name", "price_per_night", "overall_rating", "hotel_class", "property_token"]
+
+
+def flights_outputs(data: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    raw = {"flights": data.get("best_flights", []) + data.get("other_flights", []),
+           "search_metadata": data.get("search_metadata", {}),
+           "search_parameters": data.get("search_parameters", {})}
+    return [raw, compact_flights(data, None, limit, {}), compact_flights(data, FLIGHT_SUMMARY, 5, {})]
+
+
+def hotels_outputs(data: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    raw = {key: data.get(key, default) for key, default in (
+        ("properties", []), ("ads", []), ("brands", []), ("search_metadata", {}),
+        ("search_parameters", {}), ("serpapi_pagination", {}))}
+    return [raw, compact_hotels(data, None, limit, {}), compact_hotels(data, HOTEL_SUMMARY, 5, {})]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flights/hotels projection size benchmark")
+    parser.add_argument("--flights-json", help="Saved google_flights response")
+    parser.add_argument("--hotels-json", help="Saved google_hotels response")
+    parser.add_argument("--flights", type=int, default=80, help="Flights per docs-based response")
+    parser.add_argument("--hotels", type=int, default=20, help="Properties per docs-based response")
+    parser.add_argument("--limit", type=int, default=int(os.getenv("SERP_RESULTS_LIMIT", "10")),
+                        help="Default number of records returned")
+    args = parser.parse_args()
+
+    if args.flights_json:
+        flights_data = json.load(open(args.flights_json))
+    else:
+        flights_data = load_docs_example("serp-flights-api.md")
+        flights_data["other_flights"] = repeat(flights_data.get("best_flights", []) + flights_data.get("other_flights", []),
+                                               args.flights - len(flights_data.get("best_flights", [])))
+    if args.hotels_json:
+        hotels_data = json.load(open(args.hotels_json))
+    else:
+        hotels_data = load_docs_example("serp-hotels-api.md")
+        hotels_data["properties"] = repeat(hotels_data.get("properties", []), args.hotels)
+
+    print("🚀 SerpApi Projection Benchmark")
+    print("=" * 50)
+    report(f"✈️  flights ({len(flights_data.get('best_flights', []) + flights_data.get('other_flights', []))} results)",
+           *flights_outputs(flights_data, args.limit), "fields=7, limit=5")
+    report(f"🏨 hotels ({len(hotels_data.get('properties', []))} results)",
+           *hotels_outputs(hotels_data, args.limit), "fields=5, limit=5")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Fan-out of Google Flights searches over routes and flexible dates.
+
+A trip planner comparing +/-3 days on two routes would otherwise make close to
+a hundred sequential `flights` calls. The grid builds every (origin,
+destination, outbound date, return date) combination, runs the searches
+concurrently under a limit and reduces each response to its cheapest price,
+keeping only the overall best itineraries in full.
+"""
+
+import asyncio
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from projection import project_flight
+
+
+def flexible_dates(center: str, flex_days: int, earliest: Optional[date] = None) -> List[str]:
+    """center +/- flex_days as YYYY-MM-DD, dropping dates before earliest"""
+    day = date.fromisoformat(center)
+    dates = [day + timedelta(days=offset) for offset in range(-flex_days, flex_days + 1)]
+    return [d.isoformat() for d in dates if earliest is None or d >= earliest]
+
+
+def build_queries(origins: List[str], destinations: List[str], outbound_date: str,
+                  return_date: Optional[str], flex_days: int, today: Optional[date] = None) -> List[Dict[str, str]]:
+    """
+    One query per route and date pair.
+
+    Routes pair every origin with every other destination; return dates before
+    the outbound date and outbound dates in the past are skipped.
+    """
+    today = today or date.today()
+    outbound_dates = flexible_dates(outbound_date, flex_days, today)
+    return_dates = flexible_dates(return_date, flex_days, today) if return_date else [None]
+
+    queries = []
+    for origin in origins:
+        for destination in destinations:
+            if origin.upper() == destination.upper():
+                continue
+            for outbound in outbound_dates:
+                for inbound in return_dates:
+                    if inbound is not None and inbound < outbound:
+                        continue
+                    query = {"departure_id": origin.upper(), "arrival_id": destination.upper(),
+                             "outbound_date": outbound}
+                    if inbound is not None:
+                        query["return_date"] = inbound
+                    queries.append(query)
+    return queries
+
+
+def cheapest_price(data: Dict[str, Any]) -> Optional[int]:
+    prices = [f["price"] for f in data.get("best_flights", []) + data.get("other_flights", [])
+              if isinstance(f.get("price"), (int, float))]
+    if prices:
+        return min(prices)
+    return data.get("price_insights", {}).get("lowest_price")
+
+
+async def run_grid(queries: List[Dict[str, str]], search: Callable[[Dict[str, str]], Awaitable[Dict[str, Any]]],
+                   concurrency: int, max_itineraries: int) -> Dict[str, Any]:
+    """
+    Run the queries concurrently and reduce them to a price grid.
+
+    Args:
+        queries: Output of build_queries, merged by search() with the shared parameters
+        search: Returns the SerpApi response for one query; exceptions are reported per cell
+        concurrency: Searches of this grid in flight at once
+        max_itineraries: Number of cheapest itineraries returned in full
+
+    Returns:
+        {"grid": [...], "cheapest": {...}, "best_itineraries": [...], "errors": [...]}
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(query):
+        async with semaphore:
+            try:
+                return query, await search(query), None
+            except Exception as e:
+                return query, None, e
+
+    grid, itineraries, errors = [], [], []
+    for query, data, error in await asyncio.gather(*(run(query) for query in queries)):
+        if error is None and data and "error" in data:
+            error = data["error"]
+        if error is not None:
+            errors.append({**query, "error": str(error)})
+            grid.append({**query, "price": None})
+            continue
+
+        grid.append({**query, "price": cheapest_price(data)})
+        for flight in data.get("best_flights", []) + data.get("other_flights", []):
+            if isinstance(flight.get("price"), (int, float)):
+                itineraries.append({**query, **project_flight(flight)})
+
+    priced = [cell for cell in grid if cell["price"] is not None]
+    itineraries.sort(key=lambda itinerary: (itinerary["price"], itinerary.get("total_duration") or 0))
+    return {
+        "grid": grid,
+        "cheapest": min(priced, key=lambda cell: cell["price"]) if priced else None,
+        "best_itineraries": itineraries[:max_itineraries],
+        "errors": errors
+    }
@@ -0,0 +1,158 @@
+"""
+Compact projections of Google Flights and Google Hotels results.
+
+Raw SerpApi responses carry logos, image galleries, review breakdowns, price
+histories and per-seller listings that an agent never reads but pays for in
+tokens on every later turn. The projections keep the fields needed to compare
+and book, flatten nested prices and carbon data, and can be narrowed further
+with a field selection and a top-N limit.
+"""
+
+from typing import Any, Dict, List, Optional, TypedDict
+
+
+class FlightLeg(TypedDict, total=False):
+    flight_number: str
+    from_airport: str
+    to_airport: str
+    departure_time: str
+    arrival_time: str
+    duration: int
+
+
+class FlightRecord(TypedDict, total=False):
+    price: int
+    airlines: List[str]
+    departure_time: str
+    arrival_time: str
+    total_duration: int
+    stops: int
+    layovers: List[Dict[str, Any]]
+    legs: List[FlightLeg]
+    carbon_kg: float
+    carbon_vs_typical_percent: int
+    departure_token: str
+    booking_token: str
+
+
+class HotelRecord(TypedDict, total=False):
+    name: str
+    type: str
+    price_per_night: float
+    total_price: float
+    overall_rating: float
+    reviews: int
+    hotel_class: int
+    location_rating: float
+    check_in_time: str
+    check_out_time: str
+    amenities: List[str]
+    free_cancellation: bool
+    gps_coordinates: Dict[str, float]
+    link: str
+    property_token: str
+
+
+FLIGHT_FIELDS = list(FlightRecord.__annotations__)
+HOTEL_FIELDS = list(HotelRecord.__annotations__)
+
+
+def _compact(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop fields SerpApi did not return"""
+    return {key: value for key, value in record.items() if value not in (None, [], {})}
+
+
+def project_flight(flight: Dict[str, Any]) -> FlightRecord:
+    """Compact record of one best_flights/other_flights entry"""
+    legs = flight.get("flights", [])
+    first, last = (legs[0], legs[-1]) if legs else ({}, {})
+    carbon = flight.get("carbon_emissions", {})
+    return _compact({
+        "price": flight.get("price"),
+        "airlines": list(dict.fromkeys(leg["airline"] for leg in legs if leg.get("airline"))),
+        "departure_time": first.get("departure_airport", {}).get("time"),
+        "arrival_time": last.get("arrival_airport", {}).get("time"),
+        "total_duration": flight.get("total_duration"),
+        "stops": max(len(legs) - 1, 0),
+        "layovers": [_compact({"airport": layover.get("id"), "duration": layover.get("duration"),
+                               "overnight": layover.get("overnight")})
+                     for layover in flight.get("layovers", [])],
+        "legs": [_compact({
+            "flight_number": leg.get("flight_number"),
+            "from_airport": leg.get("departure_airport", {}).get("id"),
+            "to_airport": leg.get("arrival_airport", {}).get("id"),
+            "departure_time": leg.get("departure_airport", {}).get("time"),
+            "arrival_time": leg.get("arrival_airport", {}).get("time"),
+            "duration": leg.get("duration")
+        }) for leg in legs],
+        "carbon_kg": round(carbon["this_flight"] / 1000, 1) if carbon.get("this_flight") else None,
+        "carbon_vs_typical_percent": carbon.get("difference_percent"),
+        "departure_token": flight.get("departure_token"),
+        "booking_token": flight.get("booking_token")
+    })
+
+
+def project_hotel(hotel: Dict[str, Any]) -> HotelRecord:
+    """Compact record of one properties entry"""
+    return _compact({
+        "name": hotel.get("name"),
+        "type": hotel.get("type"),
+        "price_per_night": hotel.get("rate_per_night", {}).get("extracted_lowest"),
+        "total_price": hotel.get("total_rate", {}).get("extracted_lowest"),
+        "overall_rating": hotel.get("overall_rating"),
+        "reviews": hotel.get("reviews"),
+        "hotel_class": hotel.get("extracted_hotel_class"),
+        "location_rating": hotel.get("location_rating"),
+        "check_in_time": hotel.get("check_in_time"),
+        "check_out_time": hotel.get("check_out_time"),
+        "amenities": hotel.get("amenities"),
+        "free_cancellation": hotel.get("free_cancellation"),
+        "gps_coordinates": hotel.get("gps_coordinates"),
+        "link": hotel.get("link"),
+        "property_token": hotel.get("property_token")
+    })
+
+
+def select(records: List[Dict[str, Any]], fields: Optional[List[str]], limit: Optional[int],
+           available: List[str]) -> List[Dict[str, Any]]:
+    """
+    The first limit records, reduced to the selected fields.
+
+    Raises:
+        ValueError: A selected field is not one of the available fields
+    """
+    if limit is not None:
+        records = records[:max(limit, 0)]
+    if not fields:
+        return records
+
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}, available fields are {available}")
+    return [{field: record[field] for field in fields if field in record} for record in records]
+
+
+def compact_flights(data: Dict[str, Any], fields: Optional[List[str]], limit: Optional[int],
+                    search_parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """flights tool output: the top flight records and the price summary"""
+    flights = (data.get("best_flights") or []) + (data.get("other_flights") or [])
+    price_insights = data.get("price_insights", {})
+    return {
+        "flights": select([project_flight(flight) for flight in flights], fields, limit, FLIGHT_FIELDS),
+        "total_results": len(flights),
+        "price_insights": {key: price_insights[key] for key in ("lowest_price", "price_level", "typical_price_range")
+                           if key in price_insights},
+        "search_parameters": data.get("search_parameters", search_parameters)
+    }
+
+
+def compact_hotels(data: Dict[str, Any], fields: Optional[List[str]], limit: Optional[int],
+                   search_parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """hotels tool output: the top property records and the next page token"""
+    properties = data.get("properties", [])
+    return {
+        "properties": select([project_hotel(hotel) for hotel in properties], fields, limit, HOTEL_FIELDS),
+        "total_results": len(properties),
+        "next_page_token": data.get("serpapi_pagination", {}).get("next_page_token"),
+        "search_parameters": data.get("search_parameters", search_parameters)
+    }
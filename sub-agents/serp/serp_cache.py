@@ -0,0 +1,296 @@
+"""
+Response cache for the SerpApi tools.
+
+Responses are keyed on the canonicalized request parameters (engine included,
+api_key excluded) and kept for a per-engine TTL: minutes for flight and hotel
+prices, days for map places. After the TTL an entry stays usable for a further
+stale window, during which it is served immediately while one background
+request refreshes it (stale-while-revalidate). Concurrent misses for the same
+key share a single upstream request.
+
+Backends:
+- "memory": in-process LRU (default)
+- "sqlite": local SQLite file, shared by workers and kept across restarts
+- "off":    no caching
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (ttl_seconds, stale_seconds) per SerpApi engine
+DEFAULT_POLICIES: Dict[str, Tuple[float, float]] = {
+    "google_flights": (900, 300),
+    "google_hotels": (1800, 600),
+    "google_maps": (7 * 86400, 86400),
+    "amazon": (3600, 1800),
+    "google": (3600, 1800),
+    "google_light": (3600, 1800),
+}
+DEFAULT_POLICY = (3600, 600)
+
+# Parameters whose values are case-insensitive upstream
+CASE_INSENSITIVE_PARAMS = {
+    "engine", "departure_id", "arrival_id", "currency", "gl", "hl",
+    "google_domain", "amazon_domain", "q", "k", "location"
+}
+EXCLUDED_PARAMS = {"api_key"}
+
+
+def canonical_params(params: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Parameters as SerpApi sees them: api_key and empty values dropped, keys
+    lowercased, values as trimmed strings (so 1 and "1" match), case folded
+    where case does not matter.
+    """
+    canonical = {}
+    for key, value in params.items():
+        key = str(key).strip().lower()
+        if key in EXCLUDED_PARAMS or value is None or value == "":
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        value = " ".join(str(value).split())
+        if key in CASE_INSENSITIVE_PARAMS:
+            value = value.lower()
+        canonical[key] = value
+    return dict(sorted(canonical.items()))
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(canonical_params(params), separators=(",", ":")).encode()).hexdigest()
+
+
+def parse_policies(value: str) -> Dict[str, Tuple[float, float]]:
+    """Parse "google_flights=600:120,google_maps=86400" (stale seconds optional)"""
+    policies = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        engine, _, times = entry.partition("=")
+        ttl, _, stale = times.partition(":")
+        try:
+            ttl_seconds = float(ttl)
+            stale_seconds = float(stale) if stale else DEFAULT_POLICIES.get(engine.strip(), DEFAULT_POLICY)[1]
+        except ValueError:
+            raise ValueError(f"Invalid SERP_CACHE_TTLS entry '{entry}', expected engine=ttl[:stale]")
+        policies[engine.strip().lower()] = (ttl_seconds, stale_seconds)
+    return policies
+
+
+class MemoryCacheBackend:
+    """In-process LRU of (value, stored_at) entries"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float):
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """SQLite table of JSON responses, least recently used rows evicted past max_size"""
+
+    def __init__(self, path: str, max_size: int):
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, stored_at: float):
+        encoded = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, stored_at, time.time())
+            )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_size,)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+class SerpResponseCache:
+    """Per-engine TTL cache with stale-while-revalidate in front of SerpApi"""
+
+    def __init__(self, backend: Optional[str] = None, path: Optional[str] = None,
+                 max_size: Optional[int] = None, policies: Optional[Dict[str, Tuple[float, float]]] = None):
+        """
+        Args:
+            backend: "memory", "sqlite" or "off" (env SERP_CACHE_BACKEND)
+            path: SQLite file of the sqlite backend (env SERP_CACHE_PATH)
+            max_size: Maximum number of cached responses (env SERP_CACHE_MAX_SIZE)
+            policies: (ttl, stale) seconds per engine, merged over the defaults
+                (env SERP_CACHE_TTLS, e.g. "google_flights=600:120,google_maps=86400")
+        """
+        self.backend_name = (backend or os.getenv("SERP_CACHE_BACKEND", "memory")).strip().lower()
+        self.max_size = max_size or int(os.getenv("SERP_CACHE_MAX_SIZE", "2000"))
+        self.policies = {**DEFAULT_POLICIES, **(policies if policies is not None
+                                                else parse_policies(os.getenv("SERP_CACHE_TTLS", "")))}
+
+        if self.backend_name == "memory":
+            self.backend = MemoryCacheBackend(self.max_size)
+        elif self.backend_name == "sqlite":
+            self.backend = SQLiteCacheBackend(path or os.getenv("SERP_CACHE_PATH", "serp_cache.sqlite3"), self.max_size)
+        elif self.backend_name == "off":
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown SERP_CACHE_BACKEND '{self.backend_name}', expected 'memory', 'sqlite' or 'off'")
+
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._refreshing: set = set()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def policy(self, engine: str) -> Tuple[float, float]:
+        return self.policies.get(engine, DEFAULT_POLICY)
+
+    async def get_or_fetch(self, params: Dict[str, Any],
+                           fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Cached response for the parameters, or the result of fetch().
+
+        Args:
+            params: Request parameters including "engine"
+            fetch: Calls SerpApi; responses with an "error" key are not cached
+        """
+        engine = canonical_params(params).get("engine", "")
+        if self.backend is None:
+            return await fetch()
+
+        key = cache_key(params)
+        ttl, stale = self.policy(engine)
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                self._count(engine, "hits")
+                return value
+            if age < ttl + stale:
+                self._count(engine, "stale_hits")
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    asyncio.create_task(self._refresh(key, engine, fetch))
+                return value
+            self.backend.delete(key)
+
+        # Identical requests arriving while one is upstream wait for its response
+        if key in self._in_flight:
+            self._count(engine, "coalesced")
+            return await asyncio.shield(self._in_flight[key])
+
+        # The fetch runs as its own task, so cancelling the caller that started
+        # it (client timeout, MCP cancellation) does not strand the others
+        self._count(engine, "misses")
+        task = asyncio.create_task(self._fetch_and_store(key, fetch))
+        self._in_flight[key] = task
+        task.add_done_callback(lambda done: self._fetch_done(key, done))
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the exception retrieved when every caller has gone
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        value = await fetch()
+        if value and "error" not in value:
+            self.backend.set(key, value, time.time())
+        return value
+
+    async def _refresh(self, key: str, engine: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]):
+        try:
+            await self._fetch_and_store(key, fetch)
+            self._count(engine, "refreshes")
+        except Exception as e:
+            self._count(engine, "refresh_failures")
+            logger.warning(f"Background refresh of a cached {engine} response failed: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def _count(self, engine: str, counter: str):
+        engine_stats = self._stats.setdefault(engine or "unknown", {
+            "hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "refresh_failures": 0
+        })
+        engine_stats[counter] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rates overall and per engine; stale hits and coalesced requests count as hits"""
+        def with_hit_rate(stats: Dict[str, int]) -> Dict[str, Any]:
+            served = stats["hits"] + stats["stale_hits"] + stats["coalesced"]
+            lookups = served + stats["misses"]
+            return {**stats, "hit_rate": round(served / lookups, 4) if lookups else 0.0}
+
+        total = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "refresh_failures": 0}
+        for stats in self._stats.values():
+            for counter, count in stats.items():
+                total[counter] += count
+
+        return {
+            "backend": self.backend_name,
+            "size": self.backend.size() if self.backend else 0,
+            "max_size": self.max_size,
+            **with_hit_rate(total),
+            "engines": {
+                engine: {**with_hit_rate(stats), "ttl_seconds": self.policy(engine)[0],
+                         "stale_seconds": self.policy(engine)[1]}
+                for engine, stats in sorted(self._stats.items())
+            }
+        }
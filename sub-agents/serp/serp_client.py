@@ -0,0 +1,138 @@
+"""
+Non-blocking SerpApi client for the async MCP tools.
+
+serpapi.SerpApiClient issues a blocking requests.get, which stalls the server's
+event loop for the whole upstream round trip. This client sends the same
+GET /search request through one shared httpx.AsyncClient, so concurrent tool
+calls overlap and reuse pooled keep-alive connections. A semaphore per engine
+caps how many requests each engine has upstream at once; requests beyond the
+limit wait their turn instead of tripping SerpApi's rate limits.
+"""
+
+import os
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://serpapi.com"
+
+
+def parse_concurrency(value: str) -> Dict[str, int]:
+    """Parse "google_flights=10,google_maps=4" into {"google_flights": 10, "google_maps": 4}"""
+    limits = {}
+    for entry in value.split(","):
+        if not entry.strip():
+            continue
+        engine, _, limit = entry.partition("=")
+        try:
+            limits[engine.strip().lower()] = int(limit)
+        except ValueError:
+            raise ValueError(f"Invalid SERP_ENGINE_CONCURRENCY entry '{entry}', expected engine=limit")
+    return limits
+
+
+class AsyncSerpApiClient:
+    """Shared async HTTP client for SerpApi with per-engine concurrency limits"""
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: Optional[int] = None, default_concurrency: Optional[int] = None,
+                 engine_concurrency: Optional[Dict[str, int]] = None, timeout_seconds: Optional[float] = None):
+        """
+        Args:
+            api_key: SerpApi key (env SERPAPI_API_KEY)
+            base_url: SerpApi endpoint (env SERP_API_URL)
+            max_connections: Size of the shared connection pool (env SERP_HTTP_MAX_CONNECTIONS)
+            default_concurrency: Requests in flight per engine (env SERP_MAX_CONCURRENCY)
+            engine_concurrency: Limits for individual engines
+                (env SERP_ENGINE_CONCURRENCY, e.g. "google_flights=10,google_maps=4")
+            timeout_seconds: Timeout of one SerpApi request (env SERP_HTTP_TIMEOUT_SECONDS)
+        """
+        self.api_key = api_key or os.getenv("SERPAPI_API_KEY")
+        self.base_url = base_url or os.getenv("SERP_API_URL", DEFAULT_BASE_URL)
+        self.max_connections = max_connections or int(os.getenv("SERP_HTTP_MAX_CONNECTIONS", "50"))
+        self.default_concurrency = default_concurrency or int(os.getenv("SERP_MAX_CONCURRENCY", "10"))
+        self.engine_concurrency = (engine_concurrency if engine_concurrency is not None
+                                   else parse_concurrency(os.getenv("SERP_ENGINE_CONCURRENCY", "")))
+        self.timeout_seconds = timeout_seconds or float(os.getenv("SERP_HTTP_TIMEOUT_SECONDS", "60"))
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._waiting: Dict[str, int] = {}
+        self._requests = 0
+        self._errors = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the server's event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(self.timeout_seconds, connect=10.0),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self._client
+
+    def concurrency_limit(self, engine: str) -> int:
+        return self.engine_concurrency.get(engine, self.default_concurrency)
+
+    def _semaphore(self, engine: str) -> asyncio.Semaphore:
+        if engine not in self._semaphores:
+            self._semaphores[engine] = asyncio.Semaphore(self.concurrency_limit(engine))
+        return self._semaphores[engine]
+
+    async def search(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run a SerpApi search and return the JSON response.
+
+        Raises:
+            httpx.HTTPStatusError: SerpApi answered with an error status (401, 429, ...)
+            httpx.HTTPError: The request failed or timed out
+        """
+        engine = str(params.get("engine", "google")).lower()
+        query = {"api_key": self.api_key, "output": "json", **params}
+
+        semaphore = self._semaphore(engine)
+        self._waiting[engine] = self._waiting.get(engine, 0) + 1
+        try:
+            await semaphore.acquire()
+        finally:
+            # Also when the caller is cancelled while waiting for a slot
+            self._waiting[engine] -= 1
+
+        self._in_flight[engine] = self._in_flight.get(engine, 0) + 1
+        self._requests += 1
+        try:
+            response = await self._get_client().get("/search", params=query)
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight[engine] -= 1
+            semaphore.release()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self._requests,
+            "errors": self._errors,
+            "max_connections": self.max_connections,
+            "engines": {
+                engine: {
+                    "in_flight": self._in_flight.get(engine, 0),
+                    "waiting": self._waiting.get(engine, 0),
+                    "limit": self.concurrency_limit(engine)
+                }
+                for engine in sorted(self._semaphores)
+            }
+        }
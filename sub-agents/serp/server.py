@@ -1,9 +1,13 @@
 from fastmcp import FastMCP
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import os
+import json
 import httpx
 from dotenv import load_dotenv
-from serpapi import SerpApiClient as SerpApiSearch
+from serp_cache import SerpResponseCache
+from serp_client import AsyncSerpApiClient
+from flight_grid import build_queries, run_grid
+from projection import compact_flights, compact_hotels
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,9 +17,40 @@ API_KEY = os.getenv("SERPAPI_API_KEY")
 if not API_KEY:
     raise ValueError("SERPAPI_API_KEY not found in environment variables. Please set it in the .env file.")
 
+# Records returned by flights and hotels unless the caller passes limit
+RESULTS_LIMIT = int(os.getenv("SERP_RESULTS_LIMIT", "10"))
+
+# Limits of the flight_grid fan-out
+GRID_MAX_QUERIES = int(os.getenv("SERP_GRID_MAX_QUERIES", "100"))
+GRID_CONCURRENCY = int(os.getenv("SERP_GRID_CONCURRENCY", "5"))
+
 # Initialize the MCP server
 mcp = FastMCP("SerpApi MCP Server")
 
+# Cache of SerpApi responses, configured by SERP_CACHE_* environment variables
+cache = SerpResponseCache()
+
+# Shared non-blocking SerpApi client, configured by SERP_HTTP_* and SERP_*_CONCURRENCY
+serpapi_client = AsyncSerpApiClient(API_KEY)
+
+
+async def serpapi_search(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fetch a SerpApi response for the parameters, served from the cache when possible."""
+    return await cache.get_or_fetch(params, lambda: serpapi_client.search(params))
+
+
+@mcp.resource("serp://cache/stats", mime_type="application/json")
+def cache_stats() -> str:
+    """Hit rates of the SerpApi response cache, overall and per engine."""
+    return json.dumps(cache.get_stats())
+
+
+@mcp.resource("serp://client/stats", mime_type="application/json")
+def client_stats() -> str:
+    """Upstream SerpApi requests, errors and per-engine concurrency."""
+    return json.dumps(serpapi_client.get_stats())
+
+
 # Tool to perform searches via SerpApi
 @mcp.tool()
 async def search(params: Dict[str, Any] = {}) -> str:
@@ -29,14 +64,12 @@ async def search(params: Dict[str, Any] = {}) -> str:
     """
 
     params = {
-        "api_key": API_KEY,
         "engine": "google_light", # Fastest engine by default
         **params  # Include any additional parameters
     }
 
     try:
-        search = SerpApiSearch(params)
-        data = search.get_dict()
+        data = await serpapi_search(params)
 
 
         # Process organic search results if available
@@ -69,7 +102,10 @@ async def search(params: Dict[str, Any] = {}) -> str:
     }
 )
 async def flights(
-    params: Dict[str, Any] = {}
+    params: Dict[str, Any] = {},
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    raw: bool = False
 ) -> dict:
     """Search for flights using SerpApi's Google Flights API.
 
@@ -87,22 +123,28 @@ async def flights(
             - stops (int): 0=Any, 1=Nonstop, 2=1 stop or fewer, 3=2 stops or fewer
             - sort_by (int): 1=Top, 2=Price, 3=Departure time, 4=Arrival time, 5=Duration, 6=Emissions
             - ... (see SerpApi docs for full list)
+        fields (list): Flight fields to return, any of price, airlines, departure_time,
+            arrival_time, total_duration, stops, layovers, legs, carbon_kg, carbon_vs_typical_percent,
+            departure_token, booking_token (default: all)
+        limit (int): Number of flights to return, best first (default: 10)
+        raw (bool): Return SerpApi's full flight objects and search metadata instead
 
     Returns:
-        dict: {"flights": [...], "search_metadata": {...}, "search_parameters": {...}}
+        dict: {"flights": [...], "total_results": int, "price_insights": {...}, "search_parameters": {...}}
     """
     params = {
-        "api_key": API_KEY,
         "engine": "google_flights",
         **params
     }
     try:
-        search = SerpApiSearch(params)
-        data = search.get_dict()
+        data = await serpapi_search(params)
 
         if not data:
             return {"flights": [], "search_metadata": {}, "search_parameters": params, "error": "No response from SerpApi."}
 
+        if not raw:
+            return compact_flights(data, fields, RESULTS_LIMIT if limit is None else limit, params)
+
         # Return the raw best_flights and other_flights arrays as a single list
         flights = []
         if "best_flights" in data and data["best_flights"]:
@@ -126,13 +168,75 @@ async def flights(
     except Exception as e:
         return {"flights": [], "error": f"Error: {str(e)}"}
 
+@mcp.tool(
+    annotations={
+        "title": "Search Flight Date Grid",
+    }
+)
+async def flight_grid(
+    origins: List[str],
+    destinations: List[str],
+    outbound_date: str,
+    return_date: Optional[str] = None,
+    flex_days: int = 3,
+    max_itineraries: int = 5,
+    params: Dict[str, Any] = {}
+) -> dict:
+    """Compare flight prices across routes and flexible dates in one call.
+
+    Runs one Google Flights search per origin, destination and date pair
+    concurrently and returns the cheapest price of each, plus the cheapest
+    itineraries overall.
+
+    Parameters:
+        origins (list): Departure airport IATA codes (e.g. ['LHR', 'LGW'])
+        destinations (list): Arrival airport IATA codes (e.g. ['FCO', 'CIA'])
+        outbound_date (str): Preferred outbound date in YYYY-MM-DD format
+        return_date (str): Preferred return date in YYYY-MM-DD format; omit for one way
+        flex_days (int): Days searched either side of each date (default: 3)
+        max_itineraries (int): Number of cheapest itineraries returned (default: 5)
+        params (dict): Other Google Flights parameters applied to every search
+            (e.g. {"adults": 2, "currency": "EUR", "travel_class": 1, "stops": 1})
+
+    Returns:
+        dict: {"grid": [{"departure_id", "arrival_id", "outbound_date", "return_date", "price"}, ...],
+               "cheapest": {...}, "best_itineraries": [...], "errors": [...], "queries": int}
+    """
+    try:
+        queries = build_queries(origins, destinations, outbound_date, return_date, max(flex_days, 0))
+    except ValueError as e:
+        return {"grid": [], "best_itineraries": [], "error": f"Error: Invalid date - {str(e)}"}
+
+    if not queries:
+        return {"grid": [], "best_itineraries": [], "error": "Error: No routes or future dates to search."}
+    if len(queries) > GRID_MAX_QUERIES:
+        return {"grid": [], "best_itineraries": [], "error": f"Error: {len(queries)} searches requested, "
+                f"the limit is {GRID_MAX_QUERIES}. Use fewer airports or a smaller flex_days."}
+
+    async def search_pair(query):
+        return await serpapi_search({
+            "engine": "google_flights",
+            **params,
+            "type": 1 if "return_date" in query else 2,
+            **query
+        })
+
+    try:
+        result = await run_grid(queries, search_pair, GRID_CONCURRENCY, max_itineraries)
+        return {**result, "queries": len(queries)}
+    except Exception as e:
+        return {"grid": [], "best_itineraries": [], "error": f"Error: {str(e)}"}
+
 @mcp.tool(
     annotations={
         "title": "Search Hotels",
     }
 )
 async def hotels(
-    params: Dict[str, Any] = {}
+    params: Dict[str, Any] = {},
+    fields: Optional[List[str]] = None,
+    limit: Optional[int] = None,
+    raw: bool = False
 ) -> dict:
     """Search for hotels using SerpApi's Google Hotels API.
 
@@ -156,22 +260,28 @@ async def hotels(
             - hotel_class (str): Hotel class, comma-separated (e.g. '2,3,4,5')
             - vacation_rentals (bool): Set to true for vacation rentals
             - ... (see SerpApi docs for full list)
+        fields (list): Property fields to return, any of name, type, price_per_night, total_price,
+            overall_rating, reviews, hotel_class, location_rating, check_in_time, check_out_time,
+            amenities, free_cancellation, gps_coordinates, link, property_token (default: all)
+        limit (int): Number of properties to return, in SerpApi's order (default: 10)
+        raw (bool): Return SerpApi's full property objects, ads, brands and search metadata instead
 
     Returns:
-        dict: {"properties": [...], "ads": [...], "brands": [...], "search_metadata": {...}}
+        dict: {"properties": [...], "total_results": int, "next_page_token": str, "search_parameters": {...}}
     """
     params = {
-        "api_key": API_KEY,
         "engine": "google_hotels",
         **params
     }
     try:
-        search = SerpApiSearch(params)
-        data = search.get_dict()
+        data = await serpapi_search(params)
 
         if not data:
             return {"properties": [], "ads": [], "brands": [], "search_metadata": {}, "search_parameters": params, "error": "No response from SerpApi."}
 
+        if not raw:
+            return compact_hotels(data, fields, RESULTS_LIMIT if limit is None else limit, params)
+
         return {
             "properties": data.get("properties", []),
             "ads": data.get("ads", []),
@@ -215,13 +325,11 @@ async def maps(
         dict: {"local_results": [...], "search_metadata": {...}, "search_parameters": {...}}
     """
     params = {
-        "api_key": API_KEY,
         "engine": "google_maps",
         **params
     }
     try:
-        search = SerpApiSearch(params)
-        data = search.get_dict()
+        data = await serpapi_search(params)
 
         if not data:
             return {"local_results": [], "search_metadata": {}, "search_parameters": params, "error": "No response from SerpApi."}
@@ -266,13 +374,11 @@ async def amazon(
         dict: {"organic_results": [...], "product_ads": {...}, "search_metadata": {...}}
     """
     params = {
-        "api_key": API_KEY,
         "engine": "amazon",
         **params
     }
     try:
-        search = SerpApiSearch(params)
-        data = search.get_dict()
+        data = await serpapi_search(params)
 
         if not data:
             return {"organic_results": [], "product_ads": {}, "search_metadata": {}, "search_parameters": params, "error": "No response from SerpApi."}
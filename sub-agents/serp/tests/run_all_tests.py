@@ -46,7 +46,10 @@ async def main():
         ("Flights", "tests/test_flights.py"),
         ("Hotels", "tests/test_hotels.py"),
         ("Maps", "tests/test_maps.py"),
-        ("Amazon", "tests/test_amazon.py")
+        ("Amazon", "tests/test_amazon.py"),
+        ("Cache", "tests/test_cache.py"),
+        ("Flight Grid", "tests/test_flight_grid.py"),
+        ("Projection", "tests/test_projection.py")
     ]
     
     results = {}
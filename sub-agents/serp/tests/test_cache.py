@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test script for the SerpApi response cache. Runs offline against a fake fetch.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to the path so we can import from server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serp_cache import SerpResponseCache, cache_key
+
+
+class FakeSerpApi:
+    """Counts upstream requests and returns a numbered response"""
+
+    def __init__(self, delay=0.05):
+        self.calls = 0
+        self.delay = delay
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"best_flights": [{"price": 100 + self.calls}]}
+
+
+async def check_backend(backend, path=None):
+    print(f"\n🗄️  Testing {backend} backend...")
+    cache = SerpResponseCache(backend=backend, path=path, max_size=10,
+                              policies={"google_flights": (0.2, 0.3)})
+    api = FakeSerpApi()
+    params = {"engine": "google_flights", "departure_id": "LHR", "arrival_id": "FCO", "adults": 1}
+    same = {"arrival_id": "fco", "adults": "1", "departure_id": "lhr", "engine": "google_flights",
+            "api_key": "secret", "children": None}
+
+    assert cache_key(params) == cache_key(same), "equivalent parameters must share a key"
+
+    # Concurrent identical misses share one upstream request
+    results = await asyncio.gather(*(cache.get_or_fetch(params, api.fetch) for _ in range(5)))
+    assert api.calls == 1 and all(r == results[0] for r in results), "concurrent misses were not coalesced"
+
+    # Fresh hit
+    assert await cache.get_or_fetch(same, api.fetch) == results[0]
+    assert api.calls == 1
+
+    # Stale hit is served at once and refreshed in the background
+    time.sleep(0.25)
+    assert await cache.get_or_fetch(params, api.fetch) == {"best_flights": [{"price": 101}]}
+    await asyncio.sleep(0.1)
+    assert api.calls == 2, "stale entry was not refreshed"
+    assert await cache.get_or_fetch(params, api.fetch) == {"best_flights": [{"price": 102}]}
+
+    # Expired beyond the stale window is a miss
+    time.sleep(0.55)
+    assert await cache.get_or_fetch(params, api.fetch) == {"best_flights": [{"price": 103}]}
+
+    # Cancelling the request that started a fetch does not strand the others waiting on it
+    cancel_params = {"engine": "google_flights", "departure_id": "LHR", "arrival_id": "CIA"}
+    leader = asyncio.create_task(cache.get_or_fetch(cancel_params, api.fetch))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(cache.get_or_fetch(cancel_params, api.fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+    result = await asyncio.wait_for(follower, timeout=3)
+    assert result["best_flights"], "follower did not get the response after the leader was cancelled"
+    assert leader.cancelled() and api.calls == 4
+
+    # A failed fetch reaches every waiting request and is not cached
+    async def broken():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("connection reset")
+    broken_params = {"engine": "google_hotels", "q": "rome"}
+    outcomes = await asyncio.gather(*(cache.get_or_fetch(broken_params, broken) for _ in range(2)),
+                                    return_exceptions=True)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert not cache._in_flight
+
+    # Error responses are not cached
+    async def failing():
+        return {"error": "Google hasn't returned any results for this query."}
+    await cache.get_or_fetch({"engine": "google_maps", "q": "nothing"}, failing)
+    await cache.get_or_fetch({"engine": "google_maps", "q": "nothing"}, failing)
+
+    stats = cache.get_stats()
+    print(f"📊 Stats: {stats}")
+    assert stats["engines"]["google_maps"]["misses"] == 2
+    assert stats["engines"]["google_flights"]["coalesced"] == 5
+    assert stats["engines"]["google_flights"]["refreshes"] == 1
+    print(f"✅ {backend} backend OK")
+
+
+async def test_cache():
+    print("🧪 Testing SerpApi response cache...")
+    try:
+        await check_backend("memory")
+        with tempfile.TemporaryDirectory() as directory:
+            await check_backend("sqlite", os.path.join(directory, "cache.sqlite3"))
+        return True
+    except AssertionError as e:
+        print(f"❌ {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = asyncio.run(test_cache())
+    print(f"\n{'✅ CACHE TEST PASSED' if success else '❌ CACHE TEST FAILED'}")
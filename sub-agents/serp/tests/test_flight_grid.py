@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the flight date grid. Runs offline against a fake search.
+"""
+import asyncio
+import os
+import sys
+from datetime import date
+
+# Add the parent directory to the path so we can import from server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_grid import build_queries, run_grid
+
+TODAY = date(2026, 10, 1)
+
+
+def fake_flight(price, airline, minutes):
+    return {
+        "price": price,
+        "total_duration": minutes,
+        "flights": [{
+            "airline": airline,
+            "flight_number": f"{airline[:2].upper()} 100",
+            "departure_airport": {"id": "LHR", "time": "2026-11-10 08:00"},
+            "arrival_airport": {"id": "FCO", "time": "2026-11-10 11:30"}
+        }],
+        "booking_token": f"token-{price}"
+    }
+
+
+async def fake_search(query):
+    """Cheaper the later the outbound date; the 2026-11-12 search fails"""
+    await asyncio.sleep(0.01)
+    if query["outbound_date"] == "2026-11-12":
+        raise RuntimeError("Rate limit exceeded")
+    day = int(query["outbound_date"][-2:])
+    return {
+        "best_flights": [fake_flight(500 - day * 10, "ITA Airways", 150)],
+        "other_flights": [fake_flight(600 - day * 10, "British Airways", 155)]
+    }
+
+
+async def test_flight_grid():
+    print("🗓️  Testing flight date grid...")
+
+    queries = build_queries(["LHR", "lgw"], ["FCO"], "2026-11-10", "2026-11-11", 1, today=TODAY)
+    print(f"📝 {len(queries)} queries")
+    # 3 outbound x 3 return dates minus the return before the outbound date: 8 pairs per route
+    if len(queries) != 16 or not all(q["return_date"] >= q["outbound_date"] for q in queries):
+        print(f"❌ Unexpected queries: {queries}")
+        return False
+
+    past = build_queries(["LHR"], ["FCO"], "2026-10-02", None, 3, today=TODAY)
+    if [q["outbound_date"] for q in past] != ["2026-10-01", "2026-10-02", "2026-10-03", "2026-10-04", "2026-10-05"]:
+        print(f"❌ Past dates were not skipped: {past}")
+        return False
+
+    one_way = build_queries(["LHR"], ["FCO"], "2026-11-10", None, 3, today=TODAY)
+    result = await run_grid(one_way, fake_search, concurrency=3, max_itineraries=3)
+
+    print(f"💰 Cheapest: {result['cheapest']}")
+    print(f"⚠️  Errors: {result['errors']}")
+    if len(result["grid"]) != 7 or result["cheapest"]["outbound_date"] != "2026-11-13":
+        print(f"❌ Unexpected grid: {result['grid']}")
+        return False
+    if len(result["errors"]) != 1 or [c["price"] for c in result["grid"] if c["outbound_date"] == "2026-11-12"] != [None]:
+        print("❌ Failed search was not reported in the grid")
+        return False
+    prices = [i["price"] for i in result["best_itineraries"]]
+    if prices != [370, 390, 400] or result["best_itineraries"][0]["airlines"] != ["ITA Airways"]:
+        print(f"❌ Unexpected itineraries: {result['best_itineraries']}")
+        return False
+
+    print("✅ Grid, cheapest cell and itineraries are correct")
+    return True
+
+
+if __name__ == "__main__":
+    success = asyncio.run(test_flight_grid())
+    print(f"\n{'✅ FLIGHT GRID TEST PASSED' if success else '❌ FLIGHT GRID TEST FAILED'}")
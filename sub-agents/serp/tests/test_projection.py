@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact flight and hotel records. Runs offline on the docs examples.
+"""
+import json
+import os
+import sys
+
+# Add the parent directory to the path so we can import from server
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_projection import load_docs_example
+from projection import compact_flights, compact_hotels
+
+
+def test_projection():
+    print("📦 Testing compact flight and hotel records...")
+
+    flights_data = load_docs_example("serp-flights-api.md")
+    result = compact_flights(flights_data, None, 3, {})
+    first = result["flights"][0]
+    print(f"✈️  First flight: {json.dumps(first)[:300]}...")
+    raw_first = flights_data["best_flights"][0]
+    if first["price"] != raw_first["price"] or first["stops"] != len(raw_first["flights"]) - 1:
+        print("❌ Price or stops do not match the raw flight")
+        return False
+    if first["carbon_kg"] != round(raw_first["carbon_emissions"]["this_flight"] / 1000, 1):
+        print("❌ Carbon emissions were not converted to kg")
+        return False
+    if len(result["flights"]) != 3 or result["total_results"] != 4 or "price_history" in result["price_insights"]:
+        print(f"❌ Unexpected limit or price insights: {result['total_results']}, {result['price_insights']}")
+        return False
+
+    narrowed = compact_flights(flights_data, ["price", "booking_token", "departure_token"], 1, {})
+    if set(narrowed["flights"][0]) - {"price", "booking_token", "departure_token"}:
+        print(f"❌ Field selection returned other fields: {narrowed['flights'][0]}")
+        return False
+    try:
+        compact_flights(flights_data, ["price", "logo"], 1, {})
+        print("❌ Unknown field was accepted")
+        return False
+    except ValueError:
+        pass
+
+    hotels_data = load_docs_example("serp-hotels-api.md")
+    hotels = compact_hotels(hotels_data, ["name", "price_per_night", "property_token"], 10, {})
+    print(f"🏨 Hotels: {hotels['properties']}")
+    raw_hotel = hotels_data["properties"][0]
+    if hotels["properties"][0]["price_per_night"] != raw_hotel["rate_per_night"]["extracted_lowest"]:
+        print("❌ Nightly price does not match the raw property")
+        return False
+
+    raw_bytes = len(json.dumps(flights_data["best_flights"] + flights_data["other_flights"]))
+    compact_bytes = len(json.dumps(compact_flights(flights_data, None, None, {})["flights"]))
+    print(f"📏 Flights: {raw_bytes} raw bytes, {compact_bytes} compact bytes")
+    if compact_bytes * 2 > raw_bytes:
+        print("❌ Compact flights are not substantially smaller")
+        return False
+
+    print("✅ Compact records are correct")
+    return True
+
+
+if __name__ == "__main__":
+    success = test_projection()
+    print(f"\n{'✅ PROJECTION TEST PASSED' if success else '❌ PROJECTION TEST FAILED'}")
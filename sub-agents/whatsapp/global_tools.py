@@ -1,7 +1,7 @@
 import os
 import requests
 import json
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, Iterator
 from datetime import datetime
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
@@ -177,6 +177,27 @@ def add_memory(user_id: str, memory_text: str, contact_email: Optional[str] = No
     except Exception as e:
         return {"error": f"Memory add error: {str(e)}"}
 
+def add_memories(user_id: str, memories: List[str], contact_email: Optional[str] = None) -> Dict[str, Any]:
+    """Add many memories to the vector database in one request"""
+    try:
+        url = f"{GLOBAL_TOOLS_API_URL}/api/memory/add_batch"
+        items = []
+        for memory in memories:
+            item = {"memory": memory}
+            if contact_email:
+                item["email"] = contact_email
+            items.append(item)
+        data = {"user_id": user_id, "memories": items}
+        
+        response = requests.post(url, json=data, timeout=60)
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            return {"error": f"Failed to add memories: {response.status_code} - {response.text}"}
+    except Exception as e:
+        return {"error": f"Memory batch add error: {str(e)}"}
+
 def search_memory(user_id: str, query: str, n_results: int = 5) -> Dict[str, Any]:
     """Search memories using natural language"""
     try:
@@ -214,8 +235,9 @@ def write_status_update(agent_id: str, agent_type: str, conversation_id: str, up
     except Exception as e:
         return {"error": f"Status write error: {str(e)}"}
 
-def read_status_updates(conversation_id: str, agent_type: Optional[str] = None, agent_id: Optional[str] = None) -> Dict[str, Any]:
-    """Read status updates for a conversation"""
+def read_status_updates(conversation_id: str, agent_type: Optional[str] = None, agent_id: Optional[str] = None,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Read status updates for a conversation, optionally only those after a previous read's cursor"""
     try:
         url = f"{GLOBAL_TOOLS_API_URL}/api/status/read"
         data = {"conversation_id": conversation_id}
@@ -223,6 +245,8 @@ def read_status_updates(conversation_id: str, agent_type: Optional[str] = None,
             data["agent_type"] = agent_type
         if agent_id:
             data["agent_id"] = agent_id
+        if cursor:
+            data["cursor"] = cursor
             
         response = requests.post(url, json=data, timeout=30)
         
@@ -233,6 +257,32 @@ def read_status_updates(conversation_id: str, agent_type: Optional[str] = None,
     except Exception as e:
         return {"error": f"Status read error: {str(e)}"}
 
+def stream_vector_documents(collection_name: str, query_texts: List[str], n_results: int = 5,
+                            where: Optional[Dict[str, Any]] = None,
+                            include: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+    """Query a vector collection, yielding NDJSON records ("hit", then "end" or "error") as they arrive"""
+    try:
+        url = f"{GLOBAL_TOOLS_API_URL}/api/vector/documents/query"
+        data = {
+            "collection_name": collection_name,
+            "query_texts": query_texts,
+            "n_results": n_results
+        }
+        if where:
+            data["where"] = where
+        if include:
+            data["include"] = include
+        
+        with requests.post(url, params={"stream": "true"}, json=data, stream=True, timeout=30) as response:
+            if response.status_code != 200:
+                yield {"type": "error", "error": f"Failed to query documents: {response.status_code} - {response.text}"}
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+    except Exception as e:
+        yield {"type": "error", "error": f"Document query error: {str(e)}"}
+
 # Tool Definitions
 
 @tool
@@ -400,6 +450,30 @@ def add_memory_tool(user_id: str, memory_text: str, contact_email: Optional[str]
     
     return f"Memory added successfully: {result.get('message', 'Memory stored')}"
 
+@tool
+def add_memories_tool(user_id: str, memories: List[str], contact_email: Optional[str] = None) -> str:
+    """
+    Add several memories at once, e.g. when saving many preferences from a long chat.
+    
+    Args:
+        user_id: The user ID to store the memories for
+        memories: The memory contents to store
+        contact_email: Optional contact email to associate all memories with
+        
+    Returns:
+        Summary of stored and failed memories, or error message
+    """
+    result = add_memories(user_id, memories, contact_email)
+    
+    if "error" in result:
+        return f"Failed to add memories: {result['error']}"
+    
+    output = f"Memories added: {result.get('added_count', 0)} stored, {result.get('failed_count', 0)} failed"
+    for item in result.get("results", []):
+        if item.get("status") == "failed":
+            output += f"\n  - '{memories[item['index']]}': {item.get('error')}"
+    return output
+
 @tool
 def search_memory_tool(user_id: str, query: str, max_results: int = 5) -> str:
     """
@@ -458,7 +532,8 @@ def write_status_tool(agent_id: str, agent_type: str, conversation_id: str, upda
     return f"Status update written successfully: {result.get('message', 'Status recorded')}"
 
 @tool
-def read_status_tool(conversation_id: str, agent_type: Optional[str] = None, agent_id: Optional[str] = None) -> str:
+def read_status_tool(conversation_id: str, agent_type: Optional[str] = None, agent_id: Optional[str] = None,
+                     cursor: Optional[str] = None) -> str:
     """
     Read status updates for a conversation with optional filtering.
     
@@ -466,19 +541,23 @@ def read_status_tool(conversation_id: str, agent_type: Optional[str] = None, age
         conversation_id: ID of the conversation
         agent_type: Optional agent type filter
         agent_id: Optional specific agent ID filter
+        cursor: Optional cursor from a previous read; only newer updates are returned
         
     Returns:
         Formatted status updates or error message
     """
-    result = read_status_updates(conversation_id, agent_type, agent_id)
+    result = read_status_updates(conversation_id, agent_type, agent_id, cursor)
     
     if "error" in result:
         return f"Failed to read status: {result['error']}"
     
     updates = result.get("status_updates", [])
     total = result.get("total_results", 0)
+    next_cursor = result.get("next_cursor")
     
     if not updates:
+        if cursor:
+            return f"No new status updates for conversation {conversation_id} (cursor: {next_cursor})"
         return f"No status updates found for conversation {conversation_id}"
     
     output = f"Status updates for conversation {conversation_id} ({total} total):\n\n"
@@ -492,6 +571,9 @@ def read_status_tool(conversation_id: str, agent_type: Optional[str] = None, age
         output += f"[{timestamp}] {agent_type}/{agent_id}:\n"
         output += f"  {message}\n\n"
     
+    if next_cursor:
+        output += f"To read only newer updates next time, pass cursor: {next_cursor}\n"
+    
     return output
 
 @tool
@@ -545,28 +627,24 @@ def search_documents_tool(collection_name: str, query: str, max_results: int = 5
         except json.JSONDecodeError:
             return "Invalid metadata filter JSON format"
     
-    result = query_vector_documents(collection_name, [query], max_results, where, ["documents", "metadatas", "distances"])
-    
-    if "error" in result:
-        return f"Failed to search documents: {result['error']}"
-    
-    results = result.get("results", {})
-    documents = results.get("documents", [[]])[0]
-    metadatas = results.get("metadatas", [[]])[0]
-    distances = results.get("distances", [[]])[0]
-    
-    if not documents:
+    hits = []
+    for record in stream_vector_documents(collection_name, [query], max_results, where, ["documents", "metadatas", "distances"]):
+        if record.get("type") == "error":
+            return f"Failed to search documents: {record.get('error')} {record.get('message', '')}".strip()
+        if record.get("type") != "hit":
+            continue
+        
+        hit = f"{record['rank']}. {record.get('document')}\n"
+        if record.get("metadata"):
+            hit += f"   Metadata: {record['metadata']}\n"
+        if record.get("distance") is not None:
+            hit += f"   Similarity: {1 - record['distance']:.3f}\n"
+        hits.append(hit + "\n")
+    
+    if not hits:
         return f"No documents found for query: '{query}'"
     
-    output = f"Document search results for '{query}' in collection '{collection_name}':\n\n"
-    
-    for i, (doc, meta, dist) in enumerate(zip(documents, metadatas, distances), 1):
-        output += f"{i}. {doc}\n"
-        if meta:
-            output += f"   Metadata: {meta}\n"
-        output += f"   Similarity: {1-dist:.3f}\n\n"
-    
-    return output
+    return f"Document search results for '{query}' in collection '{collection_name}':\n\n" + "".join(hits)
 
 def get_global_tools():
     """Return list of all global tools for the WhatsApp agent"""
@@ -576,6 +654,7 @@ def get_global_tools():
         update_contact_tool,
         get_contacts_tool,
         add_memory_tool,
+        add_memories_tool,
         search_memory_tool,
         write_status_tool,
         read_status_tool,
@@ -223,6 +223,7 @@ You also have access to these Global Tools:
   - get_contacts_tool: Check if a contact already exists before creating a new one, or to get a comprehensive view of a user's network. If this tool does not work then should use the list chats whatsapp tool instead.
 - Memory Management:
   - add_memory_tool: IMPORTANT - Store any significant user preferences, requirements, or personal details shared during conversations. Examples: food allergies, travel preferences, important dates, family information, previous orders, etc.
+  - add_memories_tool: Store several memories in one call when many details come up at once (e.g. backfilling preferences from a long chat).
   - search_memory_tool: ALWAYS search memories before making recommendations or when starting a new conversation with a returning user. This provides personalized context for better service.
 - Status Tracking:
   - write_status_tool: Record important milestones in conversations (e.g., "User confirmed booking", "Waiting for payment details") to maintain state across sessions.
@@ -966,6 +967,7 @@ You also have access to these Global Tools:
   - get_contacts_tool: Check if a contact already exists before creating a new one, or to get a comprehensive view of a user's network. If this tool does not work then should use the list chats whatsapp tool instead.
 - Memory Management:
   - add_memory_tool: IMPORTANT - Store any significant user preferences, requirements, or personal details shared during conversations. Examples: food allergies, travel preferences, important dates, family information, previous orders, etc.
+  - add_memories_tool: Store several memories in one call when many details come up at once (e.g. backfilling preferences from a long chat).
   - search_memory_tool: ALWAYS search memories before making recommendations or when starting a new conversation with a returning user. This provides personalized context for better service.
 - Status Tracking:
   - write_status_tool: Record important milestones in conversations (e.g., "User confirmed booking", "Waiting for payment details") to maintain state across sessions.
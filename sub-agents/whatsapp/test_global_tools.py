@@ -45,6 +45,7 @@ def test_tool_names():
         'update_contact_tool',
         'get_contacts_tool',
         'add_memory_tool',
+        'add_memories_tool',
         'search_memory_tool',
         'write_status_tool',
         'read_status_tool',